@@ -1,36 +1,49 @@
-from src.load_data import convert_json_to_parquet, get_parquet_paths
-from src.feature_extract import extract_minute_features
-from src.build_phase_datasets import build_phase_datasets
-from src.model_training import train_all_models
+from src.load_data import convert_json_to_dataset, pair_dataset
+from src.config import DUMP_PHASE_FILES, MINUTE_FEATURE_FILE, OPSCORE_FILE
+from src.feature_store import load_feature_store, update_feature_store
+from src.norm_state import refresh_norm_stats
+from src.build_phase_datasets import build_phase_index, dump_phase_datasets
+from src.model_training import train_models_parallel
 from src.scoring import compute_opscore
+from src.table_io import save_frame
 from src.visualize import visualize_feature_importance, visualize_opscore_distribution
 
 
 def main():
 
-    print("📌 STEP 0) JSON → Parquet 변환")
-    convert_json_to_parquet()
+    print("📌 STEP 0) JSON → Parquet Dataset 변환")
+    # raw JSON + tar/zip 샤드 → game_version 파티션 통합 Dataset (새로 생기거나 바뀐 원본만, 전체 코어)
+    # emit_tables: participants / participant_frames / events 테이블도 기록
+    #              → feature_vectorized.load_feature_tables 와 test.py 엔진 비교가 읽음
+    convert_json_to_dataset(workers=None, emit_tables=True)
 
-    print("📌 STEP 1) 파일 경로 로드")
-    match_paths, timeline_paths = get_parquet_paths()
-    print(f"Matches = {len(match_paths)} | Timelines = {len(timeline_paths)}")
+    print("📌 STEP 1) matchId 매칭")
+    pairs, orphans = pair_dataset()  # 짝 없는 경기는 report_orphans 가 경고
+    n_matches = len(pairs) + len(orphans["match_only"])
+    n_timelines = len(pairs) + len(orphans["timeline_only"])
+    print(f"Matches = {n_matches} | Timelines = {n_timelines} | 학습에 쓰는 쌍 = {len(pairs)}")
+    if n_matches != n_timelines:
+        print(f"⚠️ 매치 / 타임라인 수 불일치 ({n_matches} vs {n_timelines})")
 
     print("📌 STEP 2) Minute Feature 추출")
-    df_minute = extract_minute_features(match_paths, timeline_paths)
+    update_feature_store(pairs, workers=None)  # 새 경기 / 피처 버전 / 원본이 바뀐 경기만 Dataset 에서 추출
+    df_minute = load_feature_store(match_ids=pairs["match_id"])
+    save_frame(df_minute, MINUTE_FEATURE_FILE)  # Arrow IPC → table_io.load_frame 으로 mmap 로딩
 
-    print("📌 STEP 3) Phase Split")
-    df_early, df_late, df_end = build_phase_datasets(df_minute)
+    print("📌 STEP 2-1) 정규화 통계 갱신")
+    refresh_norm_stats()  # 저장소의 새 경기만 패치(game_version)별 스케치에 반영 → norm_stats.csv
 
-    df_early.to_csv("data/phase_early.csv", index=False)
-    df_late.to_csv("data/phase_late.csv", index=False)
-    df_end.to_csv("data/phase_end.csv", index=False)
+    print("📌 STEP 3) Phase Split")
+    phase_index = build_phase_index(df_minute)  # (phase, lane, role) → row 위치, 테이블 복사 없음
+    if DUMP_PHASE_FILES:
+        dump_phase_datasets(df_minute)
 
     print("📌 STEP 4) 모델 학습")
-    train_all_models(df_early, df_late, df_end)
+    train_models_parallel(df_minute, phase_index)  # 스레드 예산 안에서 모델 여러 개 동시 학습
 
     print("📌 STEP 5) OPScore 계산")
-    df_score                                                   = compute_opscore(df_minute)
-    df_score.to_csv("data/opscore_results.csv", index=False)
+    df_score = compute_opscore(df_minute)
+    save_frame(df_score, OPSCORE_FILE)
 
     print("📌 STEP 6) 시각화")
     visualize_feature_importance()
@@ -1,28 +1,146 @@
 # src/build_phase_datasets.py
 
+import os
+
+import numpy as np
 import pandas as pd
 
-def build_phase_datasets(df):
+from src.phase_definition import DEFAULT_PHASES
+from src.table_io import save_frame
+
+try:
+    from src.config import DATA_DIR, EARLY_PHASE_FILE, END_PHASE_FILE, LATE_PHASE_FILE
+except ImportError:
+    DATA_DIR = "data"
+    EARLY_PHASE_FILE = "data/phase_early.feather"
+    LATE_PHASE_FILE = "data/phase_late.feather"
+    END_PHASE_FILE = "data/phase_end.feather"
+
+PHASES = DEFAULT_PHASES.phase_names
+MODEL_LANES = ["TOP", "JUNGLE", "MIDDLE", "ADC", "SUPPORT"]
+SUPPORT_ROLES = ["Enchanter", "Tank", "Assassin", "Damage"]
+PHASE_FILES = {"early": EARLY_PHASE_FILE, "late": LATE_PHASE_FILE, "end": END_PHASE_FILE}
+
+
+def phase_masks(df, definition=DEFAULT_PHASES):
     """
-    Early: minute < 15
-    Late:  15 <= minute < end_minute
-    End:   minute == end_minute
+    {phase: bool mask}  (구간 규칙은 phase_definition 참고, 기본: early < 15 <= late, 종료 분 = end)
     """
-
     if "match_id" not in df.columns:
         raise KeyError(f"❌ match_id 없음. columns = {df.columns.tolist()}")
+    return definition.masks(df)
+
+
+def _lane_role_arrays(df):
+    lane = df["lane"].astype(str).to_numpy()
+    role = df["support_role"].astype(str).to_numpy() if "support_role" in df.columns else \
+        np.full(len(df), "None", dtype=object)
+    return lane, role
+
+
+def build_phase_index(df, lanes=MODEL_LANES, definition=DEFAULT_PHASES):
+    """
+    DataFrame 을 복사하지 않고 (phase, lane, support_role) 별 row 위치(np.ndarray) 만 만든다.
+    SUPPORT 가 아닌 라인은 role=None. 순서 = phase → lane → role (모델 학습 순서)
+    학습 / 스코어링은 df.iloc[rows, 필요한 컬럼] 으로 필요한 부분만 꺼내 쓴다.
+    """
+    lane, role = _lane_role_arrays(df)
+
+    index = {}
+    for phase, mask in phase_masks(df, definition).items():
+        for lane_name in lanes:
+            lane_rows = np.flatnonzero(mask & (lane == lane_name))
+            if not len(lane_rows):
+                continue
+            if lane_name != "SUPPORT":
+                index[(phase, lane_name, None)] = lane_rows
+                continue
+            for role_name in SUPPORT_ROLES:
+                role_rows = lane_rows[role[lane_rows] == role_name]
+                if len(role_rows):
+                    index[(phase, lane_name, role_name)] = role_rows
+    return index
+
 
-    # end_minute = 게임 종료 시점 (이미 duration_min에 들어있음)
-    df["end_minute"] = df["duration_min"]
+def phase_rows(df, phase, definition=DEFAULT_PHASES):
+    """phase 전체 row 위치 (라인 구분 없이, 원래 순서)"""
+    return np.flatnonzero(phase_masks(df, definition)[phase])
 
-    df_early = df[df["minute"] < 15].copy()
 
-    df_late = df[
-        (df["minute"] >= 15) &
-        (df["minute"] < df["end_minute"])
-    ].copy()
+def build_phase_datasets(df, definition=DEFAULT_PHASES):
+    """
+    (이전 API) phase 별 DataFrame 을 phase_names 순서로 반환 (기본: early, late, end).
+    새 코드는 build_phase_index 를 쓰고, 파일이 필요할 때만 dump_phase_datasets 를 호출한다.
+    """
+    masks = phase_masks(df, definition)
+    return tuple(df[masks[phase]] for phase in definition.phase_names)
+
+
+def dump_phase_datasets(df, paths=None, definition=DEFAULT_PHASES):
+    """phase 별 테이블을 파일로 저장 (기본 Arrow IPC, .csv 경로를 주면 CSV). 분석 / 시각화용 선택 단계"""
+    paths = paths or PHASE_FILES
+    masks = phase_masks(df, definition)
+    for phase in definition.phase_names:
+        path = paths.get(phase, os.path.join(DATA_DIR, f"phase_{phase}.feather"))
+        save_frame(df[masks[phase]], path)
+        print(f"💾 {phase} phase 저장: {path} ({int(masks[phase].sum()):,} rows)")
+
+
+# ============================================================
+# Sweep: 여러 PhaseDefinition 을 한 번에 비교
+# ============================================================
+def _sorted_minute_index(df, lanes):
+    """
+    라인별 row 위치를 minute 순 / (minute - duration_min) 순으로 한 번만 정렬해 둔다.
+    각 정의의 시간 구간 = minute 정렬 배열의 연속 구간, 종료 구간 = offset 정렬 배열의 뒷부분
+    → 정의마다 searchsorted 로 경계만 찾으면 된다.
+    """
+    minute = df["minute"].to_numpy().astype("int64")
+    offset = minute - df["duration_min"].to_numpy().astype("int64")
+    lane, _ = _lane_role_arrays(df)
+
+    index = {}
+    for lane_name in lanes:
+        rows = np.flatnonzero(lane == lane_name)
+        by_minute = rows[np.argsort(minute[rows], kind="stable")]
+        by_offset = rows[np.argsort(offset[rows], kind="stable")]
+        index[lane_name] = {
+            "by_minute": by_minute, "minute": minute[by_minute],
+            "by_offset": by_offset, "offset": offset[by_offset],
+        }
+    return index, len(df)
+
+
+def _rows_from_sorted(sorted_index, n_rows, definition):
+    """정렬 인덱스 + 정의 → {(lane, phase): row 위치}  (정렬 없이 slice 만)"""
+    out = {}
+    for lane_name, idx in sorted_index.items():
+        end_start = np.searchsorted(idx["offset"], -definition.end_window, side="left")
+        end_rows = idx["by_offset"][end_start:]
+        is_end = np.zeros(n_rows, dtype=bool)
+        is_end[end_rows] = True
 
-    # end = 딱 게임 종료 시점
-    df_end = df[df["minute"] == df["end_minute"]].copy()
+        edges = [0] + [np.searchsorted(idx["minute"], b, side="left") for b in definition.boundaries] + \
+                [len(idx["minute"])]
+        for name, start, stop in zip(definition.names, edges, edges[1:]):
+            band = idx["by_minute"][start:stop]
+            out[(lane_name, name)] = band[~is_end[band]]
+        out[(lane_name, definition.end_name)] = end_rows
+    return out
 
-    return df_early, df_late, df_end
+
+def sweep_phase_definitions(df, definitions, metric=None, lanes=MODEL_LANES):
+    """
+    여러 phase 정의를 데이터 한 번 정렬로 비교.
+    metric(df, rows) → float 를 주면 (정의, 라인, phase) 마다 score 컬럼으로 기록 (예: 빠른 모델 RMSE)
+    반환: DataFrame[definition, lane, phase, n_rows, (score)]
+    """
+    sorted_index, n_rows = _sorted_minute_index(df, lanes)
+    records = []
+    for definition in definitions:
+        for (lane_name, phase), rows in _rows_from_sorted(sorted_index, n_rows, definition).items():
+            record = {"definition": definition.label, "lane": lane_name, "phase": phase, "n_rows": len(rows)}
+            if metric is not None:
+                record["score"] = metric(df, np.sort(rows)) if len(rows) else np.nan
+            records.append(record)
+    return pd.DataFrame(records)
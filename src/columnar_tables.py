@@ -0,0 +1,234 @@
+"""
+columnar_tables.py
+Riot match / timeline JSON → 타입이 고정된 long 테이블 3종
+
+- participants       : (match_id, pid) 당 1 row, 정적 정보 + challenges
+- participant_frames : (match_id, frame_idx, pid) 당 1 row, 분 단위 스탯
+- events             : (match_id, frame_idx, event_idx) 당 1 row
+
+json_normalize 결과처럼 info.participants / info.frames 를 object 컬럼(중첩 dict)으로
+들고 다니지 않고, 처음부터 컬럼 단위로 펼쳐서 저장한다.
+피처 추출은 이 테이블들 위에서 groupby / join 으로 처리할 수 있다.
+"""
+
+import pyarrow as pa
+
+PARTICIPANTS = "participants"
+PARTICIPANT_FRAMES = "participant_frames"
+EVENTS = "events"
+
+# challenges 중 현재 피처에 쓰는 값은 고정 컬럼으로, 나머지는 map 으로 보관
+PARTICIPANT_SCHEMA = pa.schema([
+    ("match_id", pa.string()),
+    ("pid", pa.int8()),
+    ("puuid", pa.string()),
+    ("team_id", pa.int16()),
+    ("team_position", pa.string()),
+    ("champion_id", pa.int16()),
+    ("champion_name", pa.string()),
+    ("gold_earned", pa.int32()),
+    ("total_time_dead", pa.int32()),
+    ("turret_takedowns", pa.int16()),
+    ("win", pa.bool_()),
+    ("game_duration", pa.int32()),
+    ("turret_plates_taken", pa.int16()),
+    ("split_push_time", pa.float64()),
+    ("team_damage_percent", pa.float64()),
+    ("solo_kills", pa.int16()),
+    ("challenges", pa.map_(pa.string(), pa.float64())),
+])
+
+# damageStats 는 feature_extract 가 읽는 키와 동일한 필드를 사용
+PARTICIPANT_FRAME_SCHEMA = pa.schema([
+    ("match_id", pa.string()),
+    ("frame_idx", pa.int16()),
+    ("timestamp", pa.int32()),
+    ("minute", pa.int16()),
+    ("pid", pa.int8()),
+    ("cs", pa.int16()),
+    ("jungle_cs", pa.int16()),
+    ("xp", pa.int32()),
+    ("level", pa.int8()),
+    ("total_gold", pa.int32()),
+    ("current_gold", pa.int32()),
+    ("cc_time", pa.int32()),
+    ("dmg_champ", pa.int32()),
+    ("dmg_taken", pa.int32()),
+    ("heal", pa.int32()),
+    ("position_x", pa.int16()),
+    ("position_y", pa.int16()),
+])
+
+EVENT_SCHEMA = pa.schema([
+    ("match_id", pa.string()),
+    ("frame_idx", pa.int16()),
+    ("event_idx", pa.int16()),
+    ("minute", pa.int16()),
+    ("timestamp", pa.int32()),
+    ("type", pa.string()),
+    ("killer_id", pa.int8()),
+    ("victim_id", pa.int8()),
+    ("creator_id", pa.int8()),
+    ("participant_id", pa.int8()),
+    ("assists", pa.list_(pa.int8())),
+    ("team_id", pa.int16()),
+    ("monster_type", pa.string()),
+    ("building_type", pa.string()),
+    ("ward_type", pa.string()),
+    ("position_x", pa.int16()),
+    ("position_y", pa.int16()),
+])
+
+TABLE_SCHEMAS = {
+    PARTICIPANTS: PARTICIPANT_SCHEMA,
+    PARTICIPANT_FRAMES: PARTICIPANT_FRAME_SCHEMA,
+    EVENTS: EVENT_SCHEMA,
+}
+
+# 파티션 내부 정렬 키 (row group 통계로 match_id pruning)
+TABLE_SORT_KEYS = {
+    PARTICIPANTS: ["match_id", "pid"],
+    PARTICIPANT_FRAMES: ["match_id", "frame_idx", "pid"],
+    EVENTS: ["match_id", "frame_idx", "event_idx"],
+}
+
+
+def _numeric_challenges(challenges):
+    """challenges 중 숫자 값만 map 으로 (list 형태 값은 제외)"""
+    out = []
+    for k, v in (challenges or {}).items():
+        if isinstance(v, (bool, int, float)):
+            out.append((k, float(v)))
+    return out
+
+
+def participant_row(match_id, p, game_duration):
+    challenges = p.get("challenges") or {}
+    return {
+        "match_id": match_id,
+        "pid": p.get("participantId"),
+        "puuid": p.get("puuid"),
+        "team_id": p.get("teamId", 0),
+        "team_position": p.get("teamPosition", "UNKNOWN"),
+        "champion_id": p.get("championId", 0),
+        "champion_name": p.get("championName", ""),
+        "gold_earned": p.get("goldEarned", 0),
+        "total_time_dead": p.get("totalTimeSpentDead", 0),
+        "turret_takedowns": p.get("turretTakedowns", 0),
+        "win": p.get("win"),
+        "game_duration": game_duration,
+        "turret_plates_taken": challenges.get("turretPlatesTaken", 0),
+        "split_push_time": challenges.get("splitPushTime", 0),
+        "team_damage_percent": challenges.get("teamDamagePercentage", 0),
+        "solo_kills": challenges.get("soloKills", 0),
+        "challenges": _numeric_challenges(challenges),
+    }
+
+
+def participant_frame_row(match_id, frame_idx, timestamp, pframe):
+    dmg = pframe.get("damageStats") or {}
+    pos = pframe.get("position") or {}
+    return {
+        "match_id": match_id,
+        "frame_idx": frame_idx,
+        "timestamp": timestamp,
+        "minute": timestamp // 60000,
+        "pid": pframe.get("participantId"),
+        "cs": pframe.get("minionsKilled", 0),
+        "jungle_cs": pframe.get("jungleMinionsKilled", 0),
+        "xp": pframe.get("xp", 0),
+        "level": pframe.get("level", 0),
+        "total_gold": pframe.get("totalGold", 0),
+        "current_gold": pframe.get("currentGold", 0),
+        "cc_time": pframe.get("timeEnemySpentControlled", 0),
+        "dmg_champ": dmg.get("totalDamageDealtToChampions", 0),
+        "dmg_taken": dmg.get("totalDamageTaken", 0),
+        "heal": dmg.get("totalHeal", 0),
+        "position_x": pos.get("x"),
+        "position_y": pos.get("y"),
+    }
+
+
+def event_row(match_id, frame_idx, event_idx, frame_timestamp, ev):
+    pos = ev.get("position") or {}
+    return {
+        "match_id": match_id,
+        "frame_idx": frame_idx,
+        "event_idx": event_idx,
+        "minute": frame_timestamp // 60000,
+        "timestamp": ev.get("timestamp", frame_timestamp),
+        "type": ev.get("type"),
+        "killer_id": ev.get("killerId"),
+        "victim_id": ev.get("victimId"),
+        "creator_id": ev.get("creatorId"),
+        "participant_id": ev.get("participantId"),
+        "assists": ev.get("assistingParticipantIds"),
+        "team_id": ev.get("teamId"),
+        "monster_type": ev.get("monsterType"),
+        "building_type": ev.get("buildingType"),
+        "ward_type": ev.get("wardType"),
+        "position_x": pos.get("x"),
+        "position_y": pos.get("y"),
+    }
+
+
+def to_table(rows, name):
+    """row dict 리스트 → 스키마가 고정된 pyarrow Table"""
+    return pa.Table.from_pylist(rows, schema=TABLE_SCHEMAS[name])
+
+
+def match_tables(doc):
+    """match JSON(dict) → {"participants": Table}"""
+    match_id = doc["metadata"]["matchId"]
+    info = doc.get("info", {})
+    duration = info.get("gameDuration", 0)
+
+    rows = [participant_row(match_id, p, duration)
+            for p in info.get("participants", []) if p.get("participantId") is not None]
+    return {PARTICIPANTS: to_table(rows, PARTICIPANTS)}
+
+
+def timeline_tables(doc):
+    """timeline JSON(dict) → {"participant_frames": Table, "events": Table}"""
+    match_id = doc["metadata"]["matchId"]
+    frame_rows = []
+    event_rows = []
+
+    for frame_idx, frame in enumerate(doc.get("info", {}).get("frames", [])):
+        ts = frame.get("timestamp", 0)
+        for pframe in (frame.get("participantFrames") or {}).values():
+            if pframe.get("participantId") is not None:
+                frame_rows.append(participant_frame_row(match_id, frame_idx, ts, pframe))
+        for event_idx, ev in enumerate(frame.get("events") or []):
+            event_rows.append(event_row(match_id, frame_idx, event_idx, ts, ev))
+
+    return {
+        PARTICIPANT_FRAMES: to_table(frame_rows, PARTICIPANT_FRAMES),
+        EVENTS: to_table(event_rows, EVENTS),
+    }
+
+
+def _to_builtin(value):
+    """parquet 왕복으로 생긴 numpy 배열/스칼라를 list / 기본 타입으로"""
+    if isinstance(value, dict):
+        return {k: _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if hasattr(value, "tolist"):  # np.ndarray, np.generic
+        return _to_builtin(value.tolist())
+    return value
+
+
+def record_to_doc(record):
+    """
+    json_normalize 로 펼친 record (파일별 Parquet 1 row) → 원래 중첩 JSON 형태.
+    {"metadata.matchId": ..., "info.frames": [...]} → {"metadata": {"matchId": ...}, "info": {"frames": [...]}}
+    """
+    doc = {}
+    for key, value in record.items():
+        node = doc
+        parts = key.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = _to_builtin(value)
+    return doc
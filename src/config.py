@@ -9,12 +9,44 @@ TIMELINE_PATH = os.path.join(BASE_DIR, "raw/timeline_data")
 # Intermediate data
 DATA_DIR = os.path.join(BASE_DIR, "data")
 MINUTE_FEATURE_CSV = os.path.join(DATA_DIR, "minute_features.csv")
+MINUTE_FEATURE_PARTS_DIR = os.path.join(DATA_DIR, "minute_feature_parts")
+MINUTE_FEATURE_DATASET_DIR = os.path.join(DATA_DIR, "minute_features")
+FEATURE_STORE_DIR = os.path.join(DATA_DIR, "feature_store")
 EARLY_PHASE_CSV = os.path.join(DATA_DIR, "phase_early.csv")
 LATE_PHASE_CSV = os.path.join(DATA_DIR, "phase_late.csv")
 END_PHASE_CSV = os.path.join(DATA_DIR, "phase_end.csv")
+# Arrow IPC (memory-map 로딩, table_io 참고)
+MINUTE_FEATURE_FILE = os.path.join(DATA_DIR, "minute_features.feather")
+EARLY_PHASE_FILE = os.path.join(DATA_DIR, "phase_early.feather")
+LATE_PHASE_FILE = os.path.join(DATA_DIR, "phase_late.feather")
+END_PHASE_FILE = os.path.join(DATA_DIR, "phase_end.feather")
+OPSCORE_FILE = os.path.join(DATA_DIR, "opscore_results.feather")
+NORMALIZED_MINUTE_FILE = os.path.join(DATA_DIR, "minute_features_normalized.feather")
+# 스트리밍 정규화 (normalization.compute_quantile_stats, quantile_sketch 참고)
+NORM_RELATIVE_ACCURACY = 0.01    # 분위수 근사값의 상대오차 상한
+NORM_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+NORM_BATCH_ROWS = 200_000        # 한 번에 읽는 row 수
+# 증분 정규화 상태 (norm_state: 패치별 스케치 + 반영된 경기 목록)
+NORM_STATE_DIR = os.path.join(DATA_DIR, "norm_state")
+NORM_STATE_KEEP_SEGMENTS = None  # 최근 N 개 패치만 통계에 남김 (None → 전부)
+# 층화 정규화 (lane, phase, support_role, minute 별 median)
+NORM_STRATIFIED = False          # True → norm_* 를 층별 median 으로 나눔 (기본은 기존처럼 전체 median)
+NORM_STRATA_MAX_MINUTE = 40      # 이 분 이후는 한 층으로 묶음
+NORM_MIN_STRATUM_ROWS = 30       # row 가 이보다 적은 층은 (lane, phase, support_role) median 사용
+# Phase 구간 (phase_definition.PhaseDefinition)
+PHASE_BOUNDARIES = [15]          # minute < 15 → early, 이후 → late
+PHASE_NAMES = ["early", "late"]
+END_PHASE_WINDOW = 0             # minute >= duration_min - END_PHASE_WINDOW → end
+# phase 별 테이블 파일 저장 여부 (학습 / 스코어링은 파일 없이 row 위치로 바로 사용)
+DUMP_PHASE_FILES = False
 
 # Models
 MODEL_DIR = os.path.join(BASE_DIR, "models")
+TRAIN_THREAD_BUDGET = None       # 병렬 학습 전체 스레드 수 (None → 전체 코어)
+TRAIN_ROWS_PER_THREAD = 20_000   # 모델 1개에 스레드 1개를 더 주는 row 수 기준
+# 양자화된 CatBoost Pool 캐시 (데이터 + 피처 목록 해시가 같으면 재사용)
+POOL_CACHE_DIR = os.path.join(DATA_DIR, "pool_cache")
+USE_POOL_CACHE = True
 
 # Results
 RESULT_DIR = os.path.join(BASE_DIR, "results")
@@ -1,8 +1,16 @@
+# 실행: 프로젝트 루트에서 python -m src.convert_json_to_parquet [--workers N] [--chunksize N]
+
 import os
-import json
-import glob
-import pandas as pd
-from tqdm import tqdm
+import argparse
+
+from src.load_data import (
+    FILE_MANIFEST_PATH,
+    RAW_SHARD_DIR,
+    build_conversion_tasks,
+    report_failures,
+    run_conversion_tasks,
+)
+from src.manifest import load_manifest, save_manifest
 
 MATCH_JSON_DIR = "raw/match_data"
 TIMELINE_JSON_DIR = "raw/timeline_data"
@@ -14,36 +22,35 @@ os.makedirs(MATCH_PARQUET_DIR, exist_ok=True)
 os.makedirs(TIMELINE_PARQUET_DIR, exist_ok=True)
 
 
-def json_to_parquet(json_path, parquet_path):
-    """JSON → Parquet (메모리 절약형 변환)"""
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # pandas가 JSON 딕셔너리를 잘 flatten 해줌
-    df = pd.json_normalize(data)
-
-    # Parquet 저장 (압축 적용)
-    df.to_parquet(parquet_path, index=False, compression="snappy")
-
-
-def batch_convert(json_dir, parquet_dir, prefix):
-    files = sorted(glob.glob(os.path.join(json_dir, f"{prefix}_*.json")))
-
-    print(f"Converting {len(files)} files from JSON → Parquet...")
-
-    for path in tqdm(files):
-        base = os.path.basename(path).replace(".json", ".parquet")
-        parquet_path = os.path.join(parquet_dir, base)
+def batch_convert(json_dir, parquet_dir, prefix, workers=1, chunksize=16, failure_report=None,
+                  manifest_path=FILE_MANIFEST_PATH, shard_dir=RAW_SHARD_DIR):
+    """
+    {prefix}_*.json + shard_dir 샤드 안의 {prefix} 문서 → Parquet 일괄 변환.
+    manifest 기준으로 변경 없는 파일은 skip, workers>1 (또는 None=전체 코어) 이면 프로세스 풀로 병렬 변환.
+    """
+    manifest = load_manifest(manifest_path)
+    tasks, shards = build_conversion_tasks(json_dir, parquet_dir, prefix, manifest, shard_dir=shard_dir)
 
-        # 이미 변환된 파일은 skip
-        if os.path.exists(parquet_path):
-            continue
+    print(f"Converting {len(tasks)} files + {len(shards)} shards from JSON → Parquet...")
 
-        json_to_parquet(path, parquet_path)
+    failures = run_conversion_tasks(tasks, workers=workers, chunksize=chunksize, desc=prefix, manifest=manifest,
+                                    shards=shards)
+    save_manifest(manifest, manifest_path)
+    report_failures(failures, failure_report)
+    return failures
 
 
 if __name__ == "__main__":
-    batch_convert(MATCH_JSON_DIR, MATCH_PARQUET_DIR, "match")
-    batch_convert(TIMELINE_JSON_DIR, TIMELINE_PARQUET_DIR, "timeline")
+    parser = argparse.ArgumentParser(description="raw JSON → Parquet 변환")
+    parser.add_argument("--workers", type=int, default=0, help="프로세스 수 (0 = 전체 코어)")
+    parser.add_argument("--chunksize", type=int, default=16, help="워커에 한 번에 넘길 파일 수")
+    args = parser.parse_args()
+
+    batch_convert(MATCH_JSON_DIR, MATCH_PARQUET_DIR, "match",
+                  workers=args.workers, chunksize=args.chunksize,
+                  failure_report="parquet/match_failures.csv")
+    batch_convert(TIMELINE_JSON_DIR, TIMELINE_PARQUET_DIR, "timeline",
+                  workers=args.workers, chunksize=args.chunksize,
+                  failure_report="parquet/timeline_failures.csv")
 
     print("JSON → Parquet 변환 완료!")
@@ -0,0 +1,83 @@
+"""
+derived_metrics.py
+기본 카운터 컬럼 → 파생 비율 피처 (dpm, cspm, per-death/kill, kill_participation ...)
+
+분 단위 테이블이 완성된 뒤 컬럼 단위로 한 번에 계산한다.
+기본 컬럼(dmg_champ, dmg_taken, heal, cc_time, team_total_kills, *_accum, cs, minute)이
+테이블에 같이 저장돼 있으므로, 공식만 바꿀 때는 타임라인을 다시 파싱하지 않고
+add_derived_metrics(load_feature_store()) 처럼 이 단계만 다시 돌리면 된다.
+"""
+
+import numpy as np
+
+
+def safe_divide(numerator, denominator):
+    """분모가 0 인 자리는 0 (배열 단위)"""
+    numerator = np.asarray(numerator)
+    denominator = np.asarray(denominator)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=float), where=denominator != 0)
+
+
+def minute_safe(d):
+    """0 분 프레임도 1 분으로 나누기"""
+    return np.maximum(1, np.asarray(d["minute"]))
+
+
+# 이름 → (필요한 기본 컬럼, 계산식)   d 는 DataFrame 또는 {컬럼: 배열}
+DERIVED_METRICS = {
+    "dpm": {
+        "inputs": ["dmg_champ", "minute"],
+        "compute": lambda d: safe_divide(d["dmg_champ"], minute_safe(d)),
+    },
+    "dmg_taken_per_death": {
+        "inputs": ["dmg_taken", "deaths_accum"],
+        "compute": lambda d: safe_divide(d["dmg_taken"], d["deaths_accum"]),
+    },
+    "dmg_taken_per_kill": {
+        "inputs": ["dmg_taken", "kills_accum"],
+        "compute": lambda d: safe_divide(d["dmg_taken"], d["kills_accum"]),
+    },
+    "dmg_dealt_per_death": {
+        "inputs": ["dmg_champ", "deaths_accum"],
+        "compute": lambda d: safe_divide(d["dmg_champ"], d["deaths_accum"]),
+    },
+    "cspm": {
+        "inputs": ["cs", "minute"],
+        "compute": lambda d: safe_divide(d["cs"], minute_safe(d)),
+    },
+    "heal_per_min": {
+        "inputs": ["heal", "minute"],
+        "compute": lambda d: safe_divide(d["heal"], minute_safe(d)),
+    },
+    "cc_per_min": {
+        "inputs": ["cc_time", "minute"],
+        "compute": lambda d: safe_divide(d["cc_time"], minute_safe(d)),
+    },
+    "kills_per_min": {
+        "inputs": ["kills_accum", "minute"],
+        "compute": lambda d: safe_divide(d["kills_accum"], minute_safe(d)),
+    },
+    # 포탑 딜량 원천 값이 아직 없어서 항상 0 (기존 루프와 동일)
+    "turret_dpm": {
+        "inputs": ["minute"],
+        "compute": lambda d: np.zeros(len(np.asarray(d["minute"]))),
+    },
+    "kill_participation": {
+        "inputs": ["kills_accum", "assists_accum", "team_total_kills"],
+        "compute": lambda d: safe_divide(np.asarray(d["kills_accum"], dtype="int64")
+                                         + np.asarray(d["assists_accum"], dtype="int64"),
+                                         d["team_total_kills"]),
+    },
+}
+
+
+def add_derived_metrics(df, metrics=None):
+    """
+    df 의 기본 컬럼으로 파생 비율 컬럼을 계산해서 추가한 새 DataFrame 반환.
+    metrics=None 이면 DERIVED_METRICS 전체, 아니면 지정한 것만.
+    """
+    metrics = list(DERIVED_METRICS) if metrics is None else list(metrics)
+    missing = sorted({c for m in metrics for c in DERIVED_METRICS[m]["inputs"]} - set(df.columns))
+    if missing:
+        raise KeyError(f"파생 피처 계산에 필요한 기본 컬럼 없음: {missing}")
+    return df.assign(**{m: DERIVED_METRICS[m]["compute"](df) for m in metrics})
@@ -0,0 +1,168 @@
+"""
+event_timeline.py
+이벤트 시간 해상도 타임라인 (1분 프레임 단위 버킷 없이 임의 시각의 참가자 상태 조회)
+
+분 단위 피처는 timestamp // 60000 으로 묶여서 한 분 안의 킬 / 오브젝트가 합쳐지고,
+*_minute 값은 직전 프레임과의 차이라 프레임 순서에 의존한다.
+여기서는 이벤트 크레딧(feature_vectorized._event_credits 와 같은 규칙)을 이벤트 시각 기준으로 누적해 두고,
+조회는 정렬된 키 배열에 대한 이진 탐색(np.searchsorted) 한 번으로 처리한다.
+
+인덱스 구조 (build_counter_index)
+- keys   : (그룹 번호 << 32) + timestamp  (그룹 = match_id + pid 또는 match_id + team_id), 정렬됨
+- values : keys 각 위치까지의 그룹 내 누적 카운터 (n x stats)
+→ 조회 시각 t 의 상태 = 같은 그룹에서 timestamp <= t 인 마지막 누적값 (없으면 0)
+
+사용 예
+- sample_timeline(participants, events, step_ms=10_000) : 10초 간격 상태
+- sample_at_objectives(participants, events)            : 드래곤 / 바론 / 포탑 파괴 시각의 10명 상태
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_tables import EVENTS, PARTICIPANTS
+from src.feature_vectorized import ACCUM_PIDS, COUNTER_STATS, _event_credits
+from src.load_data import read_table
+
+KEY_SHIFT = 32   # timestamp(ms) < 2^32
+
+TIMELINE_EVENT_COLUMNS = ["match_id", "frame_idx", "timestamp", "type", "killer_id", "victim_id",
+                          "creator_id", "assists", "monster_type", "building_type"]
+PLAYER_KEYS = ["match_id", "pid"]
+TEAM_KEYS = ["match_id", "team_id"]
+OBJECTIVE_TYPES = ["ELITE_MONSTER_KILL", "BUILDING_KILL"]
+
+
+# ============================================================
+# 누적 카운터 인덱스
+# ============================================================
+def build_counter_index(credits, key_cols, stats):
+    """
+    credits: key_cols + timestamp + stat (이벤트 1건 = 1 row)
+    → {"key_cols", "stats", "groups", "keys", "values"} 인덱스
+    """
+    credits = credits.dropna(subset=["timestamp"])
+    counts = (credits.groupby(key_cols + ["timestamp", "stat"], observed=True).size()
+              .unstack("stat", fill_value=0)
+              .reindex(columns=stats, fill_value=0)
+              .reset_index())
+
+    groups = pd.MultiIndex.from_frame(counts[key_cols].drop_duplicates())
+    group_id = groups.get_indexer(pd.MultiIndex.from_frame(counts[key_cols])).astype("int64")
+    keys = (group_id << KEY_SHIFT) + counts["timestamp"].astype("int64").to_numpy()
+
+    order = np.argsort(keys, kind="stable")
+    values = counts[stats].to_numpy(dtype="int64")[order]
+    keys = keys[order]
+    group_id = group_id[order]
+    values = pd.DataFrame(values).groupby(group_id, sort=False).cumsum().to_numpy(dtype="int32")
+
+    return {"key_cols": list(key_cols), "stats": list(stats), "groups": groups, "keys": keys, "values": values}
+
+
+def query_counters(index, queries):
+    """
+    queries: key_cols + timestamp DataFrame → 각 row 시각의 누적 카운터 (queries 와 같은 순서 / index)
+    인덱스에 없는 그룹 / 첫 이벤트 이전 시각은 0.
+    """
+    group_id = index["groups"].get_indexer(pd.MultiIndex.from_frame(queries[index["key_cols"]])).astype("int64")
+    q_keys = (group_id << KEY_SHIFT) + queries["timestamp"].astype("int64").to_numpy()
+
+    pos = np.searchsorted(index["keys"], q_keys, side="right") - 1
+    safe_pos = np.clip(pos, 0, None)
+    found = (group_id >= 0) & (pos >= 0)
+    if len(index["keys"]):
+        found &= (index["keys"][safe_pos] >> KEY_SHIFT) == group_id
+        values = np.where(found[:, None], index["values"][safe_pos], 0)
+    else:
+        values = np.zeros((len(queries), len(index["stats"])), dtype="int32")
+    return pd.DataFrame(values, columns=index["stats"], index=queries.index)
+
+
+def _static(participants):
+    static = participants[["match_id", "pid", "team_id", "team_position", "game_duration"]].copy()
+    static[["pid", "team_id"]] = static[["pid", "team_id"]].astype("int64")
+    return static
+
+
+def build_player_index(participants, events, stats=COUNTER_STATS):
+    """참가자별 이벤트 누적 카운터 인덱스 (kills, deaths, assists, ward_place ...)"""
+    credits = _event_credits(events, _static(participants)[["match_id", "pid", "team_position"]], stats,
+                             extra=("timestamp",))
+    return build_counter_index(credits, PLAYER_KEYS, list(stats))
+
+
+def build_team_kill_index(participants, events):
+    """팀별 킬 누적 인덱스 (킬러가 참가자 목록에 있을 때만, feature_vectorized 와 동일)"""
+    kills = events.loc[events["type"] == "CHAMPION_KILL", ["match_id", "timestamp", "killer_id"]].dropna()
+    kills = kills[kills["killer_id"].isin(ACCUM_PIDS)]
+    kills = kills.assign(pid=kills["killer_id"].astype("int64"))
+    kills = kills.merge(_static(participants)[["match_id", "pid", "team_id"]], on=PLAYER_KEYS)
+    return build_counter_index(kills.assign(stat="team_kills"), TEAM_KEYS, ["team_kills"])
+
+
+def _player_state(participants, events, queries, stats):
+    """queries(match_id, pid, team_id, timestamp) → *_accum 카운터 + team_total_kills"""
+    counters = query_counters(build_player_index(participants, events, stats), queries)
+    team = query_counters(build_team_kill_index(participants, events), queries)
+    state = counters.add_suffix("_accum")
+    state["team_total_kills"] = team["team_kills"]
+    return state
+
+
+# ============================================================
+# 샘플링
+# ============================================================
+def sample_timeline(participants, events, step_ms=10_000, stats=COUNTER_STATS):
+    """
+    경기 시작 ~ 종료를 step_ms 간격으로 잘라 참가자별 상태 조회 (마지막 샘플 = 경기 종료 시각).
+    종료 시각 = max(game_duration, 마지막 이벤트 timestamp) → 마지막 샘플은 경기 전체 누적값
+    *_accum = 그 시각까지 누적, *_window = 직전 샘플 이후 증가분 (프레임 순서와 무관)
+    """
+    static = _static(participants)
+    last_event = events.groupby("match_id")["timestamp"].max()
+    end_ms = np.maximum(static["game_duration"].astype("int64").to_numpy() * 1000,
+                        static["match_id"].map(last_event).fillna(0).astype("int64").to_numpy())
+    # 0, step, 2*step, ... (< end) + end
+    n_samples = -(-end_ms // step_ms) + 1
+    queries = static.loc[static.index.repeat(n_samples), ["match_id", "pid", "team_id"]].reset_index(drop=True)
+    timestamp = queries.groupby(PLAYER_KEYS, sort=False).cumcount().to_numpy(dtype="int64") * step_ms
+    queries["timestamp"] = np.minimum(timestamp, np.repeat(end_ms, n_samples))
+
+    state = _player_state(participants, events, queries, stats)
+    accum_cols = [f"{s}_accum" for s in stats]
+    group = queries.groupby(PLAYER_KEYS, sort=False).ngroup()
+    window = state[accum_cols].groupby(group).diff().fillna(state[accum_cols]).astype("int32")
+    window.columns = [f"{s}_window" for s in stats]
+
+    return pd.concat([queries, state, window], axis=1)
+
+
+def sample_at_objectives(participants, events, types=OBJECTIVE_TYPES, stats=COUNTER_STATS):
+    """
+    오브젝트 이벤트(types) 시각마다 같은 경기 참가자 전원의 상태 조회.
+    같은 시각 이벤트까지 포함 (timestamp <= t) → 오브젝트 처치 자체의 obj_takes 도 반영된다.
+    """
+    objectives = events.loc[events["type"].isin(types),
+                            ["match_id", "timestamp", "type", "monster_type", "building_type"]].dropna(subset=["timestamp"])
+    objectives = objectives.reset_index(drop=True).rename_axis("objective_idx").reset_index()
+    queries = objectives.merge(_static(participants)[["match_id", "pid", "team_id"]], on="match_id")
+    queries = queries.sort_values(["objective_idx", "pid"], kind="stable").reset_index(drop=True)
+
+    state = _player_state(participants, events, queries, stats)
+    return pd.concat([queries, state], axis=1)
+
+
+def load_timeline_tables(match_ids=None):
+    """parquet/tables 에서 participants + 시각 정보가 있는 events 로딩"""
+    return (
+        read_table(PARTICIPANTS, match_ids=match_ids,
+                   columns=["match_id", "pid", "team_id", "team_position", "game_duration"]),
+        read_table(EVENTS, match_ids=match_ids, columns=TIMELINE_EVENT_COLUMNS),
+    )
+
+
+def extract_event_timeline_columnar(match_ids=None, step_ms=10_000):
+    """convert_json_to_dataset 으로 만든 테이블 → step_ms 간격 참가자 상태"""
+    participants, events = load_timeline_tables(match_ids)
+    return sample_timeline(participants, events, step_ms=step_ms)
@@ -1,14 +1,30 @@
 import pandas as pd
 from tqdm import tqdm
 import os
+import hashlib
+import json
 import numpy as np
-from src.load_data import create_single_mapping
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.derived_metrics import DERIVED_METRICS, add_derived_metrics
+from src.feature_schema import MINUTE_FEATURE_DTYPES, apply_feature_schema, to_storage_frame
+from src.load_data import (
+    MATCH_DATASET_DIR,
+    TIMELINE_DATASET_DIR,
+    create_single_mapping,
+    iter_dataset_records,
+    parallel_map,
+    report_failures,
+)
+from src.manifest import stat_source
 
 # 설정 파일이 없어도 돌아가도록 임시 처리 (SUPPORT_ROLE_MAP 정의)
 try:
-    from src.config import MINUTE_FEATURE_CSV, SUPPORT_ROLE_MAP
+    from src.config import MINUTE_FEATURE_CSV, MINUTE_FEATURE_DATASET_DIR, MINUTE_FEATURE_PARTS_DIR, SUPPORT_ROLE_MAP
 except ImportError:
     MINUTE_FEATURE_CSV = "data/minute_features.csv"
+    MINUTE_FEATURE_PARTS_DIR = "data/minute_feature_parts"
+    MINUTE_FEATURE_DATASET_DIR = "data/minute_features"
     SUPPORT_ROLE_MAP = {
         "Enchanter": ["Lulu", "Janna", "Karma", "Nami", "Sona", "Yuumi", "Milio", "Soraka", "Renata", "Seraphine",
                       "Taric", "Zilean", "Ivern"],
@@ -29,13 +45,39 @@ def get_support_role(champion_name):
     return CHAMP_TO_ROLE.get(champion_name, "Damage")
 
 
-def safe_divide(numerator, denominator):
-    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=float), where=denominator != 0)
+# 피처 계산 로직/스키마가 바뀌면 올릴 것 → feature_store 가 해당 경기들을 다시 추출
+FEATURE_VERSION = 2
 
+# extract_minute_features 출력 컬럼 순서 (벡터화 엔진도 동일하게 맞춤)
+MINUTE_FEATURE_COLUMNS = list(MINUTE_FEATURE_DTYPES)
 
-def extract_minute_features(match_paths, timeline_paths):
-    rows = []
+# derived_metrics 에서 계산하는 비율 컬럼 / 루프가 row 에 직접 담는 컬럼
+RATIO_FEATURE_COLUMNS = list(DERIVED_METRICS)
+BASE_ROW_COLUMNS = [c for c in MINUTE_FEATURE_COLUMNS if c not in DERIVED_METRICS]
+
+# 병렬 모드 최종 정렬 키 (같은 분에 프레임이 2개면 원래 프레임 순서 유지)
+MINUTE_FEATURE_SORT_KEYS = ["match_id", "minute", "pid"]
+SHARD_SIZE = 64
+
+# 병렬 모드 part 캐시 키에 섞는 피처 코드 지문 (버전 / 출력 컬럼 / dtype 이 바뀌면 기존 part 를 쓰지 않음)
+FEATURE_CODE_DIGEST = hashlib.sha256(json.dumps(
+    [FEATURE_VERSION, list(MINUTE_FEATURE_DTYPES.items())]).encode("utf-8")).hexdigest()[:16]
+
+
+def _load_record(source):
+    """경기 원본 → flatten dict (parquet 경로면 읽고, 통합 Dataset 에서 읽은 dict 는 그대로)"""
+    if isinstance(source, dict):
+        return source
+    return pd.read_parquet(source).iloc[0].to_dict()
 
+
+def _process_match(idx, match_source, timeline_source, rows):
+    """
+    경기 1개 처리 → rows 에 프레임×참가자 row 를 추가.
+    match_source / timeline_source: 파일별 parquet 경로 또는 load_data.payload_to_record 결과 dict
+    에러가 나면 메시지만 출력하고 넘어간다 (이미 추가된 row 는 유지).
+    반환값: 에러 없이 끝났으면 True
+    """
     # KDA/Damage 누적값 초기화 (여기에 와드, 로밍, 오브젝트 누적값 추가)
     accumulators = {
         pid: {"kills": 0, "deaths": 0, "assists": 0,
@@ -48,234 +90,476 @@ def extract_minute_features(match_paths, timeline_paths):
     # 🌟 추가: 이전 프레임의 KDA 누적값 저장을 위한 변수
     prev_kda_accum = {pid: {"kills": 0, "deaths": 0, "assists": 0} for pid in range(1, 11)}
 
+    game_id = "UNKNOWN_ID"
+
+    try:
+        match = _load_record(match_source)
+        timeline = _load_record(timeline_source)
+
+        game_id = match.get("metadata.matchId")
+
+        # 짝이 어긋난 타임라인이면 잘못된 피처가 섞이지 않도록 skip
+        timeline_id = timeline.get("metadata.matchId")
+        if timeline_id is not None and timeline_id != game_id:
+            raise ValueError(f"timeline matchId 불일치 ({timeline_id})")
+
+        mapping = create_single_mapping(match)
+
+        # accumulator 초기화 및 team_kills 누적 추적
+        for key in accumulators:
+            for stat in accumulators[key]: accumulators[key][stat] = 0
+            # 매치 시작 시 prev_kda_accum도 초기화
+            for stat in prev_kda_accum[key]: prev_kda_accum[key][stat] = 0
+
+        team_kills_accum = {100: 0, 200: 0}
+
+        # 정적 정보 추출
+        pid_to_info = {}
+        participants_info = match.get("info.participants")
+        if participants_info is None:
+            participants_info = match.get("info", {}).get("participants", [])
+        if isinstance(participants_info, np.ndarray): participants_info = participants_info.tolist()
+
+        if participants_info is not None:
+            for p in participants_info:
+                pid = p.get("participantId")
+                if pid:
+                    challenges = p.get("challenges", {})
+                    pid_to_info[pid] = {
+                        "target_gold": p.get("goldEarned", 0),
+                        "championName": p.get("championName", ""),
+                        "turret_plates": challenges.get("turretPlatesTaken", 0),
+                        "split_push_time": challenges.get("splitPushTime", 0),
+                        "total_time_dead": p.get("totalTimeSpentDead", 0),
+                        "team_damage_percent": challenges.get("teamDamagePercentage", 0),
+                        "turret_takedowns": p.get("turretTakedowns", 0),
+                        "solo_kills": challenges.get("soloKills", 0),
+                    }
+
+        # 타임라인 프레임 로딩
+        frames = timeline.get("info.frames")
+        if frames is None: return
+        if isinstance(frames, np.ndarray): frames = frames.tolist()
+
+        # --- 타임라인 루프 ---
+        for frame in frames:
+            timestamp_ms = frame.get("timestamp", 0)
+            minute = timestamp_ms // 60000
+
+            events = frame.get("events")
+            if events is None: events = []
+            if isinstance(events, np.ndarray): events = events.tolist()
+
+            pframes = frame.get("participantFrames")
+            if pframes is None: pframes = {}
+
+            # 1) 이벤트 집계 및 누적값 업데이트
+            player_events_minute = {}
+
+            for ev in events:
+                etype = ev.get("type")
+
+                # 🌟 수정: WARD_PLACED 이벤트 발생 시 accumulators에 누적
+                if etype == "WARD_PLACED":
+                    creator = ev.get("creatorId")
+                    if creator in accumulators: accumulators[creator]["ward_place"] += 1
+
+                # 🌟 수정: WARD_KILL 이벤트 발생 시 accumulators에 누적
+                if etype == "WARD_KILL":
+                    killer = ev.get("killerId")
+                    if killer in accumulators: accumulators[killer]["ward_kill"] += 1
+
+                if etype == "CHAMPION_KILL":
+                    killer = ev.get("killerId")
+                    victim = ev.get("victimId")
+                    assists = ev.get("assistingParticipantIds")
+                    if assists is None: assists = []
+                    if isinstance(assists, np.ndarray): assists = assists.tolist()
+
+                    if killer in mapping["pid_to_team"]:
+                        killer_team = mapping["pid_to_team"][killer]
+                        team_kills_accum[killer_team] += 1
+
+                    # KDA 누적
+                    if killer in accumulators: accumulators[killer]["kills"] += 1
+                    if victim in accumulators: accumulators[victim]["deaths"] += 1
+                    for ast in assists:
+                        if ast in accumulators: accumulators[ast]["assists"] += 1
+
+                    # 🌟 수정: Roam K/A는 accumulators에 누적
+                    if killer in accumulators:
+                        lane = mapping["pid_to_lane"][killer]
+                        if lane in ["MIDDLE", "UTILITY", "SUPPORT"]: accumulators[killer]["roam_ka"] += 1
+                        if lane == "JUNGLE": accumulators[killer]["gank_ka"] += 1
+
+                    for ast in assists:
+                        if ast in accumulators:
+                            lane = mapping["pid_to_lane"][ast]
+                            if lane in ["MIDDLE", "UTILITY", "SUPPORT"]: accumulators[ast]["roam_ka"] += 1
+                            if lane == "JUNGLE": accumulators[ast]["gank_ka"] += 1
+
+                if etype == "ELITE_MONSTER_KILL":
+                    killer = ev.get("killerId")
+                    assists = ev.get("assistingParticipantIds")
+                    if assists is None: assists = []
+                    if isinstance(assists, np.ndarray): assists = assists.tolist()
+
+                    # 🌟 수정: obj_takes는 accumulators에 누적
+                    if killer in accumulators: accumulators[killer]["obj_takes"] += 1
+                    for ast in assists:
+                        if ast in accumulators: accumulators[ast]["obj_takes"] += 1
+
+            # 2) 플레이어 스탯 업데이트 및 행 추가
+            for _, pframe in pframes.items():
+                pid = pframe.get("participantId")
+                if pid not in mapping["pid_to_puuid"]: continue
+
+                # 🌟🌟🌟 핵심 추가: team_id 추출 🌟🌟🌟
+                team_id = mapping["pid_to_team"].get(pid)
+                if team_id is None: continue  # team_id가 없으면 스킵
+
+                p_static = pid_to_info.get(pid, {})
+                p_accum = accumulators[pid]
+
+                # 🌟 분 단위 KDA 계산 (이전 누적값과의 차이)
+                kills_minute = p_accum["kills"] - prev_kda_accum[pid]["kills"]
+                deaths_minute = p_accum["deaths"] - prev_kda_accum[pid]["deaths"]
+                assists_minute = p_accum["assists"] - prev_kda_accum[pid]["assists"]
+
+                # Raw Stats
+                raw_lane = mapping["pid_to_lane"][pid]
+                if raw_lane == "BOTTOM":
+                    lane = "ADC"
+                elif raw_lane == "UTILITY":
+                    lane = "SUPPORT"
+                else:
+                    lane = raw_lane
+
+                support_role = get_support_role(p_static.get("championName", ""))
+
+                cs = pframe.get("minionsKilled", 0)
+                jungle_cs = pframe.get("jungleMinionsKilled", 0)
+                xp = pframe.get("xp", 0)
+                level = pframe.get("level", 0)
+                total_gold = pframe.get("totalGold", 0)
+                current_gold = pframe.get("currentGold", 0)
+                cc_time = pframe.get("timeEnemySpentControlled", 0)
+
+                dmg_stats = pframe.get("damageStats")
+                if dmg_stats is None: dmg_stats = {}
+
+                # Accumulators update
+                p_accum["dmg_champ"] = dmg_stats.get("totalDamageDealtToChampions", 0)
+                p_accum["dmg_taken"] = dmg_stats.get("totalDamageTaken", 0)
+                p_accum["heal"] = dmg_stats.get("totalHeal", 0)
+                p_accum["cc_time"] = pframe.get("timeEnemySpentControlled", 0)
+
+                # 파생 비율(dpm, cspm, kill_participation ...)은 여기서 계산하지 않고
+                # 기본 값만 담은 뒤 rows_to_frame → derived_metrics 에서 컬럼 단위로 한 번에 계산
+                rows.append({
+                    "match_id": game_id, "minute": minute, "pid": pid,
+                    "team_id": team_id,  # 👈 team_id 추가!
+                    "champion": p_static.get("championName", ""), "lane": lane,
+                    "support_role": support_role, "target_gold": p_static.get("target_gold", 0),
+
+                    # [Raw/Base]
+                    "cs": cs, "jungle_cs": jungle_cs, "xp": xp, "level": level,
+                    "dmg_champ": p_accum["dmg_champ"], "dmg_taken": p_accum["dmg_taken"],
+                    "heal": p_accum["heal"], "cc_time": p_accum["cc_time"],
+                    "team_total_kills": team_kills_accum.get(mapping["pid_to_team"][pid], 1),
+                    # 🌟 수정: 와드 누적값 사용
+                    "ward_place_accum": p_accum["ward_place"],
+                    "ward_kill_accum": p_accum["ward_kill"],
+                    "kills_accum": p_accum["kills"], "deaths_accum": p_accum["deaths"],
+                    "assists_accum": p_accum["assists"],
+
+                    # 🌟 분 단위 KDA 피처 (Manual Score용으로 유지)
+                    "kills_minute": kills_minute,
+                    "deaths_minute": deaths_minute,
+                    "assists_minute": assists_minute,
+
+                    # [경기 종료 기준 정적 값]
+                    "turret_plates_taken": p_static.get("turret_plates", 0),
+                    "turret_takedowns_accum": p_static.get("turret_takedowns", 0),
+                    "solo_kills_accum": p_static.get("solo_kills", 0),
+                    "split_push_time": p_static.get("split_push_time", 0),
+                    "total_time_dead": p_static.get("total_time_dead", 0),
+                    "team_damage_percent": p_static.get("team_damage_percent", 0),
+                    # 🌟 수정: 오브젝트/갱킹/로밍 누적값 사용
+                    "obj_takes_accum": p_accum["obj_takes"],
+                    "gank_ka_accum": p_accum["gank_ka"],
+                    "roam_ka_accum": p_accum["roam_ka"],
+
+                    "duration_min": match.get("info.gameDuration", 0) // 60
+                })
+
+                # 🌟 다음 분을 위해 현재 누적값 저장
+                prev_kda_accum[pid]["kills"] = p_accum["kills"]
+                prev_kda_accum[pid]["deaths"] = p_accum["deaths"]
+                prev_kda_accum[pid]["assists"] = p_accum["assists"]
+
+    except Exception as e:
+        print(f"❌ Error processing match (ID: {game_id}) at index {idx}: {e}")
+        return False
+    return True
+
+
+def extract_minute_features(match_paths, timeline_paths, output_path=MINUTE_FEATURE_CSV):
+    """
+    match/timeline parquet 쌍 → 분 단위 피처 테이블.
+    경로 대신 iter_dataset_pairs 가 준 payload dict 를 넣어도 된다.
+    output_path=None 이면 CSV 저장을 생략 (벤치마크/비교용).
+    """
+    rows = []
     for idx in tqdm(range(len(match_paths)), desc="Processing Matches"):
-        game_id = "UNKNOWN_ID"
-
-        try:
-            match_df = pd.read_parquet(match_paths[idx])
-            timeline_df = pd.read_parquet(timeline_paths[idx])
-            match = match_df.iloc[0].to_dict()
-            timeline = timeline_df.iloc[0].to_dict()
-
-            game_id = match.get("metadata.matchId")
-
-            mapping = create_single_mapping(match)
-
-            # accumulator 초기화 및 team_kills 누적 추적
-            for key in accumulators:
-                for stat in accumulators[key]: accumulators[key][stat] = 0
-                # 매치 시작 시 prev_kda_accum도 초기화
-                for stat in prev_kda_accum[key]: prev_kda_accum[key][stat] = 0
-
-            team_kills_accum = {100: 0, 200: 0}
-
-            # 정적 정보 추출
-            pid_to_info = {}
-            participants_info = match.get("info.participants")
-            if participants_info is None:
-                participants_info = match.get("info", {}).get("participants", [])
-            if isinstance(participants_info, np.ndarray): participants_info = participants_info.tolist()
-
-            if participants_info is not None:
-                for p in participants_info:
-                    pid = p.get("participantId")
-                    if pid:
-                        challenges = p.get("challenges", {})
-                        pid_to_info[pid] = {
-                            "target_gold": p.get("goldEarned", 0),
-                            "championName": p.get("championName", ""),
-                            "turret_plates": challenges.get("turretPlatesTaken", 0),
-                            "split_push_time": challenges.get("splitPushTime", 0),
-                            "total_time_dead": p.get("totalTimeSpentDead", 0),
-                            "team_damage_percent": challenges.get("teamDamagePercentage", 0),
-                            "turret_takedowns": p.get("turretTakedowns", 0),
-                            "solo_kills": challenges.get("soloKills", 0),
-                        }
-
-            # 타임라인 프레임 로딩
-            frames = timeline.get("info.frames")
-            if frames is None: continue
-            if isinstance(frames, np.ndarray): frames = frames.tolist()
-
-            # --- 타임라인 루프 ---
-            for frame in frames:
-                timestamp_ms = frame.get("timestamp", 0)
-                minute = timestamp_ms // 60000
-
-                events = frame.get("events")
-                if events is None: events = []
-                if isinstance(events, np.ndarray): events = events.tolist()
-
-                pframes = frame.get("participantFrames")
-                if pframes is None: pframes = {}
-
-                # 1) 이벤트 집계 및 누적값 업데이트
-                player_events_minute = {}
-
-                for ev in events:
-                    etype = ev.get("type")
-
-                    # 🌟 수정: WARD_PLACED 이벤트 발생 시 accumulators에 누적
-                    if etype == "WARD_PLACED":
-                        creator = ev.get("creatorId")
-                        if creator in accumulators: accumulators[creator]["ward_place"] += 1
-
-                    # 🌟 수정: WARD_KILL 이벤트 발생 시 accumulators에 누적
-                    if etype == "WARD_KILL":
-                        killer = ev.get("killerId")
-                        if killer in accumulators: accumulators[killer]["ward_kill"] += 1
-
-                    if etype == "CHAMPION_KILL":
-                        killer = ev.get("killerId")
-                        victim = ev.get("victimId")
-                        assists = ev.get("assistingParticipantIds")
-                        if assists is None: assists = []
-                        if isinstance(assists, np.ndarray): assists = assists.tolist()
-
-                        if killer in mapping["pid_to_team"]:
-                            killer_team = mapping["pid_to_team"][killer]
-                            team_kills_accum[killer_team] += 1
-
-                        # KDA 누적
-                        if killer in accumulators: accumulators[killer]["kills"] += 1
-                        if victim in accumulators: accumulators[victim]["deaths"] += 1
-                        for ast in assists:
-                            if ast in accumulators: accumulators[ast]["assists"] += 1
-
-                        # 🌟 수정: Roam K/A는 accumulators에 누적
-                        if killer in accumulators:
-                            lane = mapping["pid_to_lane"][killer]
-                            if lane in ["MIDDLE", "UTILITY", "SUPPORT"]: accumulators[killer]["roam_ka"] += 1
-                            if lane == "JUNGLE": accumulators[killer]["gank_ka"] += 1
-
-                        for ast in assists:
-                            if ast in accumulators:
-                                lane = mapping["pid_to_lane"][ast]
-                                if lane in ["MIDDLE", "UTILITY", "SUPPORT"]: accumulators[ast]["roam_ka"] += 1
-                                if lane == "JUNGLE": accumulators[ast]["gank_ka"] += 1
-
-                    if etype == "ELITE_MONSTER_KILL":
-                        killer = ev.get("killerId")
-                        assists = ev.get("assistingParticipantIds")
-                        if assists is None: assists = []
-                        if isinstance(assists, np.ndarray): assists = assists.tolist()
-
-                        # 🌟 수정: obj_takes는 accumulators에 누적
-                        if killer in accumulators: accumulators[killer]["obj_takes"] += 1
-                        for ast in assists:
-                            if ast in accumulators: accumulators[ast]["obj_takes"] += 1
-
-                # 2) 플레이어 스탯 업데이트 및 행 추가
-                for _, pframe in pframes.items():
-                    pid = pframe.get("participantId")
-                    if pid not in mapping["pid_to_puuid"]: continue
-
-                    # 🌟🌟🌟 핵심 추가: team_id 추출 🌟🌟🌟
-                    team_id = mapping["pid_to_team"].get(pid)
-                    if team_id is None: continue  # team_id가 없으면 스킵
-
-                    p_static = pid_to_info.get(pid, {})
-                    p_accum = accumulators[pid]
-
-                    # 🌟 분 단위 KDA 계산 (이전 누적값과의 차이)
-                    kills_minute = p_accum["kills"] - prev_kda_accum[pid]["kills"]
-                    deaths_minute = p_accum["deaths"] - prev_kda_accum[pid]["deaths"]
-                    assists_minute = p_accum["assists"] - prev_kda_accum[pid]["assists"]
-
-                    # Raw Stats
-                    raw_lane = mapping["pid_to_lane"][pid]
-                    if raw_lane == "BOTTOM":
-                        lane = "ADC"
-                    elif raw_lane == "UTILITY":
-                        lane = "SUPPORT"
-                    else:
-                        lane = raw_lane
-
-                    support_role = get_support_role(p_static.get("championName", ""))
-
-                    cs = pframe.get("minionsKilled", 0)
-                    jungle_cs = pframe.get("jungleMinionsKilled", 0)
-                    xp = pframe.get("xp", 0)
-                    level = pframe.get("level", 0)
-                    total_gold = pframe.get("totalGold", 0)
-                    current_gold = pframe.get("currentGold", 0)
-                    cc_time = pframe.get("timeEnemySpentControlled", 0)
-
-                    dmg_stats = pframe.get("damageStats")
-                    if dmg_stats is None: dmg_stats = {}
-
-                    # Accumulators update
-                    p_accum["dmg_champ"] = dmg_stats.get("totalDamageDealtToChampions", 0)
-                    p_accum["dmg_taken"] = dmg_stats.get("totalDamageTaken", 0)
-                    p_accum["heal"] = dmg_stats.get("totalHeal", 0)
-                    p_accum["cc_time"] = pframe.get("timeEnemySpentControlled", 0)
-
-                    # Derived Metrics
-                    minute_safe = max(1, minute)
-                    deaths_accum = p_accum["deaths"]
-                    kills_accum = p_accum["kills"]
-                    team_total_kills = team_kills_accum.get(mapping["pid_to_team"][pid], 1)
-
-                    dmg_taken_per_death = safe_divide(p_accum["dmg_taken"], deaths_accum)
-                    dmg_dealt_per_death = safe_divide(p_accum["dmg_champ"], deaths_accum)
-                    dmg_taken_per_kill = safe_divide(p_accum["dmg_taken"], kills_accum)
-
-                    cspm = safe_divide(cs, minute_safe)
-                    turret_dpm = safe_divide(p_static.get("turret_damage_total", 0), minute_safe)
-                    heal_per_min = safe_divide(p_accum["heal"], minute_safe)
-                    cc_per_min = safe_divide(p_accum["cc_time"], minute_safe)
-                    kills_per_min = safe_divide(p_accum["kills"], minute_safe)
-                    kill_participation = safe_divide(p_accum["kills"] + p_accum["assists"], team_total_kills)
-
-                    rows.append({
-                        "match_id": game_id, "minute": minute, "pid": pid,
-                        "team_id": team_id,  # 👈 team_id 추가!
-                        "champion": p_static.get("championName", ""), "lane": lane,
-                        "support_role": support_role, "target_gold": p_static.get("target_gold", 0),
-
-                        # [Raw/Base]
-                        "cs": cs, "jungle_cs": jungle_cs, "xp": xp, "level": level,
-                        # 🌟 수정: 와드 누적값 사용
-                        "ward_place_accum": p_accum["ward_place"],
-                        "ward_kill_accum": p_accum["ward_kill"],
-                        "dpm": safe_divide(p_accum["dmg_champ"], minute_safe),
-                        "kills_accum": kills_accum, "deaths_accum": deaths_accum, "assists_accum": p_accum["assists"],
-
-                        # 🌟 분 단위 KDA 피처 (Manual Score용으로 유지)
-                        "kills_minute": kills_minute,
-                        "deaths_minute": deaths_minute,
-                        "assists_minute": assists_minute,
-
-                        # [Derived Metrics]
-                        "dmg_taken_per_death": dmg_taken_per_death,
-                        "turret_plates_taken": p_static.get("turret_plates", 0),
-                        "turret_takedowns_accum": p_static.get("turret_takedowns", 0),
-                        "solo_kills_accum": p_static.get("solo_kills", 0),
-                        "split_push_time": p_static.get("split_push_time", 0),
-                        "dmg_taken_per_kill": dmg_taken_per_kill,
-                        "dmg_dealt_per_death": dmg_dealt_per_death,
-                        "total_time_dead": p_static.get("total_time_dead", 0),
-                        "team_damage_percent": p_static.get("team_damage_percent", 0),
-                        "cspm": cspm, "heal_per_min": heal_per_min, "cc_per_min": cc_per_min,
-                        "kills_per_min": kills_per_min, "turret_dpm": turret_dpm,
-                        # 🌟 수정: 오브젝트/갱킹/로밍 누적값 사용
-                        "obj_takes_accum": p_accum["obj_takes"],
-                        "gank_ka_accum": p_accum["gank_ka"],
-                        "roam_ka_accum": p_accum["roam_ka"],
-                        "kill_participation": kill_participation,
-
-                        "duration_min": match.get("info.gameDuration", 0) // 60
-                    })
-
-                    # 🌟 다음 분을 위해 현재 누적값 저장
-                    prev_kda_accum[pid]["kills"] = p_accum["kills"]
-                    prev_kda_accum[pid]["deaths"] = p_accum["deaths"]
-                    prev_kda_accum[pid]["assists"] = p_accum["assists"]
-
-        except Exception as e:
-            print(f"❌ Error processing match (ID: {game_id}) at index {idx}: {e}")
+        _process_match(idx, match_paths[idx], timeline_paths[idx], rows)
+
+    df = rows_to_frame(rows)
+    if output_path:
+        df.to_csv(output_path, index=False)
+    return df
+
+
+# ============================================================
+# 병렬 모드: 경기 목록을 샤드로 나눠 워커마다 Parquet part 저장
+# ============================================================
+def _shard_digest(pairs):
+    """
+    샤드 입력 (경로 + 크기/mtime) + 피처 코드 지문(FEATURE_CODE_DIGEST) 해시
+    → 입력이나 FEATURE_VERSION / 출력 스키마가 바뀌면 part 파일명이 달라져 다시 계산됨
+    """
+    h = hashlib.sha256()
+    h.update(f"{FEATURE_CODE_DIGEST}\n".encode("utf-8"))
+    for match_path, timeline_path in pairs:
+        for path in (match_path, timeline_path):
+            size, mtime_ns = stat_source(path)
+            h.update(f"{path}\0{size}\0{mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def plan_feature_shards(match_paths, timeline_paths, parts_dir=MINUTE_FEATURE_PARTS_DIR, shard_size=SHARD_SIZE):
+    """
+    (match, timeline) 쌍을 shard_size 개씩 고정 분할 → [(shard_idx, start, pairs, part_path), ...]
+    분할은 워커 수와 무관하므로 같은 입력이면 항상 같은 part 들이 나온다.
+    """
+    pairs = list(zip(match_paths, timeline_paths))
+    shards = []
+    for shard_idx, start in enumerate(range(0, len(pairs), shard_size)):
+        chunk = pairs[start:start + shard_size]
+        part_path = os.path.join(parts_dir, f"part-{shard_idx:05d}-{_shard_digest(chunk)}.parquet")
+        shards.append((shard_idx, start, chunk, part_path))
+    return shards
+
+
+def rows_to_frame(rows):
+    """row dict 리스트 → 파생 비율 계산 → 컬럼 순서 / dtype 고정 DataFrame (feature_schema 참고)"""
+    df = pd.DataFrame(rows, columns=BASE_ROW_COLUMNS)
+    if df.empty:  # 빈 프레임은 object 컬럼이라 파생 비율 계산 전에 dtype 부터 맞춤
+        df = apply_feature_schema(df)
+    return apply_feature_schema(add_derived_metrics(df)[MINUTE_FEATURE_COLUMNS])
+
+
+def _write_feature_part(start, sources, part_path):
+    """
+    (match, timeline) 원본 쌍들 → part 파일 저장, 반환값: row 수.
+    임시 파일에 쓴 뒤 교체하므로, 중간에 죽은 샤드는 part 가 남지 않아 재실행 시 다시 계산된다.
+    에러 난 경기는 중간까지 만든 row 를 버려서 part 에 남지 않는다 (iter_minute_features 와 동일).
+    """
+    rows = []
+    for i, (match_source, timeline_source) in enumerate(sources):
+        n_before = len(rows)
+        if not _process_match(start + i, match_source, timeline_source, rows):
+            del rows[n_before:]
+
+    tmp_path = part_path + ".tmp"
+    to_storage_frame(rows_to_frame(rows)).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, part_path)
+    return len(rows)
+
+
+def _feature_shard_task(task):
+    """워커 프로세스에서 샤드 1개 처리: (샤드 번호, 시작 index, [(match 경로, timeline 경로)], part 경로)"""
+    shard_idx, start, pairs, part_path = task
+    try:
+        return shard_idx, _write_feature_part(start, pairs, part_path), None
+    except Exception as e:
+        return shard_idx, 0, f"{type(e).__name__}: {e}"
+
+
+def iter_dataset_pairs(match_ids, match_dir=MATCH_DATASET_DIR, timeline_dir=TIMELINE_DATASET_DIR):
+    """
+    통합 Dataset 에서 match_ids 경기의 (match dict, timeline dict) 를 하나씩 yield.
+    매치 payload 는 작아서 한 번에, 타임라인은 row group 배치 단위로 읽는다 (둘 다 최신 적재분만).
+    """
+    matches = dict(iter_dataset_records(match_dir, match_ids=match_ids))
+    for match_id, timeline in iter_dataset_records(timeline_dir, match_ids=match_ids):
+        match = matches.pop(match_id, None)
+        if match is not None:
+            yield match, timeline
+
+
+def _dataset_shard_task(task):
+    """워커 프로세스에서 샤드 1개 처리: (샤드 번호, 시작 index, [match_id], part 경로), payload 는 워커가 직접 읽음"""
+    shard_idx, start, match_ids, part_path = task
+    try:
+        return shard_idx, _write_feature_part(start, iter_dataset_pairs(match_ids), part_path), None
+    except Exception as e:
+        return shard_idx, 0, f"{type(e).__name__}: {e}"
+
+
+def merge_feature_parts(part_paths):
+    """part 들을 샤드 순서로 이어붙인 뒤 (match_id, minute, pid) 안정 정렬"""
+    if not part_paths:
+        return rows_to_frame([])
+    df = apply_feature_schema(pd.concat([pd.read_parquet(p) for p in part_paths], ignore_index=True))
+    return df.sort_values(MINUTE_FEATURE_SORT_KEYS, kind="stable").reset_index(drop=True)
+
+
+def extract_minute_features_parallel(match_paths, timeline_paths, workers=None, shard_size=SHARD_SIZE,
+                                     parts_dir=MINUTE_FEATURE_PARTS_DIR, output_path=MINUTE_FEATURE_CSV):
+    """
+    extract_minute_features 의 멀티프로세스 버전.
+
+    - 경기 목록을 shard_size 개씩 나눠 워커마다 parts_dir/part-*.parquet 저장
+    - 이미 part 가 있는 샤드(입력 변경 없음)는 건너뜀 → 실패한 샤드만 재실행 가능
+    - 드라이버가 part 들을 (match_id, minute, pid) 순으로 병합
+      (분할이 워커 수와 무관하므로 workers 를 바꿔도 결과 파일은 바이트 단위로 동일)
+
+    실패한 샤드가 있으면 병합하지 않고 RuntimeError (다시 실행하면 그 샤드만 계산).
+    """
+    os.makedirs(parts_dir, exist_ok=True)
+    shards = plan_feature_shards(match_paths, timeline_paths, parts_dir, shard_size)
+    todo = [s for s in shards if not os.path.exists(s[3])]
+    print(f"🧩 샤드 {len(shards)}개 (계산 {len(todo)}개, 기존 part 재사용 {len(shards) - len(todo)}개)")
+
+    failures = []
+    for shard_idx, n_rows, err in parallel_map(_feature_shard_task, todo, workers=workers, chunksize=1,
+                                               desc="Feature Shards"):
+        if err is not None:
+            failures.append({"path": shards[shard_idx][3], "error": err})
+
+    if failures:
+        report_failures(failures)
+        raise RuntimeError(f"피처 샤드 {len(failures)}개 실패 → 다시 실행하면 실패한 샤드만 계산합니다")
+
+    # 입력이 바뀌어 더 이상 쓰지 않는 이전 part 정리
+    part_paths = [s[3] for s in shards]
+    keep = set(part_paths)
+    for name in os.listdir(parts_dir):
+        path = os.path.join(parts_dir, name)
+        if name.startswith("part-") and path not in keep:
+            os.remove(path)
+
+    df = merge_feature_parts(part_paths)
+    if output_path:
+        df.to_csv(output_path, index=False)
+    return df
+
+
+# ============================================================
+# 스트리밍 모드: 경기 N개 단위 배치를 바로 Parquet Dataset 에 추가
+# ============================================================
+# 전체 rows 를 메모리에 모았다가 마지막에 CSV 1개로 쓰는 대신,
+# 배치마다 part 파일을 하나씩 추가한다. part 파일 메타데이터에 처리한 원본 경로를 남겨서
+# 중간에 죽어도 다시 실행하면 이미 저장된 경기는 건너뛴다.
+SOURCE_PATHS_META_KEY = b"source_match_paths"
+
+
+def iter_minute_features(match_paths, timeline_paths, batch_matches=1):
+    """
+    분 단위 피처를 경기 batch_matches 개 단위로 yield → (row 를 만든 match 경로 리스트, DataFrame).
+    메모리에는 현재 배치의 row 만 남는다.
+    에러 난 경기는 중간까지 만든 row 를 버리고 경로도 기록하지 않는다 → resume 때 다시 시도.
+    """
+    rows = []
+    sources = []
+    n_processed = 0
+    for idx in tqdm(range(len(match_paths)), desc="Streaming Matches"):
+        n_before = len(rows)
+        if _process_match(idx, match_paths[idx], timeline_paths[idx], rows) and len(rows) > n_before:
+            sources.append(match_paths[idx])
+        else:
+            del rows[n_before:]
+        n_processed += 1
+        if n_processed >= batch_matches:
+            yield sources, rows_to_frame(rows)
+            rows, sources, n_processed = [], [], 0
+
+    if n_processed:
+        yield sources, rows_to_frame(rows)
+
+
+def _part_files(dataset_dir):
+    if not os.path.isdir(dataset_dir):
+        return []
+    return sorted(os.path.join(dataset_dir, n) for n in os.listdir(dataset_dir)
+                  if n.startswith("part-") and n.endswith(".parquet"))
+
+
+def processed_sources(dataset_dir=MINUTE_FEATURE_DATASET_DIR):
+    """이미 Dataset 에 저장된 match 경로 집합 (part 파일 footer 메타데이터만 읽음)"""
+    done = set()
+    for path in _part_files(dataset_dir):
+        meta = pq.read_schema(path).metadata or {}
+        done.update(json.loads(meta.get(SOURCE_PATHS_META_KEY, b"[]")))
+    return done
+
+
+def append_feature_batches(batches, dataset_dir=MINUTE_FEATURE_DATASET_DIR):
+    """
+    iter_minute_features 배치를 dataset_dir/part-*.parquet 로 하나씩 추가 (임시 파일 → 교체).
+    part 이름은 (순번, 배치 원본 해시) 라서 저장 직후 죽고 다시 돌려도 같은 파일을 덮어쓴다.
+    반환값: 저장한 row 수
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    existing = _part_files(dataset_dir)
+    schema = pq.read_schema(existing[0]).remove_metadata() if existing else None
+    seq = len(existing)
+    total = 0
+
+    for sources, df in batches:
+        if df.empty:  # 전부 에러난 배치는 기록하지 않음 (다음 실행에서 다시 시도)
             continue
-
-    df = pd.DataFrame(rows)
-    df.to_csv(MINUTE_FEATURE_CSV, index=False)
-    return df
\ No newline at end of file
+        table = pa.Table.from_pandas(to_storage_frame(df), schema=schema, preserve_index=False)
+        schema = schema or table.schema.remove_metadata()
+        table = table.replace_schema_metadata({SOURCE_PATHS_META_KEY: json.dumps(sources).encode("utf-8")})
+
+        digest = hashlib.sha256("\n".join(sources).encode("utf-8")).hexdigest()[:16]
+        part_path = os.path.join(dataset_dir, f"part-{seq:06d}-{digest}.parquet")
+        tmp_path = part_path + ".tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, part_path)
+
+        seq += 1
+        total += len(df)
+
+    return total
+
+
+def extract_minute_features_streaming(match_paths, timeline_paths, dataset_dir=MINUTE_FEATURE_DATASET_DIR,
+                                      batch_matches=64, resume=True):
+    """
+    메모리 사용량이 데이터 크기와 무관한 피처 추출.
+    결과는 DataFrame 대신 dataset_dir 에 쌓이며 load_minute_features() 로 읽는다.
+    resume=True 면 이미 저장된 경기는 건너뛴다.
+    """
+    pairs = list(zip(match_paths, timeline_paths))
+    if resume:
+        done = processed_sources(dataset_dir)
+        pairs = [(m, t) for m, t in pairs if m not in done]
+        if done:
+            print(f"⏭️ 이미 저장된 경기 {len(done)}개 skip, 남은 경기 {len(pairs)}개")
+
+    todo_matches = [m for m, _ in pairs]
+    todo_timelines = [t for _, t in pairs]
+    n_rows = append_feature_batches(iter_minute_features(todo_matches, todo_timelines, batch_matches), dataset_dir)
+    print(f"✔ 분 단위 피처 {n_rows} rows 추가 → {dataset_dir}")
+    return n_rows
+
+
+def load_minute_features(dataset_dir=MINUTE_FEATURE_DATASET_DIR, columns=None):
+    """스트리밍 모드로 쌓은 피처 Dataset 로딩 (part 순서 = 처리 순서)"""
+    parts = _part_files(dataset_dir)
+    if not parts:
+        return rows_to_frame([]) if columns is None else rows_to_frame([])[columns]
+    return apply_feature_schema(pd.concat([pd.read_parquet(p, columns=columns) for p in parts], ignore_index=True))
@@ -0,0 +1,210 @@
+"""
+feature_registry.py
+분 단위 피처 선언 (입력 / 의존 피처 / 계산식) + 모델별 사용 피처 맵
+
+각 피처는 register() 로
+- inputs : 필요한 원천 데이터  "frame:<컬럼>" (participant_frames), "event:<카운터>" (events 누적),
+           "static:<컬럼>" (participants), "team:kills" (팀 킬 누적)
+- deps   : 먼저 계산돼 있어야 하는 다른 피처
+- compute: (src, out) → 배열   src = 엔진이 준비한 원천 데이터, out = 이미 계산된 피처
+를 선언한다. feature_closure() 로 요청 피처의 의존성 closure 를 구하면
+feature_vectorized 엔진은 그 closure 에 필요한 원천 데이터(이벤트 카운터 등)만 계산한다.
+※ 선택 계산은 벡터화 엔진(extract_minute_features_columnar(features=...))에만 있다.
+  루프 엔진(feature_extract) 과 그 결과를 쌓는 feature_store 는 항상 전체 스키마를 만든다
+  (저장소 row 는 모든 모델 / 정규화가 같이 쓰므로 피처 일부만 저장하지 않음).
+
+새 피처 추가 = 여기 register() 한 줄 + (모델에 쓸 거라면) LANE_FEATURE_MAP 수정.
+LANE_FEATURE_MAP / SUPPORT_END_FEATURES 는 model_training / scoring 이 같이 import 한다.
+"""
+
+import pandas as pd
+
+from src.derived_metrics import DERIVED_METRICS
+
+FEATURES = {}
+
+# 항상 같이 나가는 식별 / 타깃 컬럼
+META_FEATURES = ["match_id", "minute", "pid", "team_id", "champion", "lane", "support_role",
+                 "target_gold", "duration_min"]
+
+LANE_RENAME = {"BOTTOM": "ADC", "UTILITY": "SUPPORT"}
+
+
+def register(name, compute, inputs=(), deps=()):
+    FEATURES[name] = {"inputs": tuple(inputs), "deps": tuple(deps), "compute": compute}
+
+
+def _column(col):
+    return lambda src, out: src["rows"][col].to_numpy()
+
+
+def _int_column(col):
+    return lambda src, out: src["rows"][col].astype("int64").to_numpy()
+
+
+def _counter(stat):
+    return lambda src, out: src["counters"][stat].to_numpy()
+
+
+def _minute_diff(accum):
+    """직전 row 누적값과의 차이 (같은 match, pid 안에서 / 첫 row 는 0 기준)"""
+    def compute(src, out):
+        values = pd.Series(out[accum])
+        return values.groupby(src["group_id"]).diff().fillna(values).astype("int64").to_numpy()
+    return compute
+
+
+def _derived(metric):
+    """derived_metrics 의 계산식을 이미 계산된 기본 피처(out) 에 적용"""
+    return lambda src, out: DERIVED_METRICS[metric]["compute"](out)
+
+
+# ---- 메타 ----
+register("match_id", _column("match_id"))
+register("minute", _int_column("minute"), inputs=["frame:minute"])
+register("pid", _int_column("pid"))
+register("team_id", _int_column("team_id"), inputs=["static:team_id"])
+register("champion", _column("champion_name"), inputs=["static:champion_name"])
+register("lane", lambda src, out: src["rows"]["team_position"].replace(LANE_RENAME).to_numpy(),
+         inputs=["static:team_position"])
+register("support_role", lambda src, out: src["support_role"], inputs=["static:champion_name"])
+register("target_gold", _column("gold_earned"), inputs=["static:gold_earned"])
+register("duration_min", lambda src, out: src["rows"]["game_duration"].astype("int64").to_numpy() // 60,
+         inputs=["static:game_duration"])
+
+# ---- 프레임 스탯 ----
+for _name in ["cs", "jungle_cs", "xp", "level", "dmg_champ", "dmg_taken", "heal", "cc_time"]:
+    register(_name, _int_column(_name), inputs=[f"frame:{_name}"])
+register("team_total_kills", lambda src, out: src["team_total_kills"], inputs=["team:kills"])
+
+# ---- 이벤트 누적 ----
+for _name, _stat in [("ward_place_accum", "ward_place"), ("ward_kill_accum", "ward_kill"),
+                     ("kills_accum", "kills"), ("deaths_accum", "deaths"), ("assists_accum", "assists"),
+                     ("obj_takes_accum", "obj_takes"), ("gank_ka_accum", "gank_ka"),
+                     ("roam_ka_accum", "roam_ka")]:
+    register(_name, _counter(_stat), inputs=[f"event:{_stat}"])
+
+register("kills_minute", _minute_diff("kills_accum"), deps=["kills_accum"])
+register("deaths_minute", _minute_diff("deaths_accum"), deps=["deaths_accum"])
+register("assists_minute", _minute_diff("assists_accum"), deps=["assists_accum"])
+
+# ---- 경기 종료 기준 정적 값 ----
+for _name, _col in [("turret_plates_taken", "turret_plates_taken"), ("turret_takedowns_accum", "turret_takedowns"),
+                    ("solo_kills_accum", "solo_kills"), ("split_push_time", "split_push_time"),
+                    ("total_time_dead", "total_time_dead"), ("team_damage_percent", "team_damage_percent")]:
+    register(_name, _column(_col), inputs=[f"static:{_col}"])
+
+# ---- 파생 비율 (계산식은 derived_metrics, 기본 피처에만 의존) ----
+for _name, _spec in DERIVED_METRICS.items():
+    register(_name, _derived(_name), deps=_spec["inputs"])
+
+# ============================================================
+# 모델별 사용 피처 (model_training / scoring 공용)
+# ============================================================
+LANE_FEATURE_MAP = {
+    "TOP": {"BASE": ["cs", "xp",
+                     "ward_place_accum", "ward_kill_accum",
+                     "dpm", "kills_accum", "deaths_accum",
+                     "assists_accum", "dmg_taken_per_death", "turret_plates_taken",
+                     "turret_takedowns_accum", "solo_kills_accum", "split_push_time",
+                     "cspm", "kills_per_min"  # 분당 비율 피처
+                     ],
+            "Early": ["solo_kills_accum"], "Late": ["split_push_time"],
+            "End": ["turret_dpm"]},
+
+    "JUNGLE": {
+        "BASE": ["jungle_cs", "xp",
+                 "ward_place_accum", "ward_kill_accum",
+                 "dpm", "kills_accum", "deaths_accum",
+                 "assists_accum", "obj_takes_accum", "gank_ka_accum",
+                 "kill_participation"  # 분당 비율 피처
+                 ],
+        "Early": ["gank_ka_accum"],
+        "Late": ["kill_participation"],
+        "End": ["obj_takes_accum"]},
+
+    "MID": {"BASE": ["cs", "xp",
+                     "ward_place_accum", "ward_kill_accum",
+                     "dpm", "kills_accum", "deaths_accum",
+                     "assists_accum", "roam_ka_accum", "turret_plates_taken",
+                     "cspm", "kill_participation"  # 분당 비율 피처
+                     ],
+            "Early": ["roam_ka_accum"], "Late": ["kill_participation"],
+            "End": ["dpm"]},
+
+    "ADC": {"BASE": ["cs", "xp",
+                     "ward_place_accum", "ward_kill_accum",
+                     "dpm", "kills_accum", "deaths_accum",
+                     "assists_accum", "dmg_taken_per_kill", "dmg_dealt_per_death",
+                     "total_time_dead",
+                     "cspm"  # 분당 비율 피처
+                     ],
+            "Early": ["cspm"], "Late": ["total_time_dead"],
+            "End": ["team_damage_percent"]},
+
+    "SUPPORT": {"BASE": [
+        "ward_place_accum", "ward_kill_accum",
+        "assists_accum", "roam_ka_accum",
+        "heal_per_min", "cc_per_min", "dpm", "kill_participation"  # 분당 비율 피처
+    ],
+        "Early": ["roam_ka_accum"],
+        "Late": ["ward_place_accum", "ward_kill_accum"],  # Late 시야 강화
+        "End": ["heal_per_min", "cc_per_min", "kills_per_min", "dpm"]}
+}
+
+# [정의] SUPPORT End Phase의 역할별 핵심 피처 맵 (오직 1개만 입력)
+SUPPORT_END_FEATURES = {
+    "Enchanter": ["heal_per_min"],
+    "Tank": ["cc_per_min"],
+    "Assassin": ["kills_per_min"],
+    "Damage": ["dpm"]
+}
+
+
+def model_features(lanes=None, include_support_end=True):
+    """LANE_FEATURE_MAP 기준 모델 입력 피처 (lanes=None 이면 전체 라인, 모든 phase 포함)"""
+    names = []
+    for lane, groups in LANE_FEATURE_MAP.items():
+        if lanes is not None and lane not in lanes:
+            continue
+        for group in groups.values():
+            names.extend(group)
+    if include_support_end and (lanes is None or "SUPPORT" in lanes):
+        for group in SUPPORT_END_FEATURES.values():
+            names.extend(group)
+    return list(dict.fromkeys(names))
+
+
+def feature_closure(names=None):
+    """
+    요청 피처 + 의존 피처 + 메타 컬럼을 계산 순서(의존성 먼저)로 반환.
+    names=None 이면 등록된 전체 피처.
+    """
+    requested = list(FEATURES) if names is None else META_FEATURES + list(names)
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name not in FEATURES:
+            raise KeyError(f"등록되지 않은 피처: {name}")
+        if name in visiting:
+            raise ValueError(f"피처 의존성 순환: {name}")
+        visiting.add(name)
+        for dep in FEATURES[name]["deps"]:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in requested:
+        visit(name)
+    return order
+
+
+def feature_inputs(names):
+    """closure 전체가 필요로 하는 원천 데이터 집합 ("event:kills" 등)"""
+    inputs = set()
+    for name in names:
+        inputs.update(FEATURES[name]["inputs"])
+    return inputs
@@ -0,0 +1,117 @@
+"""
+feature_schema.py
+분 단위 피처 테이블(minute_features) 의 고정 dtype 스키마
+
+- 문자열 컬럼(match_id, champion, lane, support_role) → category
+- 카운터 / 분 / pid                                  → int8 / int16 / int32
+- 비율 / 분당 값                                      → float32
+
+extract_minute_features 계열 함수는 모두 이 스키마로 결과를 돌려주고,
+CSV 를 다시 읽는 단계(normalization 등)도 apply_feature_schema 로 같은 dtype 을 복원한다.
+"""
+
+import pandas as pd
+
+# 컬럼 순서 = extract_minute_features 출력 순서
+MINUTE_FEATURE_DTYPES = {
+    "match_id": "category",
+    "minute": "int16",
+    "pid": "int8",
+    "team_id": "int16",
+    "champion": "category",
+    "lane": "category",
+    "support_role": "category",
+    "target_gold": "int32",
+    "cs": "int16",
+    "jungle_cs": "int16",
+    "xp": "int32",
+    "level": "int8",
+    # 파생 비율 계산용 기본 값 (derived_metrics 를 다시 돌릴 때 사용)
+    "dmg_champ": "int32",
+    "dmg_taken": "int32",
+    "heal": "int32",
+    "cc_time": "int32",
+    "team_total_kills": "int16",
+    "ward_place_accum": "int16",
+    "ward_kill_accum": "int16",
+    "dpm": "float32",
+    "kills_accum": "int16",
+    "deaths_accum": "int16",
+    "assists_accum": "int16",
+    "kills_minute": "int16",
+    "deaths_minute": "int16",
+    "assists_minute": "int16",
+    "dmg_taken_per_death": "float32",
+    # challenges 값은 parquet 왕복 시 비어 있을 수 있어서 float (NaN 허용)
+    "turret_plates_taken": "float32",
+    "turret_takedowns_accum": "int16",
+    "solo_kills_accum": "float32",
+    "split_push_time": "float32",
+    "dmg_taken_per_kill": "float32",
+    "dmg_dealt_per_death": "float32",
+    "total_time_dead": "int32",
+    "team_damage_percent": "float32",
+    "cspm": "float32",
+    "heal_per_min": "float32",
+    "cc_per_min": "float32",
+    "kills_per_min": "float32",
+    "turret_dpm": "float32",
+    "obj_takes_accum": "int16",
+    "gank_ka_accum": "int16",
+    "roam_ka_accum": "int16",
+    "kill_participation": "float32",
+    "duration_min": "int16",
+}
+
+# spatial_features 가 만드는 위치 기반 피처 (attach_spatial_features 로 붙였을 때)
+SPATIAL_FEATURE_DTYPES = {
+    "zone": "category",
+    "dist_moved": "float32",
+    "dist_moved_accum": "float32",
+    "enemy_half_minutes_accum": "int16",
+    "off_lane_minutes_accum": "int16",
+    "ka_enemy_half_accum": "int16",
+    "ka_off_lane_accum": "int16",
+    "deaths_enemy_half_accum": "int16",
+}
+
+ALL_FEATURE_DTYPES = {**MINUTE_FEATURE_DTYPES, **SPATIAL_FEATURE_DTYPES}
+
+CATEGORY_COLUMNS = [c for c, t in ALL_FEATURE_DTYPES.items() if t == "category"]
+
+
+def _nullable(dtype):
+    """int16 → Int16 (결측이 있는 정수 컬럼용)"""
+    return dtype.capitalize() if dtype.startswith("int") else dtype
+
+
+def apply_feature_schema(df):
+    """
+    df 에 있는 피처 컬럼만 스키마 dtype 으로 변환 (없는 컬럼 / 추가 컬럼은 그대로).
+    정수 컬럼에 결측이 있으면 값을 바꾸지 않도록 nullable 정수(Int16 등) 로 둔다.
+    """
+    casts = {}
+    for col, dtype in ALL_FEATURE_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith("int") and df[col].isna().any():
+            dtype = _nullable(dtype)
+        if str(df[col].dtype) != dtype:
+            casts[col] = dtype
+    return df.astype(casts) if casts else df
+
+
+def to_storage_frame(df):
+    """
+    Parquet part 저장용: category → 문자열.
+    배치마다 category 사전 크기가 달라도 part 간 스키마가 같도록 (읽을 때 apply_feature_schema 로 복원).
+    """
+    cols = [c for c in CATEGORY_COLUMNS if c in df.columns]
+    return df.astype({c: "object" for c in cols}) if cols else df
+
+
+def memory_report(df, label="minute_features"):
+    """DataFrame 메모리 사용량 출력 (deep=True, 문자열 포함)"""
+    mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"💾 {label}: {len(df):,} rows, {mb:.1f} MB")
+    return mb
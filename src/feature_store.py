@@ -0,0 +1,222 @@
+"""
+feature_store.py
+분 단위 피처 증분 저장소 (match_id 단위)
+
+data/feature_store/
+  ├─ part-v{버전}-{실행시각}-{샤드}.parquet   (피처 row, 여러 경기 묶음)
+  └─ _manifest.parquet                        (match_id → 피처 버전, 원본 지문, part 파일, row 수, 패치)
+
+입력은 통합 Parquet Dataset(load_data.convert_json_to_dataset, 기본) 또는 경기별 parquet 파일 쌍.
+
+update_feature_store() 는
+- 저장소에 없는 경기            → missing (추출)
+- 피처 버전(FEATURE_VERSION)이 다름 → stale   (해당 경기만 재추출)
+- 원본이 바뀜 (Dataset: 최신 ingest_tag / 파일: 크기·mtime) → changed (재적재된 경기 재추출)
+- 그 외                          → 그대로 사용
+로 나눠서 필요한 경기만 extract 하고 part 를 추가한다.
+재추출된 경기의 이전 row 는 manifest 에서 빠지므로 읽을 때 자동으로 무시되고,
+살아있는 경기가 하나도 없는 part 는 정리된다.
+
+저장소는 항상 전체 피처 스키마를 저장한다 (feature_registry 의 피처 선택은 적용하지 않음).
+일부 피처만 필요하면 load_feature_store(columns=...) 로 읽을 컬럼을 줄인다.
+"""
+
+import os
+
+import pandas as pd
+
+from src.feature_extract import (
+    FEATURE_VERSION,
+    MINUTE_FEATURE_SORT_KEYS,
+    SHARD_SIZE,
+    _dataset_shard_task,
+    _feature_shard_task,
+    rows_to_frame,
+)
+from src.feature_schema import apply_feature_schema
+from src.load_data import pair_dataset, parallel_map, report_failures
+from src.manifest import stat_source
+
+try:
+    from src.config import FEATURE_STORE_DIR
+except ImportError:
+    FEATURE_STORE_DIR = "data/feature_store"
+
+STORE_MANIFEST_NAME = "_manifest.parquet"
+STORE_MANIFEST_COLUMNS = ["match_id", "feature_version", "source_fingerprint", "part", "n_rows", "game_version",
+                          "match_path", "materialized_at"]
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, STORE_MANIFEST_NAME)
+
+
+def load_store_manifest(store_dir=FEATURE_STORE_DIR):
+    """저장소 manifest → {match_id: row dict}"""
+    path = _manifest_path(store_dir)
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_parquet(path)
+    return {row["match_id"]: row for row in df.to_dict("records")}
+
+
+def save_store_manifest(manifest, store_dir=FEATURE_STORE_DIR):
+    """임시 파일에 쓴 뒤 교체"""
+    os.makedirs(store_dir, exist_ok=True)
+    df = pd.DataFrame(list(manifest.values()), columns=STORE_MANIFEST_COLUMNS)
+    tmp_path = _manifest_path(store_dir) + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, _manifest_path(store_dir))
+
+
+def source_fingerprint(match_path, timeline_path):
+    """match / timeline 원본의 크기 + mtime → 문자열 지문 (parquet 이 다시 변환되면 달라짐)"""
+    return "|".join("{}:{}".format(*stat_source(path)) for path in (match_path, timeline_path))
+
+
+def pair_fingerprints(pairs):
+    """pairs → {match_id: 원본 지문} (Dataset 은 최신 ingest_tag 쌍, 파일은 source_fingerprint)"""
+    if "match_path" in pairs.columns:
+        values = [source_fingerprint(m, t) for m, t in zip(pairs["match_path"], pairs["timeline_path"])]
+    else:
+        values = [f"{m}|{t}" for m, t in zip(pairs["match_tag"], pairs["timeline_tag"])]
+    return dict(zip(pairs["match_id"], values))
+
+
+def plan_store_update(match_ids, manifest, feature_version=FEATURE_VERSION, rebuild_match_ids=None,
+                      fingerprints=None):
+    """
+    추출이 필요한 경기 선별.
+    fingerprints: {match_id: source_fingerprint} (주면 저장된 지문과 다른 경기를 changed 로 재추출,
+                  지문이 없는 예전 manifest 항목도 changed)
+    반환값: {"extract": [...], "missing": n, "stale": n, "changed": n, "rebuild": n, "fresh": n}
+    """
+    rebuild = set(rebuild_match_ids or [])
+    plan = {"extract": [], "missing": 0, "stale": 0, "changed": 0, "rebuild": 0, "fresh": 0}
+
+    for match_id in match_ids:
+        entry = manifest.get(match_id)
+        if entry is None:
+            plan["missing"] += 1
+        elif entry["feature_version"] != feature_version:
+            plan["stale"] += 1
+        elif fingerprints is not None and entry.get("source_fingerprint") != fingerprints.get(match_id):
+            plan["changed"] += 1
+        elif match_id in rebuild:
+            plan["rebuild"] += 1
+        else:
+            plan["fresh"] += 1
+            continue
+        plan["extract"].append(match_id)
+
+    return plan
+
+
+def _cleanup_parts(manifest, store_dir):
+    """manifest 가 더 이상 가리키지 않는 part 삭제"""
+    live = {entry["part"] for entry in manifest.values()}
+    for name in os.listdir(store_dir):
+        if name.startswith("part-") and name not in live:
+            os.remove(os.path.join(store_dir, name))
+
+
+def update_feature_store(pairs=None, store_dir=FEATURE_STORE_DIR, feature_version=FEATURE_VERSION,
+                         workers=None, shard_size=SHARD_SIZE, rebuild_match_ids=None):
+    """
+    새 경기 / 버전이 바뀐 경기 / 원본이 바뀐 경기만 피처 추출해서 저장소에 추가.
+    pairs: load_data.pair_dataset 결과 DataFrame[match_id, game_version, match_tag, timeline_tag]
+           → 워커가 통합 Dataset 에서 payload 를 직접 읽음 (None 이면 Dataset 전체)
+           또는 DataFrame[match_id, match_path, timeline_path] (pair_by_match_id, 경기별 parquet)
+    rebuild_match_ids: 버전과 무관하게 강제로 다시 뽑을 경기
+    pairs 에 game_version 이 있으면 manifest 에 같이 기록 → norm_state.match_segments 가 패치로 사용
+    반환값: 이번에 추가한 경기 수
+    """
+    if pairs is None:
+        pairs, _ = pair_dataset()
+    from_files = "match_path" in pairs.columns
+
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = load_store_manifest(store_dir)
+    # 추출 전에 지문을 떠 둠 → 추출 도중 원본이 바뀌면 다음 실행에서 다시 changed 로 잡힘
+    fingerprints = pair_fingerprints(pairs)
+    plan = plan_store_update(pairs["match_id"], manifest, feature_version, rebuild_match_ids, fingerprints)
+    print(f"🗄️ 피처 저장소 v{feature_version}: 추출 {len(plan['extract'])}경기 "
+          f"(missing {plan['missing']}, stale {plan['stale']}, changed {plan['changed']}, "
+          f"rebuild {plan['rebuild']}) | "
+          f"재사용 {plan['fresh']}경기")
+
+    if not plan["extract"]:
+        return 0
+
+    todo = pairs[pairs["match_id"].isin(set(plan["extract"]))].reset_index(drop=True)
+    run_tag = pd.Timestamp.now().strftime("%Y%m%d%H%M%S%f")
+    tasks = []
+    for shard_idx, start in enumerate(range(0, len(todo), shard_size)):
+        chunk = todo.iloc[start:start + shard_size]
+        part = f"part-v{feature_version}-{run_tag}-{shard_idx:05d}.parquet"
+        sources = list(zip(chunk["match_path"], chunk["timeline_path"])) if from_files else \
+            chunk["match_id"].tolist()
+        tasks.append((shard_idx, start, sources, os.path.join(store_dir, part)))
+
+    failures = []
+    added = 0
+    now = pd.Timestamp.now().isoformat(timespec="seconds")
+    paths_by_id = dict(zip(todo["match_id"], todo["match_path"])) if from_files else {}
+    versions_by_id = dict(zip(todo["match_id"], todo["game_version"])) if "game_version" in todo.columns else {}
+    shard_task = _feature_shard_task if from_files else _dataset_shard_task
+
+    for shard_idx, n_rows, err in parallel_map(shard_task, tasks, workers=workers, chunksize=1,
+                                               desc="Feature Store"):
+        part_path = tasks[shard_idx][3]
+        if err is not None:
+            failures.append({"path": part_path, "error": err})
+            continue
+
+        # 에러 난 경기는 워커가 row 를 버려서 part 에 없으므로 기록되지 않음 → 다음 실행에서 다시 시도
+        counts = pd.read_parquet(part_path, columns=["match_id"])["match_id"].value_counts()
+        for match_id, n in counts.items():
+            manifest[match_id] = {
+                "match_id": match_id,
+                "feature_version": feature_version,
+                "source_fingerprint": fingerprints.get(match_id),
+                "part": os.path.basename(part_path),
+                "n_rows": int(n),
+                "game_version": versions_by_id.get(match_id),
+                "match_path": paths_by_id.get(match_id),
+                "materialized_at": now,
+            }
+            added += 1
+
+    save_store_manifest(manifest, store_dir)
+    _cleanup_parts(manifest, store_dir)
+    report_failures(failures)
+    print(f"✔ 피처 저장소 갱신: {added}경기 추가 (총 {len(manifest)}경기)")
+    return added
+
+
+def load_feature_store(store_dir=FEATURE_STORE_DIR, match_ids=None, columns=None):
+    """
+    저장소에서 살아있는 row 만 로딩 → (match_id, minute, pid) 정렬 DataFrame (feature_schema dtype).
+    match_ids 를 주면 해당 경기만 읽는다.
+    """
+    manifest = load_store_manifest(store_dir)
+    if match_ids is not None:
+        wanted = set(match_ids)
+        manifest = {k: v for k, v in manifest.items() if k in wanted}
+
+    ids_by_part = {}
+    for match_id, entry in manifest.items():
+        ids_by_part.setdefault(entry["part"], []).append(match_id)
+
+    frames = []
+    for part in sorted(ids_by_part):
+        frames.append(pd.read_parquet(os.path.join(store_dir, part), columns=columns,
+                                      filters=[("match_id", "in", ids_by_part[part])]))
+
+    if not frames:
+        empty = rows_to_frame([])
+        return empty if columns is None else empty[columns]
+
+    df = apply_feature_schema(pd.concat(frames, ignore_index=True))
+    keys = [k for k in MINUTE_FEATURE_SORT_KEYS if k in df.columns]
+    return df.sort_values(keys, kind="stable").reset_index(drop=True) if keys else df
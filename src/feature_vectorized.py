@@ -0,0 +1,349 @@
+"""
+feature_vectorized.py
+분 단위 피처 추출 (벡터화 버전)
+
+feature_extract.extract_minute_features 는 경기 → 프레임 → 이벤트 → 참가자 순으로
+Python 루프를 돌면서 dict 누적값을 갱신한다.
+여기서는 columnar_tables 의 long 테이블 3종(participants / participant_frames / events)을 받아
+같은 값을 groupby / cumsum / merge_asof 로 한 번에 계산한다.
+
+루프와의 대응
+- 누적 카운터(kills, ward_place ...) : 이벤트를 (match, pid, frame_idx) 별 개수로 모은 뒤 cumsum,
+                                       각 프레임 row 에는 "그 프레임까지" 의 누적값을 붙인다 (merge_asof)
+- *_minute                          : 같은 (match, pid) 안에서 직전 row 누적값과의 차이
+- team_total_kills                  : 팀 단위로 같은 방식 (100/200 이 아닌 팀은 루프처럼 1)
+- 비율 피처                          : derived_metrics 의 계산식을 기본 피처 배열에 그대로 적용
+- 각 피처의 계산식 / 의존성은 feature_registry 에 선언돼 있고, 요청한 피처의 closure 만 계산한다
+
+출력 컬럼 / row 순서 (경기 순서 → frame_idx → pid) 는 루프와 동일하다.
+compare_engines() 로 같은 입력에 대해 두 엔진 결과가 일치하는지 확인할 수 있다.
+
+※ 파일별 Parquet 은 경기 안에서 challenges 키를 합집합으로 저장하기 때문에,
+  루프는 다른 참가자에게만 있는 키(splitPushTime 등)를 None(NaN) 으로 읽는다.
+  raw JSON 에서 만든 테이블은 같은 값을 0 으로 채우므로 이 부분만 다를 수 있다.
+  (tables_from_parquet_pairs 는 루프와 같은 입력을 쓰므로 완전히 일치)
+  통합 Dataset 은 raw JSON payload 를 그대로 저장하므로, Dataset payload 로 돌린 루프와
+  같은 변환이 기록한 parquet/tables 테이블(load_feature_tables)도 완전히 일치한다 (test.py STEP 2-1).
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.columnar_tables import (
+    EVENTS,
+    PARTICIPANT_FRAMES,
+    PARTICIPANTS,
+    TABLE_SCHEMAS,
+    match_tables,
+    record_to_doc,
+    timeline_tables,
+)
+from src.feature_extract import (
+    MINUTE_FEATURE_COLUMNS,
+    MINUTE_FEATURE_CSV,
+    RATIO_FEATURE_COLUMNS,
+    extract_minute_features,
+    get_support_role,
+)
+from src.feature_registry import FEATURES, feature_closure, feature_inputs
+from src.feature_schema import apply_feature_schema
+from src.load_data import NULLABLE_INT_TYPES, read_table
+
+# 루프의 accumulators 키 (1~10 번 참가자만 누적)
+ACCUM_PIDS = range(1, 11)
+
+ROAM_LANES = ["MIDDLE", "UTILITY", "SUPPORT"]
+GANK_LANES = ["JUNGLE"]
+
+COUNTER_STATS = ["kills", "deaths", "assists", "ward_place", "ward_kill", "roam_ka", "gank_ka", "obj_takes"]
+
+
+# ============================================================
+# 이벤트 → (match, pid, frame_idx, stat) 크레딧
+# ============================================================
+def _credits(events, id_col, stat, types, extra=()):
+    """events 중 types 에 해당하는 row 의 id_col 참가자에게 stat 1 씩 (extra 컬럼은 그대로 유지)"""
+    ev = events.loc[events["type"].isin(types), ["match_id", "frame_idx", *extra, id_col]]
+    ev = ev.rename(columns={id_col: "pid"})
+    ev = ev[ev["pid"].isin(ACCUM_PIDS)]
+    return ev.assign(stat=stat)
+
+
+def _assist_credits(events, stat, types, extra=()):
+    """assists 리스트를 펼쳐서 참가자마다 1 씩 (중복 id 도 루프처럼 각각 카운트)"""
+    ev = events.loc[events["type"].isin(types), ["match_id", "frame_idx", *extra, "assists"]]
+    ev = ev.explode("assists").rename(columns={"assists": "pid"})
+    ev = ev[ev["pid"].isin(ACCUM_PIDS)]
+    return ev.assign(stat=stat)
+
+
+def _event_credits(events, lanes, stats=COUNTER_STATS, extra=()):
+    """
+    루프의 accumulators 갱신 규칙을 그대로 옮긴 크레딧 테이블 (stats 에 있는 카운터만).
+    lanes: (match_id, pid) → teamPosition (roam / gank 판정용)
+    extra: 결과에 같이 남길 이벤트 컬럼 (예: event_timeline 의 "timestamp")
+    """
+    extra = tuple(extra)
+    stats = set(stats)
+    kill_types = ["CHAMPION_KILL"]
+    parts = []
+
+    if "ward_place" in stats:
+        parts.append(_credits(events, "creator_id", "ward_place", ["WARD_PLACED"], extra))
+    if "ward_kill" in stats:
+        parts.append(_credits(events, "killer_id", "ward_kill", ["WARD_KILL"], extra))
+    if "deaths" in stats:
+        parts.append(_credits(events, "victim_id", "deaths", kill_types, extra))
+    if "obj_takes" in stats:
+        parts.append(_credits(events, "killer_id", "obj_takes", ["ELITE_MONSTER_KILL"], extra))
+        parts.append(_assist_credits(events, "obj_takes", ["ELITE_MONSTER_KILL"], extra))
+
+    if stats & {"kills", "assists", "roam_ka", "gank_ka"}:
+        ka = pd.concat([
+            _credits(events, "killer_id", "kills", kill_types, extra),
+            _assist_credits(events, "assists", kill_types, extra),
+        ])
+        parts.append(ka[ka["stat"].isin(stats)])
+
+        # 킬/어시스트 관여 → 라인에 따라 roam / gank
+        if stats & {"roam_ka", "gank_ka"}:
+            ka = ka.merge(lanes, on=["match_id", "pid"], how="left")
+            if "roam_ka" in stats:
+                parts.append(ka.loc[ka["team_position"].isin(ROAM_LANES)].assign(stat="roam_ka"))
+            if "gank_ka" in stats:
+                parts.append(ka.loc[ka["team_position"].isin(GANK_LANES)].assign(stat="gank_ka"))
+
+    credits = pd.concat(parts, ignore_index=True)[["match_id", "frame_idx", *extra, "pid", "stat"]]
+    credits["pid"] = credits["pid"].astype("int64")
+    credits["frame_idx"] = credits["frame_idx"].astype("int64")
+    return credits
+
+
+def _cumulative(counts, keys):
+    """(keys, frame_idx) 별 개수 → keys 안에서 frame_idx 순 누적합"""
+    counts = counts.sort_values(keys + ["frame_idx"], kind="stable")
+    value_cols = [c for c in counts.columns if c not in keys + ["frame_idx"]]
+    counts[value_cols] = counts.groupby(keys, sort=False)[value_cols].cumsum()
+    return counts
+
+
+def _asof_join(rows, cum, keys, value_cols):
+    """각 row 에 같은 keys 의 frame_idx 이하 마지막 누적값을 붙인다 (없으면 0)"""
+    left = rows[["_row"] + keys + ["frame_idx"]].sort_values("frame_idx", kind="stable")
+    right = cum.sort_values("frame_idx", kind="stable")
+    joined = pd.merge_asof(left, right, on="frame_idx", by=keys, direction="backward")
+    joined = joined.set_index("_row").reindex(rows["_row"])
+    return joined[value_cols].fillna(0).astype("int64").to_numpy()
+
+
+# ============================================================
+# 메인: 테이블 3종 → 분 단위 피처
+# ============================================================
+def extract_minute_features_vectorized(participants, frames, events, match_order=None, features=None):
+    """
+    participants / participant_frames / events DataFrame → 분 단위 피처 (extract_minute_features 와 동일 컬럼).
+    match_order 를 주면 그 순서로, 없으면 match_id 정렬 순서로 경기를 나열한다.
+
+    features 를 주면 그 피처들 + 의존 피처 + 메타 컬럼만 계산한다 (feature_registry 참고).
+    예: features=model_features(["JUNGLE"]) → 정글 모델에 필요한 컬럼만, 필요 없는 이벤트 카운터는 건너뜀.
+    """
+    names = feature_closure(features)
+    inputs = feature_inputs(names)
+
+    if match_order is None:
+        match_order = sorted(participants["match_id"].unique())
+    order = pd.Series(np.arange(len(match_order)), index=pd.Index(match_order))
+
+    static = participants[[
+        "match_id", "pid", "team_id", "team_position", "champion_name", "gold_earned",
+        "total_time_dead", "turret_takedowns", "game_duration", "turret_plates_taken",
+        "split_push_time", "team_damage_percent", "solo_kills",
+    ]].copy()
+    static[["pid", "team_id"]] = static[["pid", "team_id"]].astype("int64")
+    static = static[static["match_id"].isin(order.index)]
+
+    # 참가자 정보가 있는 pid 의 프레임만 (루프의 pid_to_puuid 체크)
+    frames = frames.assign(pid=frames["pid"].astype("int64"))
+    rows = frames.merge(static, on=["match_id", "pid"], how="inner", sort=False)
+    rows["frame_idx"] = rows["frame_idx"].astype("int64")
+    rows["_order"] = order.reindex(rows["match_id"]).to_numpy()
+    rows = rows.sort_values(["_order", "frame_idx", "pid"], kind="stable").reset_index(drop=True)
+    rows["_row"] = np.arange(len(rows))
+
+    champion = rows["champion_name"]
+    src = {
+        "rows": rows,
+        "minute_safe": np.maximum(1, rows["minute"].astype("int64").to_numpy()),
+        "group_id": rows.groupby(["match_id", "pid"], sort=False).ngroup().to_numpy(),
+        "support_role": champion.map({c: get_support_role(c) for c in champion.unique()}).to_numpy(),
+    }
+
+    # ---- 이벤트 누적 카운터 (closure 에 필요한 것만) ----
+    events = events[events["match_id"].isin(order.index)]
+    stats = [s for s in COUNTER_STATS if f"event:{s}" in inputs]
+    if stats:
+        credits = _event_credits(events, static[["match_id", "pid", "team_position"]], stats)
+        counts = (credits.groupby(["match_id", "pid", "frame_idx", "stat"]).size()
+                  .unstack("stat", fill_value=0)
+                  .reindex(columns=stats, fill_value=0)
+                  .reset_index())
+        cum = _cumulative(counts, ["match_id", "pid"])
+        src["counters"] = pd.DataFrame(_asof_join(rows, cum, ["match_id", "pid"], stats), columns=stats)
+
+    # 팀 킬 누적 (킬러가 참가자 목록에 있을 때만)
+    if "team:kills" in inputs:
+        kills = events.loc[events["type"] == "CHAMPION_KILL", ["match_id", "frame_idx", "killer_id"]].dropna()
+        kills = kills.assign(pid=kills["killer_id"].astype("int64"), frame_idx=kills["frame_idx"].astype("int64"))
+        kills = kills.merge(static[["match_id", "pid", "team_id"]], on=["match_id", "pid"])
+        team_counts = kills.groupby(["match_id", "team_id", "frame_idx"]).size().rename("team_kills").reset_index()
+        team_cum = _cumulative(team_counts, ["match_id", "team_id"])
+        team_kills = _asof_join(rows, team_cum, ["match_id", "team_id"], ["team_kills"])[:, 0]
+        src["team_total_kills"] = np.where(rows["team_id"].isin([100, 200]), team_kills, 1)
+
+    # ---- 피처 계산 (의존성 순서) ----
+    out = {}
+    for name in names:
+        out[name] = FEATURES[name]["compute"](src, out)
+
+    columns = [c for c in MINUTE_FEATURE_COLUMNS if c in out]
+    return apply_feature_schema(pd.DataFrame({c: out[c] for c in columns}))
+
+
+FRAME_KEY_COLUMNS = ["match_id", "frame_idx", "minute", "pid"]
+EVENT_COLUMNS = ["match_id", "frame_idx", "type", "killer_id", "victim_id", "creator_id", "assists"]
+
+
+def load_feature_tables(match_ids=None, features=None):
+    """
+    parquet/tables 에서 피처 추출에 필요한 테이블 3종 로딩.
+    features 를 주면 closure 에 필요한 프레임 컬럼만 읽고, 이벤트가 필요 없으면 events 는 읽지 않는다.
+    """
+    if features is None:
+        return (
+            read_table(PARTICIPANTS, match_ids=match_ids),
+            read_table(PARTICIPANT_FRAMES, match_ids=match_ids),
+            read_table(EVENTS, match_ids=match_ids),
+        )
+
+    inputs = feature_inputs(feature_closure(features))
+    frame_cols = FRAME_KEY_COLUMNS + sorted({i.split(":", 1)[1] for i in inputs if i.startswith("frame:")}
+                                            - set(FRAME_KEY_COLUMNS))
+    need_events = any(i.startswith(("event:", "team:")) for i in inputs)
+    events = read_table(EVENTS, match_ids=match_ids, columns=EVENT_COLUMNS) if need_events else \
+        TABLE_SCHEMAS[EVENTS].empty_table().select(EVENT_COLUMNS).to_pandas(types_mapper=NULLABLE_INT_TYPES.get)
+    return (
+        read_table(PARTICIPANTS, match_ids=match_ids),
+        read_table(PARTICIPANT_FRAMES, match_ids=match_ids, columns=frame_cols),
+        events,
+    )
+
+
+def extract_minute_features_columnar(match_ids=None, output_path=MINUTE_FEATURE_CSV, features=None):
+    """
+    convert_json_to_dataset 으로 만든 테이블 → 분 단위 피처 (CSV 저장은 루프 버전과 동일)
+    features 를 주면 그 피처의 closure 만 계산한다 (루프 엔진 / feature_store 에는 없는 기능)
+    """
+    participants, frames, events = load_feature_tables(match_ids, features)
+    df = extract_minute_features_vectorized(participants, frames, events, match_order=match_ids, features=features)
+    if output_path:
+        df.to_csv(output_path, index=False)
+    return df
+
+
+# ============================================================
+# 루프 버전과 비교 / 벤치마크
+# ============================================================
+def tables_from_parquet_pairs(match_paths, timeline_paths):
+    """
+    파일별 Parquet 쌍 → 테이블 3종 (+ 경기 순서).
+    루프와 완전히 같은 입력(parquet 왕복을 거친 값)에서 비교하기 위해 사용한다.
+    """
+    parts = {PARTICIPANTS: [], PARTICIPANT_FRAMES: [], EVENTS: []}
+    order = []
+    for match_path, timeline_path in zip(match_paths, timeline_paths):
+        match_doc = record_to_doc(pd.read_parquet(match_path).iloc[0].to_dict())
+        timeline_doc = record_to_doc(pd.read_parquet(timeline_path).iloc[0].to_dict())
+        parts[PARTICIPANTS].append(match_tables(match_doc)[PARTICIPANTS])
+        for name, table in timeline_tables(timeline_doc).items():
+            parts[name].append(table)
+        order.append(match_doc["metadata"]["matchId"])
+
+    def concat(name, **kwargs):
+        table = pa.concat_tables(parts[name]) if parts[name] else TABLE_SCHEMAS[name].empty_table()
+        return table.to_pandas(**kwargs)
+
+    # read_table 과 같은 dtype (events 는 nullable 정수)
+    return (concat(PARTICIPANTS), concat(PARTICIPANT_FRAMES),
+            concat(EVENTS, types_mapper=NULLABLE_INT_TYPES.get), order)
+
+
+def normalize_loop_output(df):
+    """비율 컬럼을 float64 로 맞춤 (이전 버전 루프 결과의 0-d ndarray(object) 도 비교 가능하게)"""
+    df = df.copy()
+    for col in RATIO_FEATURE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("float64")
+    return df
+
+
+def compare_engines(expected, actual):
+    """
+    두 엔진 결과 비교 → 차이 목록 (빈 리스트면 동일).
+    값은 dtype 과 무관하게 정확히 같아야 한다 (NaN 끼리는 같다고 봄).
+    """
+    expected = normalize_loop_output(expected).reset_index(drop=True)
+    actual = normalize_loop_output(actual).reset_index(drop=True)
+
+    diffs = []
+    if list(expected.columns) != list(actual.columns):
+        diffs.append(f"컬럼 불일치: {list(expected.columns)} vs {list(actual.columns)}")
+        return diffs
+    if len(expected) != len(actual):
+        diffs.append(f"row 수 불일치: {len(expected)} vs {len(actual)}")
+        return diffs
+
+    for col in expected.columns:
+        a = expected[col].to_numpy(dtype=object)
+        b = actual[col].to_numpy(dtype=object)
+        same = (a == b) | (pd.isna(a) & pd.isna(b))
+        if not same.all():
+            first = int(np.argmax(~same))
+            diffs.append(f"{col}: {int((~same).sum())}건 불일치 (예: row {first} {a[first]!r} vs {b[first]!r})")
+    return diffs
+
+
+def benchmark_engines(match_paths, timeline_paths):
+    """같은 경기들에 대해 루프 / 벡터화 엔진 실행 시간과 결과 일치 여부 출력"""
+    t0 = time.perf_counter()
+    loop_df = extract_minute_features(match_paths, timeline_paths, output_path=None)
+    loop_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    participants, frames, events, order = tables_from_parquet_pairs(match_paths, timeline_paths)
+    load_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vec_df = extract_minute_features_vectorized(participants, frames, events, match_order=order)
+    vec_sec = time.perf_counter() - t0
+
+    diffs = compare_engines(loop_df, vec_df)
+    print(f"⏱️ 루프      : {loop_sec:.2f}s ({len(loop_df)} rows)")
+    print(f"⏱️ 벡터화    : {vec_sec:.2f}s (+ 테이블 로딩 {load_sec:.2f}s)")
+    if vec_sec > 0:
+        print(f"   → 피처 계산 {loop_sec / vec_sec:.1f}x")
+    if diffs:
+        print("❌ 결과 불일치")
+        for d in diffs:
+            print(f"   - {d}")
+    else:
+        print("✅ 두 엔진 결과 동일")
+    return {"loop_sec": loop_sec, "vectorized_sec": vec_sec, "load_sec": load_sec, "diffs": diffs}
+
+
+if __name__ == "__main__":
+    from src.load_data import get_parquet_paths
+
+    benchmark_engines(*get_parquet_paths())
@@ -1,12 +1,82 @@
+import io
+import itertools
 import json
 import os
 import glob
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+from src.columnar_tables import EVENTS, TABLE_SCHEMAS, TABLE_SORT_KEYS, match_tables, timeline_tables
+from src.manifest import (
+    HashingReader,
+    file_hash,
+    load_manifest,
+    new_hasher,
+    plan_incremental,
+    record_conversion,
+    report_plan,
+    save_manifest,
+    source_info,
+)
+from src.raw_sources import (
+    doc_stem,
+    find_raw_docs,
+    find_shards,
+    is_shard,
+    iter_shard_members,
+    read_raw_bytes,
+    wrap_decompress,
+)
+from src.timeline_stream import stream_timeline_tables
 
 MATCH_JSON_DIR = "raw/match_data"
 TIMELINE_JSON_DIR = "raw/timeline_data"
+# 크롤러가 남긴 tar/zip 샤드 (match_*, timeline_* 문서가 섞여 있어도 됨)
+RAW_SHARD_DIR = "raw/shards"
 MATCH_PARQUET_DIR = "parquet/match"
 TIMELINE_PARQUET_DIR = "parquet/timeline"
+FAILURE_REPORT_CSV = "parquet/conversion_failures.csv"
+
+# 변환 이력 (원본 크기/mtime/해시 + 변환 스키마 버전)
+FILE_MANIFEST_PATH = "parquet/manifest_files.parquet"
+DATASET_MANIFEST_PATH = "parquet/manifest_dataset.parquet"
+# 출력 형식이 바뀌면 버전을 올린다 → 다음 실행에서 전체 재변환
+FILE_SCHEMA_VERSION = 1
+DATASET_SCHEMA_VERSION = 1
+
+# matchId → match/timeline parquet 경로 인덱스
+MATCH_INDEX_PATH = "parquet/match_index.parquet"
+
+# 통합 Dataset (경기당 파일 1개 대신 파티션별 대형 Parquet)
+MATCH_DATASET_DIR = "parquet/dataset/match"
+TIMELINE_DATASET_DIR = "parquet/dataset/timeline"
+MATCH_ROW_GROUP_SIZE = 1024     # 매치 JSON 은 작아서 row group 을 크게
+TIMELINE_ROW_GROUP_SIZE = 64    # 타임라인은 경기당 수 MB → row group 을 작게
+
+DATASET_SCHEMA = pa.schema([
+    ("match_id", pa.string()),
+    ("game_version", pa.string()),
+    ("game_creation", pa.int64()),
+    ("payload", pa.string()),
+    ("ingest_tag", pa.string()),
+])
+
+# 타입 고정 long 테이블 (participants / participant_frames / events)
+TABLE_DIR = "parquet/tables"
+TABLE_ROW_GROUP_SIZE = 256 * 1024
+NULLABLE_INT_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+}
+
+# "14.23" 이 숫자로 추론되지 않도록 파티션 타입을 고정
+DATASET_PARTITIONING = ds.partitioning(pa.schema([("game_version", pa.string())]), flavor="hive")
 
 
 def load_json(path):
@@ -14,45 +84,785 @@ def load_json(path):
         return json.load(f)
 
 
+def json_to_parquet(json_path, parquet_path, member=None):
+    """
+    JSON(.json/.json.gz/.json.zst) 1개 → Parquet 1개 변환, (원본 내용 해시, matchId) 반환
+    member: 샤드 멤버처럼 이미 압축 해제한 bytes 면 json_path 는 열지 않는다 (해시도 멤버 내용 기준)
+    """
+    file_bytes, raw = read_raw_bytes(json_path) if member is None else (member, member)
+    data = json.loads(raw)
+    df = pd.json_normalize(data)
+    df.to_parquet(parquet_path, index=False, compression="snappy")
+
+    hasher = new_hasher()
+    hasher.update(file_bytes)
+    return hasher.hexdigest(), data.get("metadata", {}).get("matchId")
+
+
+# ============================================================
+#  병렬 변환 (Process Pool)
+# ============================================================
+def _convert_task(task):
+    """
+    워커 프로세스에서 실행되는 단일 변환 작업.
+    예외를 밖으로 던지지 않고 (경로, 출력 경로, 원본 정보, 에러 메시지)로 돌려줘서
+    파일 하나가 깨져도 전체 변환이 멈추지 않게 한다.
+    source 가 샤드 멤버 ("샤드::멤버", bytes) 면 원본 정보는 None (manifest 는 샤드 단위로 기록)
+    """
+    source, parquet_path = task
+    json_path, member = (source, None) if isinstance(source, str) else source
+    try:
+        content_hash, match_id = json_to_parquet(json_path, parquet_path, member=member)
+        info = None
+        if member is None:
+            info = source_info(json_path, content_hash)
+            info["match_id"] = match_id
+        return json_path, parquet_path, info, None
+    except Exception as e:
+        return json_path, parquet_path, None, f"{type(e).__name__}: {e}"
+
+
+def resolve_workers(workers):
+    """workers=None/0 이면 CPU 코어 수 전부 사용"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _run_chunk(func, chunk):
+    return [func(task) for task in chunk]
+
+
+def _chunks(tasks, size):
+    chunk = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parallel_map(func, tasks, workers=1, chunksize=16, desc="Converting"):
+    """
+    tasks 에 func 를 적용한 결과를 입력 순서대로 yield.
+    workers=1 이면 현재 프로세스에서, 그 외에는 ProcessPoolExecutor 로 실행.
+    (func 는 pickle 가능한 모듈 최상위 함수여야 함)
+
+    tasks 는 리스트뿐 아니라 제너레이터(샤드 스트리밍)도 가능하다.
+    chunksize 개씩 묶어서 제출하고, 동시에 떠 있는 chunk 수를 workers*2 로 제한해서
+    제너레이터를 한 번에 다 소비하지 않는다.
+    """
+    workers = resolve_workers(workers)
+    total = len(tasks) if hasattr(tasks, "__len__") else None
+
+    if workers == 1:
+        yield from tqdm(map(func, tasks), total=total, desc=desc)
+        return
+
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=total, desc=f"{desc} (workers={workers})") as bar:
+        pending = deque()
+        for chunk in _chunks(tasks, max(1, chunksize)):
+            pending.append(executor.submit(_run_chunk, func, chunk))
+            if len(pending) >= max_pending:
+                results = pending.popleft().result()
+                bar.update(len(results))
+                yield from results
+
+        while pending:
+            results = pending.popleft().result()
+            bar.update(len(results))
+            yield from results
+
+
+def _iter_shard_file_tasks(shard_items, shard_done):
+    """
+    (manifest 키, 샤드 경로, 문서 종류, 출력 폴더) 목록 → 샤드 멤버 변환 작업을 하나씩 yield.
+    샤드는 드라이버에서 스트리밍으로 압축 해제하고, 멤버마다 parquet_dir/{멤버 stem}.parquet 로 저장한다.
+    샤드를 다 읽으면 shard_done 에 (manifest 키, 원본 정보, 출력 폴더) 를 추가.
+    """
+    for key, shard, kind, parquet_dir in shard_items:
+        with open(shard, "rb") as f:
+            # zip 은 seek 이 필요해서 해시를 따로 계산, tar 는 읽으면서 해시
+            reader = f if shard.endswith(".zip") else HashingReader(f)
+            for _, name, data in iter_shard_members(reader, shard, kinds=(kind,)):
+                yield (f"{shard}::{name}", data), os.path.join(parquet_dir, doc_stem(name) + ".parquet")
+            content_hash = file_hash(shard) if shard.endswith(".zip") else reader.hexdigest()
+        shard_done.append((key, source_info(shard, content_hash), parquet_dir))
+
+
+def _failed_shards(failures):
+    """실패 목록에서 멤버("샤드::멤버")가 실패한 샤드 경로 집합"""
+    return {str(f["path"]).split("::", 1)[0] for f in failures if "::" in str(f["path"])}
+
+
+def run_conversion_tasks(tasks, workers=1, chunksize=16, desc="Converting", manifest=None, shards=()):
+    """
+    (json_path, parquet_path) 작업 목록 + 샤드 목록을 변환하고 실패 목록을 반환.
+
+    - workers=1       : 기존처럼 현재 프로세스에서 순차 변환
+    - workers>1/None  : ProcessPoolExecutor 로 병렬 변환
+    - chunksize       : 워커에 한 번에 넘기는 작업 수 (IPC 오버헤드 감소)
+    - manifest        : 넘기면 성공한 파일을 변환 이력에 기록
+    - shards          : build_conversion_tasks 가 준 샤드 목록, 멤버를 풀어서 같은 워커로 변환한다
+                        (멤버가 하나라도 실패한 샤드는 기록하지 않음 → 다음 실행에서 샤드 전체를 다시 변환)
+
+    반환값: [{"path": ..., "error": ...}, ...]
+    """
+    failures = []
+    shard_done = []
+    all_tasks = itertools.chain(tasks, _iter_shard_file_tasks(shards, shard_done))
+
+    for json_path, parquet_path, info, err in parallel_map(_convert_task, all_tasks, workers, chunksize, desc):
+        if err is not None:
+            failures.append({"path": json_path, "error": err})
+        elif manifest is not None and info is not None:
+            record_conversion(manifest, json_path, info, FILE_SCHEMA_VERSION, output=parquet_path,
+                              match_id=info["match_id"])
+
+    if manifest is not None:
+        failed = _failed_shards(failures)
+        for key, info, parquet_dir in shard_done:
+            if key.rsplit("::", 1)[0] not in failed:
+                record_conversion(manifest, key, info, FILE_SCHEMA_VERSION, output=parquet_dir)
+
+    return failures
+
+
+def report_failures(failures, report_path=None):
+    """실패 파일 요약 출력 + (선택) CSV 리포트 저장"""
+    if not failures:
+        return
+
+    print(f"⚠️ 변환 실패 {len(failures)}건")
+    for f in failures[:10]:
+        print(f"   - {f['path']}: {f['error']}")
+    if len(failures) > 10:
+        print(f"   ... 외 {len(failures) - 10}건")
+
+    if report_path:
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        pd.DataFrame(failures).to_csv(report_path, index=False, encoding="utf-8-sig")
+        print(f"   -> 실패 리포트 저장: {report_path}")
+
+
+def build_conversion_tasks(json_dir, parquet_dir, prefix, manifest, shard_dir=RAW_SHARD_DIR):
+    """
+    {prefix}_*.json(.gz/.zst) 와 shard_dir 의 tar/zip 샤드 중 새로 생겼거나 내용이 바뀐 것만 작업 목록으로 생성.
+    (manifest 의 크기/mtime/해시로 판단, manifest 에 없는 파일만 원본보다 새 출력이 있으면 그대로 사용)
+    샤드는 {prefix} 별로 "샤드::{prefix}" 키로 기록돼서 match / timeline 을 따로 판단한다.
+    반환값: ([(json_path, parquet_path), ...], [(manifest 키, 샤드 경로, prefix, parquet_dir), ...])
+    """
+    def output_for(path):
+        # 샤드는 출력이 멤버 수만큼이라 seeded 판단을 하지 않는다
+        return None if is_shard(path) else os.path.join(parquet_dir, doc_stem(path) + ".parquet")
+
+    files = find_raw_docs(json_dir, prefix) + [(f"{s}::{prefix}", s) for s in find_shards(shard_dir)]
+    plan = plan_incremental(files, manifest, FILE_SCHEMA_VERSION, output_for=output_for)
+    report_plan(plan, prefix)
+
+    docs, shards = _split_plan(plan)
+    return [(path, output_for(path)) for path in docs], [(key, shard, prefix, parquet_dir) for key, shard in shards]
+
+
 # ============================================================
 #  JSON → Parquet 변환
 # ============================================================
-def convert_json_to_parquet():
+def convert_json_to_parquet(workers=1, chunksize=16, failure_report=FAILURE_REPORT_CSV,
+                            manifest_path=FILE_MANIFEST_PATH, shard_dir=RAW_SHARD_DIR):
+    """
+    raw JSON → 파일별 Parquet 변환.
+    workers=None 이면 모든 코어를 사용해서 병렬 변환한다.
+    shard_dir 의 tar/zip 샤드는 디스크에 풀지 않고 멤버마다 parquet/{match,timeline}/{stem}.parquet 로 변환한다.
+    manifest 기준으로 새로 생기거나 바뀐 파일만 변환한다.
+    반환값: 실패한 파일 목록
+    """
     os.makedirs(MATCH_PARQUET_DIR, exist_ok=True)
     os.makedirs(TIMELINE_PARQUET_DIR, exist_ok=True)
 
     print("🔄 JSON → Parquet 변환 시작...")
-    match_files = sorted(glob.glob(os.path.join(MATCH_JSON_DIR, "match_*.json")))
-    timeline_files = sorted(glob.glob(os.path.join(TIMELINE_JSON_DIR, "timeline_*.json")))
+    manifest = load_manifest(manifest_path)
+    match_tasks, match_shards = build_conversion_tasks(MATCH_JSON_DIR, MATCH_PARQUET_DIR, "match", manifest,
+                                                       shard_dir=shard_dir)
+    timeline_tasks, timeline_shards = build_conversion_tasks(TIMELINE_JSON_DIR, TIMELINE_PARQUET_DIR, "timeline",
+                                                             manifest, shard_dir=shard_dir)
+    tasks = match_tasks + timeline_tasks
+    shards = match_shards + timeline_shards
+
+    failures = run_conversion_tasks(tasks, workers=workers, chunksize=chunksize, desc="JSON → Parquet",
+                                    manifest=manifest, shards=shards)
+    save_manifest(manifest, manifest_path)
+    report_failures(failures, failure_report)
+
+    print(f"✔ JSON → Parquet 변환 완료! (파일 {len(tasks)}건 + 샤드 {len(shards)}개, 실패 {len(failures)}건)")
+    return failures
+
+
+# ============================================================
+#  통합 Parquet Dataset (game_version 파티션)
+# ============================================================
+# 매치/타임라인마다 파일 1개씩 만드는 대신, 수천 경기를 한 파일에 모아
+# parquet/dataset/{match,timeline}/game_version=14.23/part-*.parquet 로 저장한다.
+# 각 row = 경기 1개 (match_id, game_version, payload=원본 JSON 문자열)
+# row group 은 match_id 순으로 정렬돼 있어서 match_id 필터 시 통계로 pruning 된다.
+def _game_version_key(game_version):
+    """'14.23.636.5445' → '14.23' (패치 단위 파티션)"""
+    if not game_version:
+        return "unknown"
+    parts = str(game_version).split(".")
+    return ".".join(parts[:2])
+
+
+def _read_record_task(task):
+    """
+    워커에서 JSON 1개를 읽어 dataset row 로 변환.
+    emit_tables=True 면 타입 고정 long 테이블(columnar_tables)도 같이 만든다.
+    stream=True 인 타임라인은 문서 전체를 올리지 않고 스트리밍 파서로 테이블만 만든다 (payload=None).
+    반환값: (json_path, record, {테이블명: Table} 또는 None, 원본 정보, 에러 메시지) - 실패 시 에러 외 None
+    """
+    kind, source, emit_tables, stream = task
+
+    # source: 파일 경로(str) 또는 샤드 멤버 (멤버 이름, 압축 해제된 bytes)
+    member = None
+    json_path = source
+    if not isinstance(source, str):
+        json_path, member = source
+
+    try:
+        if kind == "timeline" and stream:
+            with (io.BytesIO(member) if member is not None else open(json_path, "rb")) as f:
+                reader = HashingReader(f)
+                # 압축 파일이면 해시는 원본(압축) 바이트 기준, 파싱은 해제 스트림 위에서
+                tables = stream_timeline_tables(wrap_decompress(reader, json_path) if member is None else reader)
+                content_hash = reader.hexdigest()
+            record = {"match_id": tables.pop("match_id"), "game_version": None,
+                      "game_creation": None, "payload": None}
+            info = source_info(json_path, content_hash) if member is None else None
+            return json_path, record, tables, info, None
+
+        if member is not None:
+            file_bytes = raw = member
+        else:
+            file_bytes, raw = read_raw_bytes(json_path)
+        hasher = new_hasher()
+        hasher.update(file_bytes)
+        payload = raw.decode("utf-8")
+        data = json.loads(payload)
+
+        match_id = data.get("metadata", {}).get("matchId")
+        if match_id is None:
+            raise ValueError("metadata.matchId 없음")
+
+        info = data.get("info", {})
+        record = {
+            "match_id": match_id,
+            "game_version": _game_version_key(info.get("gameVersion")) if kind == "match" else None,
+            "game_creation": info.get("gameCreation"),
+            "payload": payload,
+        }
+
+        tables = None
+        if emit_tables:
+            tables = match_tables(data) if kind == "match" else timeline_tables(data)
+
+        info = source_info(json_path, hasher.hexdigest()) if member is None else None
+        return json_path, record, tables, info, None
+    except Exception as e:
+        return json_path, None, None, None, f"{type(e).__name__}: {e}"
+
+
+def write_partitioned(table, dataset_dir, row_group_size, batch_tag, sort_keys=("match_id",)):
+    """
+    game_version 컬럼을 가진 Table 을 sort_keys 순으로 정렬해서 파티션별 part 파일로 추가.
+    같은 batch_tag 로 다시 쓰면 해당 part 파일을 덮어쓴다.
+    """
+    if table.num_rows == 0:
+        return
+
+    table = table.sort_by([(k, "ascending") for k in sort_keys])
+
+    ds.write_dataset(
+        table,
+        dataset_dir,
+        format="parquet",
+        partitioning=DATASET_PARTITIONING,
+        basename_template=f"part-{batch_tag}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=min(row_group_size, table.num_rows),
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+def write_dataset_batch(records, dataset_dir, row_group_size, batch_tag):
+    """경기 단위 record(payload 포함) 들을 통합 Dataset 에 추가"""
+    if not records:
+        return
+
+    df = pd.DataFrame(records)
+    df["game_version"] = df["game_version"].fillna("unknown").astype(str)
+    table = pa.Table.from_pandas(df, schema=DATASET_SCHEMA, preserve_index=False)
+    write_partitioned(table, dataset_dir, row_group_size, batch_tag)
+
+
+def _with_partition_cols(table, game_version, ingest_tag):
+    """long 테이블에 파티션 컬럼(game_version) + 적재 태그(ingest_tag) 부착"""
+    n = table.num_rows
+    table = table.append_column("ingest_tag", pa.array([ingest_tag] * n, pa.string()))
+    return table.append_column("game_version", pa.array([game_version] * n, pa.string()))
+
+
+def _latest_only(table):
+    """
+    같은 match_id 가 여러 번 적재된 경우(원본 수정 후 재변환) 가장 최근 ingest_tag 의 row 만 남긴다.
+    """
+    if "ingest_tag" not in table.column_names or table.num_rows == 0:
+        return table
+
+    keys = table.select(["match_id", "ingest_tag"]).to_pandas()
+    latest = keys.groupby("match_id")["ingest_tag"].transform("max")
+    if (keys["ingest_tag"] == latest).all():
+        return table
+    return table.filter(pa.array((keys["ingest_tag"] == latest).to_numpy()))
+
+
+def write_table_batch(tables_by_name, batch_tag):
+    """{"participants": [Table, ...], ...} 를 parquet/tables/<name> Dataset 에 추가"""
+    for name, tables in tables_by_name.items():
+        if not tables:
+            continue
+        table = pa.concat_tables(tables)
+        write_partitioned(table, os.path.join(TABLE_DIR, name), TABLE_ROW_GROUP_SIZE, batch_tag,
+                          sort_keys=TABLE_SORT_KEYS[name])
 
-    for path in match_files:
-        out_path = os.path.join(MATCH_PARQUET_DIR, os.path.basename(path).replace(".json", ".parquet"))
-        if not os.path.exists(out_path):
-            data = load_json(path)
-            df = pd.json_normalize(data)
-            df.to_parquet(out_path, index=False, compression="snappy")
 
-    for path in timeline_files:
-        out_path = os.path.join(TIMELINE_PARQUET_DIR, os.path.basename(path).replace(".json", ".parquet"))
-        if not os.path.exists(out_path):
-            data = load_json(path)
-            df = pd.json_normalize(data)
-            df.to_parquet(out_path, index=False, compression="snappy")
+def read_table(name, match_ids=None, match_id_range=None, columns=None):
+    """
+    타입 고정 long 테이블 로딩 (participants / participant_frames / events).
+    match_ids / match_id_range 필터는 read_dataset 과 동일.
+    """
+    dataset_dir = os.path.join(TABLE_DIR, name)
+    dataset = open_dataset(dataset_dir)
+    if dataset is None:
+        schema = TABLE_SCHEMAS[name]
+        return schema.empty_table().to_pandas() if columns is None else \
+            schema.empty_table().select(columns).to_pandas()
 
-    print("✔ JSON → Parquet 변환 완료!")
+    table = _read_latest(dataset, columns, _dataset_filter(match_ids, match_id_range))
+    keys = [k for k in TABLE_SORT_KEYS[name] if k in table.column_names]
+    if keys:
+        table = table.sort_by([(k, "ascending") for k in keys])
+
+    # events 의 killer_id / victim_id 등은 null 이 많아서 float 로 바뀌지 않게 nullable 정수로
+    if name == EVENTS:
+        return table.to_pandas(types_mapper=NULLABLE_INT_TYPES.get)
+    return table.to_pandas()
+
+
+def _read_latest(dataset, columns, filter_expr):
+    """필터 적용 후 최신 적재분만 남기고, 요청한 컬럼만 반환"""
+    read_cols = None
+    if columns is not None:
+        read_cols = list(dict.fromkeys(list(columns) + ["match_id", "ingest_tag"]))
+    table = _latest_only(dataset.to_table(columns=read_cols, filter=filter_expr))
+    return table.select(columns) if columns is not None else table.drop_columns(["ingest_tag"])
+
+
+def open_dataset(dataset_dir):
+    """hive 파티션 Dataset 열기 (없으면 None)"""
+    if not os.path.isdir(dataset_dir) or not glob.glob(os.path.join(dataset_dir, "**", "*.parquet"), recursive=True):
+        return None
+    return ds.dataset(dataset_dir, format="parquet", partitioning=DATASET_PARTITIONING)
+
+
+def _dataset_filter(match_ids=None, match_id_range=None):
+    expr = None
+    if match_ids is not None:
+        expr = ds.field("match_id").isin(list(match_ids))
+    if match_id_range is not None:
+        lo, hi = match_id_range
+        rng = (ds.field("match_id") >= lo) & (ds.field("match_id") <= hi)
+        expr = rng if expr is None else (expr & rng)
+    return expr
+
+
+def read_dataset(dataset_dir, match_ids=None, match_id_range=None, columns=None):
+    """
+    통합 Dataset 에서 경기 단위 row 로딩.
+    - match_ids      : 특정 경기들만 (1개도 가능)
+    - match_id_range : (시작 id, 끝 id) 범위 (양 끝 포함)
+    - 둘 다 None     : 전체
+    columns 로 필요한 컬럼만 읽을 수 있다 (예: ["match_id", "game_version"]).
+    """
+    dataset = open_dataset(dataset_dir)
+    if dataset is None:
+        return pd.DataFrame(columns=columns or DATASET_SCHEMA.names)
+
+    table = _read_latest(dataset, columns, _dataset_filter(match_ids, match_id_range))
+    df = table.to_pandas()
+    if "match_id" in df.columns:
+        df = df.sort_values("match_id", kind="stable").reset_index(drop=True)
+    return df
+
+
+def payload_to_record(payload):
+    """payload(JSON 문자열) → 기존 파일별 Parquet 과 같은 flatten dict (metadata.matchId, info.participants ...)"""
+    return pd.json_normalize(json.loads(payload)).iloc[0].to_dict()
+
+
+def load_match(match_id):
+    """경기 1개 로딩: (match dict, timeline dict), 없으면 None"""
+    m = read_dataset(MATCH_DATASET_DIR, match_ids=[match_id], columns=["match_id", "payload"])
+    t = read_dataset(TIMELINE_DATASET_DIR, match_ids=[match_id], columns=["match_id", "payload"])
+
+    match = payload_to_record(m["payload"].iloc[0]) if not m.empty and pd.notna(m["payload"].iloc[0]) else None
+    timeline = payload_to_record(t["payload"].iloc[0]) if not t.empty and pd.notna(t["payload"].iloc[0]) else None
+    return match, timeline
+
+
+def iter_dataset_records(dataset_dir, match_ids=None, match_id_range=None, batch_size=256):
+    """
+    Dataset 을 row group 배치 단위로 읽으면서 (match_id, flatten dict) 를 yield.
+    전체를 메모리에 올리지 않고 순회할 때 사용.
+    """
+    dataset = open_dataset(dataset_dir)
+    if dataset is None:
+        return
+
+    filter_expr = _dataset_filter(match_ids, match_id_range)
+
+    # payload 없이 (match_id, ingest_tag) 만 먼저 읽어서 match_id 별 최신 적재분 결정
+    keys = dataset.to_table(columns=["match_id", "ingest_tag"], filter=filter_expr).to_pandas()
+    latest = keys.groupby("match_id")["ingest_tag"].max().to_dict()
+
+    scanner = dataset.scanner(columns=["match_id", "ingest_tag", "payload"],
+                              filter=filter_expr, batch_size=batch_size)
+    for batch in scanner.to_batches():
+        ids = batch.column("match_id").to_pylist()
+        tags = batch.column("ingest_tag").to_pylist()
+        payloads = batch.column("payload").to_pylist()
+        for match_id, tag, payload in zip(ids, tags, payloads):
+            if payload is None or latest.get(match_id) != tag:  # 테이블 전용 row / 이전 적재분
+                continue
+            yield match_id, payload_to_record(payload)
+
+
+def _iter_dataset_tasks(kind, doc_paths, shard_items, emit_tables, stream, shard_done, skip_shards=()):
+    """
+    단일 문서 파일 → 샤드 멤버 순서로 변환 작업을 하나씩 만들어 낸다.
+    샤드는 드라이버에서 스트리밍으로 압축 해제하면서 멤버 bytes 를 워커로 넘긴다.
+    샤드를 다 읽으면 shard_done 에 (manifest 키, 원본 정보, 샤드 안의 문서 종류) 를 추가.
+    """
+    for path in doc_paths:
+        yield kind, path, emit_tables, stream
+
+    for key, shard in shard_items:
+        if shard in skip_shards:
+            shard_done.append((key, source_info(shard, file_hash(shard)), set()))
+            continue
+
+        seen_kinds = set()
+        with open(shard, "rb") as f:
+            # zip 은 seek 이 필요해서 해시를 따로 계산, tar 는 읽으면서 해시
+            reader = f if shard.endswith(".zip") else HashingReader(f)
+            for _, name, data in iter_shard_members(reader, shard, kinds=(kind,), seen_kinds=seen_kinds):
+                yield kind, (f"{shard}::{name}", data), emit_tables, stream
+            content_hash = file_hash(shard) if shard.endswith(".zip") else reader.hexdigest()
+        shard_done.append((key, source_info(shard, content_hash), seen_kinds))
+
+
+def _split_plan(plan):
+    """plan["convert"] → (단일 문서 경로 목록, 샤드 (키, 경로) 목록)"""
+    docs = [item for item in plan["convert"] if not isinstance(item, tuple)]
+    shards = [item for item in plan["convert"] if isinstance(item, tuple)]
+    return docs, shards
+
+
+def _collect_into_dataset(tasks, dataset_dir, row_group_size, batch_rows, workers, chunksize, desc,
+                          manifest, version_lookup=None):
+    """
+    tasks 를 병렬로 읽어 batch_rows 개씩 모아 Dataset 에 flush.
+    flush 가 끝난 파일만 manifest 에 기록한다 (중간에 죽으면 다음 실행에서 다시 변환).
+    반환값: (성공한 record 메타 목록, 실패 목록)
+    """
+    failures = []
+    written = []
+    buffer = []
+    pending = []
+    table_buffer = {}
+    run_tag = pd.Timestamp.now().strftime("%Y%m%d%H%M%S%f")
+    part_no = 0
+
+    def flush():
+        nonlocal part_no, buffer, table_buffer, pending
+        tag = f"{run_tag}-{desc}-{part_no:05d}"
+        write_dataset_batch(buffer, dataset_dir, row_group_size, tag)
+        write_table_batch(table_buffer, tag)
+        for json_path, info, match_id in pending:
+            if info is not None:
+                record_conversion(manifest, json_path, info, DATASET_SCHEMA_VERSION, output=dataset_dir,
+                                  match_id=match_id)
+        part_no += 1
+        buffer = []
+        pending = []
+        table_buffer = {}
+
+    for json_path, record, tables, info, err in parallel_map(_read_record_task, tasks, workers, chunksize, desc):
+        # 샤드 멤버(info=None)는 샤드 단위로 따로 manifest 에 기록
+        if err is not None:
+            failures.append({"path": json_path, "error": err})
+            continue
+
+        if version_lookup is not None:
+            record["game_version"] = version_lookup.get(record["match_id"], "unknown")
+        record["ingest_tag"] = run_tag
+
+        written.append({"match_id": record["match_id"], "game_version": record["game_version"]})
+        buffer.append(record)
+        pending.append((json_path, info, record["match_id"]))
+        for name, table in (tables or {}).items():
+            table_buffer.setdefault(name, []).append(
+                _with_partition_cols(table, record["game_version"] or "unknown", run_tag)
+            )
+
+        if len(buffer) >= batch_rows:
+            flush()
+
+    if buffer:
+        flush()
+
+    return written, failures
+
+
+def convert_json_to_dataset(workers=1, chunksize=16, match_batch_rows=4096, timeline_batch_rows=256,
+                            emit_tables=True, stream_timelines=False, failure_report=FAILURE_REPORT_CSV,
+                            manifest_path=DATASET_MANIFEST_PATH, shard_dir=RAW_SHARD_DIR):
+    """
+    raw JSON → 통합 Parquet Dataset 변환.
+    매치를 먼저 변환해서 match_id → game_version 을 얻고,
+    타임라인은 짝이 되는 매치와 같은 game_version 파티션에 저장한다.
+    emit_tables=True 면 parquet/tables/ 아래에 participants / participant_frames / events
+    long 테이블도 같은 파티션 구조로 함께 기록한다.
+    stream_timelines=True 면 타임라인은 스트리밍 파서(timeline_stream)로 테이블만 기록하고
+    원본 payload 는 저장하지 않는다 → 워커당 메모리가 frame 1개 수준으로 제한된다.
+
+    입력은 raw/*_data 의 .json / .json.gz / .json.zst 와 shard_dir 의 tar/zip 샤드.
+    샤드는 디스크에 풀지 않고 스트리밍으로 읽어서 같은 변환 경로로 보낸다.
+
+    manifest 기준으로 새로 생기거나 내용이 바뀐 파일만 변환한다.
+    바뀐 파일은 새 ingest_tag 로 다시 적재되고, 읽을 때는 match_id 별 최신 적재분만 사용된다.
+    """
+    print("🔄 JSON → Parquet Dataset 변환 시작...")
+    manifest = load_manifest(manifest_path)
+
+    # 단일 문서(.json/.json.gz/.json.zst) + 샤드(tar/zip, match/timeline 별로 manifest 기록)
+    shards = find_shards(shard_dir)
+    match_plan = plan_incremental(
+        find_raw_docs(MATCH_JSON_DIR, "match") + [(f"{s}::match", s) for s in shards],
+        manifest, DATASET_SCHEMA_VERSION)
+    timeline_plan = plan_incremental(
+        find_raw_docs(TIMELINE_JSON_DIR, "timeline") + [(f"{s}::timeline", s) for s in shards],
+        manifest, DATASET_SCHEMA_VERSION)
+    report_plan(match_plan, "match")
+    report_plan(timeline_plan, "timeline")
+
+    match_docs, match_shards = _split_plan(match_plan)
+    timeline_docs, timeline_shards = _split_plan(timeline_plan)
+    shard_done = []
+    counts = {}
+
+    def record_shards(kind, kind_failures):
+        # 멤버가 하나라도 실패한 샤드는 기록하지 않음 → 다음 실행에서 샤드 전체를 다시 변환
+        failed = _failed_shards(kind_failures)
+        for key, info, _ in shard_done:
+            if key.rsplit("::", 1)[0] not in failed:
+                record_conversion(manifest, key, info, DATASET_SCHEMA_VERSION, output=f"{kind} dataset")
+
+    try:
+        match_tasks = _iter_dataset_tasks("match", match_docs, match_shards, emit_tables, False, shard_done)
+        written, failures = _collect_into_dataset(
+            match_tasks, MATCH_DATASET_DIR, MATCH_ROW_GROUP_SIZE, match_batch_rows, workers, chunksize, "match",
+            manifest
+        )
+        counts["match"] = len(written)
+        record_shards("match", failures)
+
+        # 1차(match) 패스에서 timeline 멤버가 없던 샤드는 2차 패스에서 다시 풀지 않는다
+        no_timeline = {key.rsplit("::", 1)[0] for key, _, seen in shard_done if "timeline" not in seen}
+        shard_done.clear()
+
+        versions = read_dataset(MATCH_DATASET_DIR, columns=["match_id", "game_version"])
+        version_lookup = dict(zip(versions["match_id"], versions["game_version"].astype(str)))
+
+        timeline_tasks = _iter_dataset_tasks("timeline", timeline_docs, timeline_shards,
+                                             emit_tables or stream_timelines, stream_timelines, shard_done,
+                                             skip_shards=no_timeline)
+        timeline_written, timeline_failures = _collect_into_dataset(
+            timeline_tasks, TIMELINE_DATASET_DIR, TIMELINE_ROW_GROUP_SIZE, timeline_batch_rows, workers, chunksize,
+            "timeline", manifest, version_lookup=version_lookup
+        )
+        counts["timeline"] = len(timeline_written)
+        record_shards("timeline", timeline_failures)
+        failures += timeline_failures
+    finally:
+        save_manifest(manifest, manifest_path)
+
+    report_failures(failures, failure_report)
+    print(f"✔ Dataset 변환 완료! (match {counts.get('match', 0)}건, timeline {counts.get('timeline', 0)}건, "
+          f"실패 {len(failures)}건)")
+    return failures
 
 
 # ============================================================
-# Parquet 파일 경로만 로딩
+# matchId 인덱스 (match ↔ timeline 짝 맞추기)
 # ============================================================
-def get_parquet_paths():
-    match_files = sorted(glob.glob(os.path.join(MATCH_PARQUET_DIR, "match_*.parquet")))
-    timeline_files = sorted(glob.glob(os.path.join(TIMELINE_PARQUET_DIR, "timeline_*.parquet")))
+# 정렬된 파일 목록을 index 로 짝지으면 타임라인 1개만 빠져도 뒤의 모든 경기가 밀린다.
+# 그래서 두 소스를 모두 matchId 로 키잉한 인덱스를 만들고, 짝은 matchId lookup 으로 찾는다.
+# - matchId 는 변환 manifest 에 기록된 값을 우선 사용 (파일을 열지 않음)
+# - manifest 에 없는 예전 파일만 metadata.matchId 컬럼 1개를 읽어서 채움
+# - 결과는 parquet/match_index.parquet 에 캐시 → 특정 match_id 추출 시 디렉토리 스캔 불필요
+def _read_match_id(parquet_path):
+    table = pq.read_table(parquet_path, columns=["metadata.matchId"])
+    return table.column(0)[0].as_py() if table.num_rows else None
+
+
+def build_match_index(index_path=MATCH_INDEX_PATH, manifest_path=FILE_MANIFEST_PATH):
+    """
+    parquet/match, parquet/timeline 전체를 matchId 로 인덱싱해서 저장.
+    반환값: DataFrame[match_id, kind("match"/"timeline"), path]
+    """
+    cached = {}
+    if os.path.exists(index_path):
+        old = pd.read_parquet(index_path)
+        cached = dict(zip(old["path"], old["match_id"]))
+
+    from_manifest = {
+        row["output"]: row["match_id"]
+        for row in load_manifest(manifest_path).values()
+        if row.get("output") and row.get("match_id")
+    }
+
+    rows = []
+    for kind, directory in (("match", MATCH_PARQUET_DIR), ("timeline", TIMELINE_PARQUET_DIR)):
+        for path in sorted(glob.glob(os.path.join(directory, f"{kind}_*.parquet"))):
+            match_id = from_manifest.get(path) or cached.get(path)
+            if match_id is None:
+                try:
+                    match_id = _read_match_id(path)
+                except Exception as e:
+                    print(f"⚠️ matchId 읽기 실패: {path} ({e})")
+                    continue
+            rows.append({"match_id": match_id, "kind": kind, "path": path})
+
+    index = pd.DataFrame(rows, columns=["match_id", "kind", "path"])
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    index.to_parquet(index_path, index=False)
+    return index
+
+
+def load_match_index(index_path=MATCH_INDEX_PATH):
+    """캐시된 matchId 인덱스 로딩 (없으면 새로 생성)"""
+    if not os.path.exists(index_path):
+        return build_match_index(index_path)
+    return pd.read_parquet(index_path)
 
-    if len(match_files) != len(timeline_files):
-        print(f"⚠️ 경고: Match 파일({len(match_files)})과 Timeline 파일({len(timeline_files)}) 개수가 다릅니다.")
 
-    return match_files, timeline_files
+def pair_by_match_id(index, match_ids=None, verbose=True):
+    """
+    matchId 기준으로 match / timeline 경로를 짝지음.
+    match_ids 를 주면 해당 경기만 lookup.
+    반환값: (pairs DataFrame[match_id, match_path, timeline_path], orphans dict)
+      orphans = {"match_only": [...], "timeline_only": [...], "duplicated": [...]}
+    """
+    if match_ids is not None:
+        index = index[index["match_id"].isin(set(match_ids))]
+
+    dup_mask = index.duplicated(["match_id", "kind"], keep="last")
+    duplicated = sorted(index.loc[dup_mask, "match_id"].unique())
+    index = index[~dup_mask]
+
+    wide = index.pivot(index="match_id", columns="kind", values="path")
+    wide = wide.reindex(columns=["match", "timeline"])
+
+    match_only = sorted(wide.index[wide["timeline"].isna()])
+    timeline_only = sorted(wide.index[wide["match"].isna()])
+
+    pairs = wide.dropna().reset_index()
+    pairs.columns = ["match_id", "match_path", "timeline_path"]
+    pairs = pairs.sort_values("match_id").reset_index(drop=True)
+
+    missing = []
+    if match_ids is not None:
+        missing = sorted(set(match_ids) - set(wide.index))
+
+    orphans = {"match_only": match_only, "timeline_only": timeline_only,
+               "duplicated": duplicated, "missing": missing}
+
+    if verbose:
+        report_orphans(orphans, len(pairs))
+    return pairs, orphans
+
+
+def report_orphans(orphans, n_pairs):
+    print(f"🔗 matchId 매칭: {n_pairs}쌍")
+    labels = {
+        "match_only": "타임라인 없는 매치",
+        "timeline_only": "매치 없는 타임라인",
+        "duplicated": "중복 matchId",
+        "missing": "인덱스에 없는 요청 matchId",
+    }
+    for key, label in labels.items():
+        ids = orphans.get(key) or []
+        if ids:
+            preview = ", ".join(map(str, ids[:5])) + (" ..." if len(ids) > 5 else "")
+            print(f"⚠️ {label} {len(ids)}건: {preview}")
+
+
+def _dataset_keys(dataset_dir, match_ids=None):
+    """match_id → (game_version, 최신 ingest_tag) DataFrame (payload 는 읽지 않음)"""
+    keys = read_dataset(dataset_dir, match_ids=match_ids, columns=["match_id", "game_version", "ingest_tag"])
+    return keys.drop_duplicates("match_id", keep="last").set_index("match_id")
+
+
+def pair_dataset(match_ids=None, verbose=True):
+    """
+    통합 Dataset 레이아웃용 matchId 매칭 (pair_by_match_id 와 같은 역할, payload 는 읽지 않음).
+    반환값: (pairs DataFrame[match_id, game_version, match_tag, timeline_tag], orphans dict)
+      *_tag = 해당 경기의 최신 ingest_tag (원본이 다시 적재되면 바뀜)
+    """
+    m = _dataset_keys(MATCH_DATASET_DIR, match_ids)
+    t = _dataset_keys(TIMELINE_DATASET_DIR, match_ids)
+
+    orphans = {"match_only": sorted(set(m.index) - set(t.index)),
+               "timeline_only": sorted(set(t.index) - set(m.index)), "duplicated": [],
+               "missing": sorted(set(match_ids) - set(m.index) - set(t.index)) if match_ids is not None else []}
+    paired = sorted(set(m.index) & set(t.index))
+    pairs = pd.DataFrame({
+        "match_id": paired,
+        "game_version": m["game_version"].reindex(paired).astype(str).to_numpy(),
+        "match_tag": m["ingest_tag"].reindex(paired).to_numpy(),
+        "timeline_tag": t["ingest_tag"].reindex(paired).to_numpy(),
+    }, columns=["match_id", "game_version", "match_tag", "timeline_tag"])
+    if verbose:
+        report_orphans(orphans, len(pairs))
+    return pairs, orphans
+
+
+# ============================================================
+# Parquet 파일 경로 로딩 (matchId 로 짝을 맞춘 순서)
+# ============================================================
+def get_parquet_paths(match_ids=None, refresh_index=True):
+    """
+    matchId 로 짝을 맞춘 (match_paths, timeline_paths) 반환.
+    두 리스트의 i 번째는 항상 같은 경기이며, 짝이 없는 파일은 경고 후 제외된다.
+    match_ids 를 주면 해당 경기만 (refresh_index=False 면 캐시된 인덱스만 사용 → 디렉토리 스캔 없음).
+    """
+    index = build_match_index() if refresh_index else load_match_index()
+    pairs, _ = pair_by_match_id(index, match_ids=match_ids)
+    return pairs["match_path"].tolist(), pairs["timeline_path"].tolist()
 
 
 # ============================================================
@@ -0,0 +1,155 @@
+"""
+manifest.py
+JSON → Parquet 변환 이력(manifest) 관리
+
+원본 파일마다 (경로, 크기, mtime, 내용 해시, 변환 스키마 버전) 을 기록해 두고,
+다음 실행에서는 새로 생겼거나 내용이 바뀐 파일만 다시 변환한다.
+
+판정 순서
+0) manifest 에 없음 + 원본보다 새 출력 파일이 이미 있음 → seeded (skip, 해시만 계산해서 기록)
+   (manifest 도입 전에 변환해 둔 파일을 첫 증분 실행에서 전부 다시 변환하지 않도록)
+1) manifest 에 없음                  → new      (변환)
+2) 스키마 버전이 다름                  → stale    (변환)
+3) 크기/mtime 동일                    → unchanged (skip, 해시 계산 안 함)
+4) 크기/mtime 다름 + 해시 동일         → touched  (skip, 크기/mtime 만 갱신)
+5) 크기/mtime 다름 + 해시 다름         → changed  (변환)
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+MANIFEST_COLUMNS = [
+    "source_path", "size", "mtime_ns", "content_hash",
+    "schema_version", "match_id", "output", "converted_at",
+]
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def file_hash(path):
+    """파일 내용 sha256 (1MB 단위로 읽음)"""
+    h = new_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class HashingReader:
+    """read() 로 지나가는 바이트를 해시에 같이 넣는 래퍼 (스트리밍 파싱 중 해시 계산용)"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hasher = new_hasher()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.hasher.update(data)
+        return data
+
+    def hexdigest(self):
+        # 파서가 끝까지 읽지 않았을 수도 있으니 남은 바이트까지 반영
+        for chunk in iter(lambda: self.read(HASH_CHUNK_SIZE), b""):
+            pass
+        return self.hasher.hexdigest()
+
+
+def stat_source(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def source_info(path, content_hash):
+    """변환 워커가 돌려주는 원본 정보"""
+    size, mtime_ns = stat_source(path)
+    return {"size": size, "mtime_ns": mtime_ns, "content_hash": content_hash}
+
+
+def load_manifest(path):
+    """manifest 로딩 → {source_path: row dict}"""
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_parquet(path)
+    return {row["source_path"]: row for row in df.to_dict("records")}
+
+
+def save_manifest(manifest, path):
+    """임시 파일에 쓴 뒤 교체 (중간에 죽어도 기존 manifest 유지)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df = pd.DataFrame(list(manifest.values()), columns=MANIFEST_COLUMNS)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def plan_incremental(paths, manifest, schema_version, output_for=None):
+    """
+    변환이 필요한 파일만 골라낸다. paths 원소는 경로 또는 (manifest 키, 경로) 튜플.
+    output_for: 원본 경로 → 출력 파일 경로 (주면 manifest 에 없어도 출력이 원본보다 새로우면 seeded)
+    반환값: {"convert": [...], "new": n, "stale": n, "changed": n, "unchanged": n, "touched": n, "seeded": n}
+    touched / seeded 파일은 manifest 를 바로 갱신한다.
+    """
+    plan = {"convert": [], "new": 0, "stale": 0, "changed": 0, "unchanged": 0, "touched": 0, "seeded": 0}
+
+    for item in paths:
+        # (manifest 키, 실제 파일 경로) 형태도 허용 (예: 샤드 1개를 match/timeline 으로 나눠 기록)
+        key, path = item if isinstance(item, tuple) else (item, item)
+        entry = manifest.get(key)
+        output = output_for(path) if entry is None and output_for is not None else None
+        if output is not None and os.path.exists(output) and \
+                os.stat(output).st_mtime_ns >= stat_source(path)[1]:
+            record_conversion(manifest, key, source_info(path, file_hash(path)), schema_version, output=output)
+            plan["seeded"] += 1
+            continue
+
+        if entry is None:
+            plan["new"] += 1
+            plan["convert"].append(item)
+            continue
+
+        if entry["schema_version"] != schema_version:
+            plan["stale"] += 1
+            plan["convert"].append(item)
+            continue
+
+        size, mtime_ns = stat_source(path)
+        if size == entry["size"] and mtime_ns == entry["mtime_ns"]:
+            plan["unchanged"] += 1
+            continue
+
+        if size == entry["size"] and file_hash(path) == entry["content_hash"]:
+            entry["mtime_ns"] = mtime_ns
+            plan["touched"] += 1
+            continue
+
+        plan["changed"] += 1
+        plan["convert"].append(item)
+
+    return plan
+
+
+def report_plan(plan, label):
+    skipped = plan["unchanged"] + plan["touched"] + plan["seeded"]
+    print(f"   [{label}] 변환 {len(plan['convert'])}건 "
+          f"(new {plan['new']}, changed {plan['changed']}, stale {plan['stale']}) | "
+          f"skip {skipped}건 (unchanged {plan['unchanged']}, touched {plan['touched']}, seeded {plan['seeded']})")
+
+
+def record_conversion(manifest, path, info, schema_version, output=None, match_id=None):
+    """변환 성공한 파일을 manifest 에 기록"""
+    manifest[path] = {
+        "source_path": path,
+        "size": info["size"],
+        "mtime_ns": info["mtime_ns"],
+        "content_hash": info["content_hash"],
+        "schema_version": schema_version,
+        "match_id": match_id,
+        "output": output,
+        "converted_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+    }
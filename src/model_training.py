@@ -1,80 +1,43 @@
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
 import pandas as pd
 from catboost import CatBoostRegressor, Pool
 from sklearn.model_selection import train_test_split
 import json
-
-# 🌟 누적/분당 비율 피처로 업데이트 (scoring.py와 동일하게 유지해야 함)
-LANE_FEATURE_MAP = {
-    "TOP": {"BASE": ["cs", "xp",
-                     "ward_place_accum", "ward_kill_accum",
-                     "dpm", "kills_accum", "deaths_accum",
-                     "assists_accum", "dmg_taken_per_death", "turret_plates_taken",
-                     "turret_takedowns_accum", "solo_kills_accum", "split_push_time",
-                     "cspm", "kills_per_min"  # 분당 비율 피처
-                     ],
-            "Early": ["solo_kills_accum"], "Late": ["split_push_time"],
-            "End": ["turret_dpm"]},
-
-    "JUNGLE": {
-        "BASE": ["jungle_cs", "xp",
-                 "ward_place_accum", "ward_kill_accum",
-                 "dpm", "kills_accum", "deaths_accum",
-                 "assists_accum", "obj_takes_accum", "gank_ka_accum",
-                 "kill_participation"  # 분당 비율 피처
-                 ],
-        "Early": ["gank_ka_accum"],
-        "Late": ["kill_participation"],
-        "End": ["obj_takes_accum"]},
-
-    "MID": {"BASE": ["cs", "xp",
-                     "ward_place_accum", "ward_kill_accum",
-                     "dpm", "kills_accum", "deaths_accum",
-                     "assists_accum", "roam_ka_accum", "turret_plates_taken",
-                     "cspm", "kill_participation"  # 분당 비율 피처
-                     ],
-            "Early": ["roam_ka_accum"], "Late": ["kill_participation"],
-            "End": ["dpm"]},
-
-    "ADC": {"BASE": ["cs", "xp",
-                     "ward_place_accum", "ward_kill_accum",
-                     "dpm", "kills_accum", "deaths_accum",
-                     "assists_accum", "dmg_taken_per_kill", "dmg_dealt_per_death",
-                     "total_time_dead",
-                     "cspm"  # 분당 비율 피처
-                     ],
-            "Early": ["cspm"], "Late": ["total_time_dead"],
-            "End": ["team_damage_percent"]},
-
-    "SUPPORT": {"BASE": [
-        "ward_place_accum", "ward_kill_accum",
-        "assists_accum", "roam_ka_accum",
-        "heal_per_min", "cc_per_min", "dpm", "kill_participation"  # 분당 비율 피처
-    ],
-        "Early": ["roam_ka_accum"],
-        "Late": ["ward_place_accum", "ward_kill_accum"],  # Late 시야 강화
-        "End": ["heal_per_min", "cc_per_min", "kills_per_min", "dpm"]}
-}
-
-# [정의] SUPPORT End Phase의 역할별 핵심 피처 맵 (오직 1개만 입력)
-SUPPORT_END_FEATURES = {
-    "Enchanter": ["heal_per_min"],
-    "Tank": ["cc_per_min"],
-    "Assassin": ["kills_per_min"],
-    "Damage": ["dpm"]
-}
+# 라인/페이즈별 사용 피처는 feature_registry 에서 관리 (scoring.py 와 공유)
+from src.feature_registry import LANE_FEATURE_MAP, SUPPORT_END_FEATURES
+from src.load_data import resolve_workers
+from src.manifest import new_hasher
+
+try:
+    from src.config import POOL_CACHE_DIR, TRAIN_ROWS_PER_THREAD, TRAIN_THREAD_BUDGET, USE_POOL_CACHE
+except ImportError:
+    TRAIN_THREAD_BUDGET = None
+    TRAIN_ROWS_PER_THREAD = 20_000
+    POOL_CACHE_DIR = "data/pool_cache"
+    USE_POOL_CACHE = True
+
+# Pool 캐시 키에 들어가는 학습 데이터 분할 / 양자화 설정 (바꾸면 캐시가 자동으로 무효화)
+TEST_SIZE = 0.15
+SPLIT_SEED = 42
+POOL_CACHE_VERSION = 1
 
 MODEL_DIR = "models"
 os.makedirs(MODEL_DIR, exist_ok=True)
 
 
-def train_one_model(df, lane, phase, role=None):
-    save_name = (
-        f"{lane}_{role}_{phase}.cbm"
-        if role else f"{lane}_{phase}.cbm"
-    )
-    save_path = os.path.join(MODEL_DIR, save_name)
+def model_name(lane, phase, role=None):
+    """저장 파일 이름 (models/{lane}[_{role}]_{phase}.cbm)"""
+    return f"{lane}_{role}_{phase}.cbm" if role else f"{lane}_{phase}.cbm"
 
+
+def model_features(lane, phase, role=None, columns=None):
+    """
+    lane / phase (/ role) 모델이 쓰는 피처 목록 (feature_registry 순서, 메타 컬럼 제외).
+    columns 를 주면 그 안에 있는 피처만. 허용 피처가 정의되지 않았으면 빈 리스트.
+    """
     # 🌟🌟🌟 수정: base_features와 phase_features를 기본값으로 초기화 🌟🌟🌟
     base_features = []
     phase_features = []
@@ -92,10 +55,6 @@ def train_one_model(df, lane, phase, role=None):
         phase_features = LANE_FEATURE_MAP.get(lane, {}).get(phase, [])
         allowed_features = set(base_features + phase_features)
 
-    if not allowed_features:
-        print(f"⚠️ 학습 건너김: {save_name} (허용 피처가 정의되지 않았습니다.)")
-        return
-
     # 2. 메타데이터 및 불필요 컬럼 제거 (Whitelist Filtering)
     meta_drop_cols = [
         "match_id", "game_id", "pid", "target_gold", "minute", "phase",
@@ -103,60 +62,161 @@ def train_one_model(df, lane, phase, role=None):
         "champion", "support_role"
     ]
 
-    X = df.copy()
-    y = df["target_gold"]
-
-    all_cols = set(X.columns)
-
-    final_drop_cols = list((all_cols - allowed_features) | set(meta_drop_cols))
-    final_drop_cols = [col for col in final_drop_cols if col in X.columns]
-
-    X = X.drop(columns=final_drop_cols, errors="ignore")
-
-    # 3. 데이터 타입 강제 변환 (Key Fix: CatBoostError 해결)
-    for col in X.columns:
-        X[col] = pd.to_numeric(X[col], errors='coerce').astype('float64')
-
     # 🌟🌟🌟 핵심 수정: 학습 전 X 데이터프레임의 컬럼 순서를 강제 지정 🌟🌟🌟
     # 순서를 강제할 피처 리스트 (CatBoost 오류 방지)
     # BASE features + Phase features의 순서를 따르도록 재구성
 
-    # 🌟 feature_list 구성: 순서를 유지하면서 allowed_features에 있는 피처만 포함
-    feature_list = [f for f in (base_features + phase_features) if f in allowed_features and f in X.columns]
+    # 🌟 feature_list 구성: 순서를 유지하면서 allowed_features에 있는 피처만 포함 (메타 컬럼 제외)
+    # BASE 와 phase 에 같은 피처가 있으면 한 번만 (중복 컬럼이면 X[col] 이 DataFrame 이 됨)
+    columns = set(columns) if columns is not None else None
+    return [f for f in dict.fromkeys(base_features + phase_features)
+            if f in allowed_features and (columns is None or f in columns) and f not in meta_drop_cols]
+
+
+# ============================================================
+# 양자화 Pool 캐시
+# ============================================================
+def pool_cache_key(X, y, save_name):
+    """
+    학습 데이터 + 피처 목록(순서 포함) + 분할 / 캐시 설정 해시.
+    row 해시는 pandas 벡터 연산(hash_pandas_object) 한 번이라 Pool 생성 / 양자화보다 훨씬 싸다.
+    """
+    h = new_hasher()
+    h.update(f"{save_name}|{'|'.join(X.columns)}|{TEST_SIZE}|{SPLIT_SEED}|v{POOL_CACHE_VERSION}".encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def pool_cache_paths(save_name, key, cache_dir=POOL_CACHE_DIR):
+    """{train, test, borders} 캐시 파일 경로 (models 파일 이름 + 키)"""
+    stem = os.path.join(cache_dir, f"{os.path.splitext(save_name)[0]}-{key}")
+    return {"train": f"{stem}-train.quantized", "test": f"{stem}-test.quantized", "borders": f"{stem}-borders.tsv"}
+
+
+def load_cached_pools(paths):
+    """캐시된 양자화 Pool (train, test) 로딩 (없거나 읽기 실패하면 None)"""
+    if not all(os.path.exists(paths[k]) for k in ("train", "test")):
+        return None
+    try:
+        return Pool(data="quantized://" + paths["train"]), Pool(data="quantized://" + paths["test"])
+    except Exception as e:
+        print(f"⚠️ Pool 캐시 로딩 실패, 다시 만듦 ({paths['train']}): {e}")
+        return None
+
+
+def save_quantized_pools(train_pool, test_pool, paths):
+    """
+    train Pool 을 양자화하고 같은 경계로 test Pool 도 양자화해서 저장 (pool 은 in-place 로 양자화됨).
+    같은 모델의 예전 키 캐시 파일은 지운다. 저장은 임시 파일 → 교체.
+    """
+    cache_dir = os.path.dirname(paths["train"])
+    os.makedirs(cache_dir, exist_ok=True)
+    train_pool.quantize()
+    train_pool.save_quantization_borders(paths["borders"])
+    test_pool.quantize(input_borders=paths["borders"])
+
+    model_stem = os.path.basename(paths["train"]).split("-")[0]
+    current = {os.path.basename(p) for p in paths.values()}
+    for name in os.listdir(cache_dir):
+        if name.split("-")[0] == model_stem and name not in current:
+            os.remove(os.path.join(cache_dir, name))
+
+    for kind, pool in (("train", train_pool), ("test", test_pool)):
+        tmp_path = paths[kind] + ".tmp"
+        pool.save(tmp_path)
+        os.replace(tmp_path, paths[kind])
+
+
+def column_positions(df, cols):
+    """컬럼 이름 → iloc 위치 (get_indexer 는 없는 컬럼을 -1 = 마지막 컬럼으로 돌려주므로 여기서 막음)"""
+    positions = df.columns.get_indexer(cols)
+    if (positions < 0).any():
+        missing = [c for c, pos in zip(cols, positions) if pos < 0]
+        raise KeyError(f"테이블에 없는 컬럼: {missing}")
+    return positions
+
+
+def train_one_model(df, lane, phase, role=None, rows=None, thread_count=-1, use_pool_cache=USE_POOL_CACHE):
+    """
+    lane / phase (/ role) 모델 1개 학습.
+    rows 를 주면 df 전체 중 그 row 위치만 사용 (build_phase_index 결과, df 는 복사하지 않음)
+    thread_count: CatBoost 스레드 수 (-1 = 전체 코어, 병렬 학습 시 스케줄러가 배정)
+    use_pool_cache: 양자화된 train / test Pool 을 POOL_CACHE_DIR 에 저장해 두고, 데이터와 피처가 같으면 재사용
+    반환값: {"model", "phase", "lane", "role", "n_rows", "threads", "status", "rmse", "seconds", "pool_cache"}
+    """
+    started = time.perf_counter()
+    save_name = model_name(lane, phase, role)
+    save_path = os.path.join(MODEL_DIR, save_name)
+    result = {"model": save_name, "phase": phase, "lane": lane, "role": role,
+              "n_rows": len(df) if rows is None else len(rows), "threads": thread_count,
+              "status": "skipped", "rmse": None, "seconds": 0.0, "pool_cache": None}
+
+    feature_list = model_features(lane, phase, role, df.columns)
+    if not feature_list:
+        print(f"⚠️ 학습 건너김: {save_name} (허용 피처가 정의되지 않았습니다.)")
+        return result
 
-    # 순서 재배열
-    X = X[feature_list]
+    # 필요한 row / 컬럼만 꺼냄 (피처 + 타깃)
+    if rows is None:
+        X = df[feature_list]
+        y = df["target_gold"]
+    else:
+        X = df.iloc[rows, column_positions(df, feature_list)]
+        y = df["target_gold"].iloc[rows]
+
+    # 3. 데이터 타입 강제 변환 (Key Fix: CatBoostError 해결)
+    # feature_schema 의 float32 를 유지 (CatBoost 내부 표현도 float32)
+    X = X.apply(lambda col: pd.to_numeric(col, errors='coerce')).astype('float32')
 
     # CatBoost에 전달할 범주형 피처 목록: 이제 'object' 타입은 없어야 함
-    cat_features = [col for col in X.columns if X[col].dtype == "object"]
+    cat_features = [col for col, dtype in X.dtypes.items() if dtype == "object"]
 
     if len(X) < 10:
         print(f"⚠️ 데이터 부족으로 학습 건너김: {save_name} (row={len(X)})")
-        return
-
-    # 4. 학습
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
-
-    if X_train.empty:
-        print(f"⚠️ 학습 건너김: {save_name} (X_train이 비어있습니다.)")
-        return
-
-    # train_pool과 test_pool 생성 시 X의 순서가 유지됩니다.
-    train_pool = Pool(X_train, y_train, cat_features=cat_features)
-    test_pool = Pool(X_test, y_test, cat_features=cat_features)
+        return result
+
+    # 4. 학습 Pool (캐시에 같은 데이터 / 피처의 양자화 Pool 이 있으면 pandas → Pool → 양자화 생략)
+    cache_paths = pool_cache_paths(save_name, pool_cache_key(X, y, save_name)) if use_pool_cache else None
+    pools = load_cached_pools(cache_paths) if cache_paths else None
+    if pools is not None:
+        result["pool_cache"] = "hit"
+        train_pool, test_pool = pools
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
+
+        if X_train.empty:
+            print(f"⚠️ 학습 건너김: {save_name} (X_train이 비어있습니다.)")
+            return result
+
+        # train_pool과 test_pool 생성 시 X의 순서가 유지됩니다.
+        train_pool = Pool(X_train, y_train, cat_features=cat_features)
+        test_pool = Pool(X_test, y_test, cat_features=cat_features)
+        if cache_paths:
+            result["pool_cache"] = "miss"
+            try:
+                save_quantized_pools(train_pool, test_pool, cache_paths)
+            except Exception as e:  # 캐시 저장 실패는 학습에 영향 없음
+                print(f"⚠️ Pool 캐시 저장 실패 ({save_name}): {e}")
 
     model = CatBoostRegressor(
         iterations=1000, depth=6, learning_rate=0.05, loss_function="RMSE",
-        early_stopping_rounds=50, verbose=False
+        early_stopping_rounds=50, verbose=False, thread_count=thread_count
     )
 
     try:
         model.fit(train_pool, eval_set=test_pool)
         model.save_model(save_path)
-        print(f"✔ Saved model: {save_path} (RMSE: {model.get_best_score()['validation']['RMSE']:.2f})")
+        result.update(status="saved", rmse=model.get_best_score()["validation"]["RMSE"])
+        print(f"✔ Saved model: {save_path} (RMSE: {result['rmse']:.2f}, "
+              f"{time.perf_counter() - started:.1f}s, threads={thread_count})")
     except Exception as e:
+        result["status"] = "error"
         print(f"❌ 학습 중 에러 발생 ({save_name}): {e}")
 
+    result["seconds"] = time.perf_counter() - started
+    return result
+
 
 def train_all_models(df_early, df_late, df_end):
     print("\n🚀 [Training Start] 총 24개 모델 학습 시작...")
@@ -188,4 +248,131 @@ def train_all_models(df_early, df_late, df_end):
 
                 train_one_model(df_lane, lane_key, phase_name)
 
-    print("\n🎉 모든 모델 학습 완료!")
\ No newline at end of file
+    print("\n🎉 모든 모델 학습 완료!")
+
+
+def train_models_from_index(df, phase_index):
+    """
+    분 단위 테이블 1개 + build_phase_index 결과로 학습 (phase 별 DataFrame 복사 없음).
+    phase_index: {(phase, lane, role): row 위치}
+    """
+    print(f"\n🚀 [Training Start] {len(phase_index)}개 모델 학습 시작...")
+
+    current_phase = None
+    for (phase, lane, role), rows in phase_index.items():
+        if phase != current_phase:
+            print(f"\n--- Phase: {phase} ---")
+            current_phase = phase
+
+        # 🌟 MIDDLE 은 'MID' 키로 저장
+        lane_key = "MID" if lane == "MIDDLE" else lane
+        train_one_model(df, lane_key, phase, role=role, rows=rows)
+
+    print("\n🎉 모든 모델 학습 완료!")
+
+
+# ============================================================
+# 병렬 학습: 전체 스레드 예산 안에서 모델 여러 개를 프로세스로 동시에
+# ============================================================
+def plan_training_jobs(df, phase_index, thread_budget, rows_per_thread=TRAIN_ROWS_PER_THREAD):
+    """
+    phase_index → 학습 작업 목록 (row 수 큰 순서).
+    스레드 수 = ceil(row 수 / rows_per_thread) 를 [1, thread_budget] 로 자름
+    → 큰 그룹은 여러 스레드, 작은 그룹은 1 스레드로 여러 개가 같이 돈다.
+    """
+    jobs = []
+    for (phase, lane, role), rows in phase_index.items():
+        lane_key = "MID" if lane == "MIDDLE" else lane  # 🌟 MIDDLE 은 'MID' 키로 저장
+        threads = min(thread_budget, max(1, -(-len(rows) // rows_per_thread)))
+        jobs.append({"phase": phase, "lane": lane_key, "role": role, "rows": rows, "threads": threads,
+                     "features": model_features(lane_key, phase, role, df.columns)})
+    return sorted(jobs, key=lambda job: len(job["rows"]), reverse=True)
+
+
+def _job_frame(df, job):
+    """워커로 보낼 부분 테이블 (해당 row + 모델 피처 + 타깃 컬럼만)"""
+    cols = job["features"] + ["target_gold"]
+    return df.iloc[job["rows"], column_positions(df, cols)]
+
+
+def _train_job(task):
+    """ProcessPoolExecutor 워커: (부분 테이블, lane, phase, role, 스레드 수) → 결과 dict"""
+    df_job, lane, phase, role, threads = task
+    return train_one_model(df_job, lane, phase, role=role, thread_count=threads)
+
+
+def _failed_job_result(job, error):
+    """워커 프로세스가 죽거나 결과를 못 돌려준 작업 → train_one_model 과 같은 모양의 결과 dict"""
+    name = model_name(job["lane"], job["phase"], job["role"])
+    print(f"❌ 학습 작업 실패 ({name}): {type(error).__name__}: {error}")
+    return {"model": name, "phase": job["phase"], "lane": job["lane"], "role": job["role"],
+            "n_rows": len(job["rows"]), "threads": job["threads"], "status": "error", "rmse": None,
+            "seconds": 0.0, "pool_cache": None}
+
+
+def report_training(results, wall_seconds):
+    """모델별 학습 시간 표 + 전체 wall time / 모델 시간 합 (순차 학습 추정치) 출력"""
+    report = pd.DataFrame(results, columns=["model", "phase", "lane", "role", "n_rows", "threads",
+                                            "status", "rmse", "seconds", "pool_cache"])
+    report = report.sort_values("seconds", ascending=False).reset_index(drop=True)
+    if not report.empty:
+        print(report[["model", "n_rows", "threads", "status", "pool_cache", "rmse", "seconds"]].to_string(
+            index=False, float_format=lambda v: f"{v:.2f}"))
+    busy = report["seconds"].sum()
+    print(f"⏱️ wall {wall_seconds:.1f}s | 모델 시간 합 {busy:.1f}s | "
+          f"동시 실행 배율 x{busy / max(wall_seconds, 1e-9):.1f}")
+    return report
+
+
+def train_models_parallel(df, phase_index, thread_budget=TRAIN_THREAD_BUDGET,
+                          rows_per_thread=TRAIN_ROWS_PER_THREAD):
+    """
+    train_models_from_index 의 병렬 버전.
+    thread_budget(None → 전체 코어) 안에서 (실행 중 모델 스레드 합 <= 예산) 작업을 큰 것부터 제출하고,
+    남는 스레드에는 대기 중인 작은 작업을 끼워 넣는다. 각 작업은 필요한 row / 컬럼만 워커로 보낸다.
+    작업 하나가 실패해도 (워커 종료 등) status="error" 로 기록하고 나머지 작업은 계속 진행한다.
+    반환값: 모델별 결과 DataFrame (report_training)
+    """
+    budget = resolve_workers(thread_budget)
+    jobs = plan_training_jobs(df, phase_index, budget, rows_per_thread)
+    print(f"\n🚀 [Training Start] {len(jobs)}개 모델 병렬 학습 (스레드 예산 {budget})")
+
+    started = time.perf_counter()
+    results = []
+    if budget == 1:
+        for job in jobs:
+            try:
+                results.append(_train_job((_job_frame(df, job), job["lane"], job["phase"], job["role"], 1)))
+            except Exception as e:
+                results.append(_failed_job_result(job, e))
+    else:
+        with ProcessPoolExecutor(max_workers=budget) as executor:
+            pending = list(jobs)
+            running = {}
+            free = budget
+            while pending or running:
+                for job in list(pending):
+                    if job["threads"] > free:
+                        continue
+                    pending.remove(job)
+                    try:
+                        task = (_job_frame(df, job), job["lane"], job["phase"], job["role"], job["threads"])
+                        running[executor.submit(_train_job, task)] = job
+                    except Exception as e:  # 컬럼 누락 / 풀이 이미 깨진 경우 (BrokenProcessPool)
+                        results.append(_failed_job_result(job, e))
+                        continue
+                    free -= job["threads"]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    free += job["threads"]
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        results.append(_failed_job_result(job, e))
+
+    print("\n🎉 모든 모델 학습 완료!")
+    return report_training(results, time.perf_counter() - started)
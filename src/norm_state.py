@@ -0,0 +1,313 @@
+"""
+norm_state.py
+증분 갱신 가능한 정규화 통계 상태
+
+norm_stats.csv 를 매번 전체 minute_features 로 다시 계산하지 않도록,
+패치(segment)별 분위수 스케치(quantile_sketch) + 반영된 경기 목록을 상태로 저장해 두고
+새 경기 배치만 스케치해서 합친다. 스케치는 병합 가능하므로 결과는 전체를 한 번에 스케치한 것과 같다.
+
+data/norm_state/
+  ├─ state.json         (상태 버전, 피처 버전, 상대오차, 피처 컬럼, 패치별 row 수)
+  ├─ sketch_summary.parquet  (segment, feature, count, zero, min, max)
+  ├─ sketch_buckets.parquet  (segment, feature, sign, key, count)
+  ├─ coverage.parquet        (match_id, segment, n_rows, state_version)
+  └─ retired.parquet         (창 밖으로 뺀 경기 tombstone: match_id, segment, state_version)
+
+- update_norm_state : 아직 반영되지 않은 경기만 스케치해서 패치별로 병합
+- roll_out_segments : 오래된 패치를 창(window) 밖으로 제거 (해당 경기는 coverage → retired 로 옮겨서
+                      다음 갱신 때 다시 읽지 않음, 제거된 패치의 새 경기도 retired 로 바로 기록)
+- norm_state_stats  : 남은 패치 스케치를 합쳐 norm_stats 테이블 (median, pXX, count)
+- refresh_norm_stats: 피처 저장소에서 새 경기만 읽어 갱신 → 상태 / norm_stats.csv 저장
+피처 버전(FEATURE_VERSION)이 바뀌면 기존 스케치와 섞을 수 없으므로 rebuild=True 로 새로 만든다.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.feature_extract import FEATURE_VERSION
+from src.feature_store import load_feature_store, load_store_manifest
+from src.load_data import MATCH_DATASET_DIR, read_dataset
+from src.normalization import NORM_STATS_FILE, get_feature_cols, save_norm_stats, sketch_stats
+from src.quantile_sketch import merge_sketch_maps, new_sketch, sketch_frame
+
+from src.config import (
+    FEATURE_STORE_DIR,
+    NORM_QUANTILES,
+    NORM_RELATIVE_ACCURACY,
+    NORM_STATE_DIR,
+    NORM_STATE_KEEP_SEGMENTS,
+)
+
+STATE_FILE = "state.json"
+SUMMARY_FILE = "sketch_summary.parquet"
+BUCKETS_FILE = "sketch_buckets.parquet"
+COVERAGE_FILE = "coverage.parquet"
+RETIRED_FILE = "retired.parquet"
+COVERAGE_COLUMNS = ["match_id", "segment", "n_rows", "state_version"]
+RETIRED_COLUMNS = ["match_id", "segment", "state_version"]
+UNKNOWN_SEGMENT = "unknown"
+
+
+def new_norm_state(feature_cols, relative_accuracy=NORM_RELATIVE_ACCURACY, feature_version=FEATURE_VERSION):
+    """
+    빈 상태. segments = {패치: {피처: 스케치}}, coverage = {match_id: row dict}
+    retired = {match_id: row dict} (창 밖으로 뺀 경기), retired_segments = 제거된 패치 집합
+    """
+    return {
+        "version": 0,
+        "feature_version": int(feature_version),
+        "relative_accuracy": float(relative_accuracy),
+        "feature_cols": list(feature_cols),
+        "segments": {},
+        "coverage": {},
+        "retired": {},
+        "retired_segments": set(),
+        "updated_at": None,
+    }
+
+
+def segment_order(segment):
+    """패치 정렬 키: '14.9' < '14.23' < '15.1' (숫자가 아닌 라벨은 그 뒤 문자열 순)"""
+    parts = str(segment).split(".")
+    if all(p.isdigit() for p in parts):
+        return (0, tuple(int(p) for p in parts), "")
+    return (1, (), str(segment))
+
+
+def match_segments(match_ids, store_dir=FEATURE_STORE_DIR, dataset_dir=MATCH_DATASET_DIR):
+    """
+    match_id → 패치('14.23') 매핑.
+    피처 저장소 manifest 의 game_version 을 먼저 쓰고, 없는 경기(경기별 parquet 로 추출한 항목 등)만
+    통합 Dataset 의 game_version 파티션에서 찾는다. 둘 다 없으면 'unknown'
+    """
+    match_ids = [str(m) for m in match_ids]
+    mapping = {str(m): str(entry["game_version"]) for m, entry in load_store_manifest(store_dir).items()
+               if pd.notna(entry.get("game_version"))}
+    missing = [m for m in match_ids if m not in mapping]
+    if missing:
+        versions = read_dataset(dataset_dir, match_ids=missing, columns=["match_id", "game_version"])
+        mapping.update(zip(versions["match_id"].astype(str), versions["game_version"].astype(str)))
+    return pd.Series([mapping.get(m, UNKNOWN_SEGMENT) for m in match_ids], index=match_ids, dtype=object)
+
+
+def pending_matches(state, match_ids):
+    """아직 상태에 반영되지도, 창 밖으로 빠지지도 않은 match_id (입력 순서 유지)"""
+    return [m for m in match_ids if str(m) not in state["coverage"] and str(m) not in state["retired"]]
+
+
+# ============================================================
+# 갱신 / 창 관리
+# ============================================================
+def update_norm_state(state, df, segments=None):
+    """
+    새 경기 row 만 스케치해서 상태에 병합 (이미 반영됐거나 retired 인 match_id 는 건너뜀).
+    이미 제거된 패치(retired_segments)의 경기는 스케치하지 않고 retired 로만 기록한다.
+    segments: None → match_segments 로 패치 조회 / 문자열 → 배치 전체를 한 segment 로 /
+              dict·Series(match_id → segment)
+    반환값: 이번에 반영한 경기 수
+    """
+    if df.empty:
+        return 0
+    match_id = df["match_id"].astype(str)
+    new_rows = ~match_id.isin(state["coverage"].keys()) & ~match_id.isin(state["retired"].keys())
+    if not new_rows.any():
+        return 0
+    df = df[new_rows.to_numpy()]
+    match_id = match_id[new_rows]
+
+    new_ids = match_id.unique()
+    if segments is None:
+        segment_map = match_segments(new_ids)
+    elif isinstance(segments, str):
+        segment_map = pd.Series(segments, index=new_ids, dtype=object)
+    else:
+        segment_map = pd.Series(segments, dtype=object).rename(index=str)
+    segment = match_id.map(segment_map).fillna(UNKNOWN_SEGMENT).astype(str)
+
+    version = state["version"] + 1
+    retired = segment.isin(state["retired_segments"]).to_numpy()
+    for m, seg in dict(zip(match_id[retired], segment[retired])).items():
+        state["retired"][m] = {"match_id": m, "segment": seg, "state_version": version}
+    df, match_id, segment = df[~retired], match_id[~retired], segment[~retired]
+
+    for seg, rows in df.groupby(segment.to_numpy(), sort=False):
+        batch = sketch_frame(rows, state["feature_cols"], state["relative_accuracy"])
+        state["segments"][seg] = merge_sketch_maps(state["segments"].get(seg, {}), batch)
+
+    counts = match_id.value_counts()
+    for m, n in counts.items():
+        state["coverage"][m] = {"match_id": m, "segment": str(segment_map.get(m, UNKNOWN_SEGMENT)),
+                                "n_rows": int(n), "state_version": version}
+
+    state["version"] = version
+    state["updated_at"] = pd.Timestamp.now().isoformat(timespec="seconds")
+    return len(counts)
+
+
+def roll_out_segments(state, keep_latest=None, drop=()):
+    """
+    오래된 패치를 상태에서 제거. 해당 경기는 retired 로 옮겨서 pending_matches 에 다시 나오지 않는다.
+    keep_latest: 최근 N 개 패치만 남김 (segment_order 기준) / drop: 지정한 패치 제거
+    반환값: 제거한 패치 목록
+    """
+    ordered = sorted(state["segments"], key=segment_order)
+    removed = [s for s in ordered if s in set(map(str, drop))]
+    if keep_latest is not None:
+        removed += [s for s in ordered[:max(0, len(ordered) - keep_latest)] if s not in removed]
+    if not removed:
+        return []
+
+    version = state["version"] + 1
+    for seg in removed:
+        del state["segments"][seg]
+    state["retired_segments"].update(removed)
+    for m, row in list(state["coverage"].items()):
+        if row["segment"] in state["retired_segments"]:
+            del state["coverage"][m]
+            state["retired"][m] = {"match_id": m, "segment": row["segment"], "state_version": version}
+    state["version"] = version
+    state["updated_at"] = pd.Timestamp.now().isoformat(timespec="seconds")
+    return removed
+
+
+def norm_state_stats(state, quantiles=NORM_QUANTILES, segments=None):
+    """
+    상태의 패치 스케치를 합쳐 norm_stats 테이블 (normalization.compute_quantile_stats 와 같은 형식).
+    segments 를 주면 그 패치들만 합친다.
+    """
+    chosen = state["segments"] if segments is None else \
+        {s: state["segments"][s] for s in map(str, segments) if s in state["segments"]}
+    sketches = merge_sketch_maps(*chosen.values()) if chosen else {}
+    for col in state["feature_cols"]:
+        sketches.setdefault(col, new_sketch(state["relative_accuracy"]))
+    return sketch_stats(sketches, state["feature_cols"], quantiles)
+
+
+# ============================================================
+# 저장 / 로딩
+# ============================================================
+def _replace_parquet(df, path):
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def save_norm_state(state, state_dir=NORM_STATE_DIR):
+    """상태를 parquet + json 으로 저장 (각 파일은 임시 파일에 쓴 뒤 교체, state.json 을 마지막에)"""
+    os.makedirs(state_dir, exist_ok=True)
+    summary, buckets = [], []
+    for seg, sketches in state["segments"].items():
+        for col, sketch in sketches.items():
+            summary.append({"segment": seg, "feature": col, "count": sketch["count"], "zero": sketch["zero"],
+                            "min": sketch["min"], "max": sketch["max"]})
+            for sign in ("pos", "neg"):
+                buckets.append(pd.DataFrame({
+                    "segment": seg, "feature": col, "sign": sign,
+                    "key": sketch[f"{sign}_keys"], "count": sketch[f"{sign}_counts"],
+                }))
+
+    bucket_df = pd.concat(buckets, ignore_index=True) if buckets else \
+        pd.DataFrame({"segment": [], "feature": [], "sign": [], "key": np.empty(0, "int32"),
+                      "count": np.empty(0, "int64")})
+    _replace_parquet(pd.DataFrame(summary, columns=["segment", "feature", "count", "zero", "min", "max"]),
+                     os.path.join(state_dir, SUMMARY_FILE))
+    _replace_parquet(bucket_df.astype({"key": "int32", "count": "int64"}), os.path.join(state_dir, BUCKETS_FILE))
+    _replace_parquet(pd.DataFrame(list(state["coverage"].values()), columns=COVERAGE_COLUMNS),
+                     os.path.join(state_dir, COVERAGE_FILE))
+    _replace_parquet(pd.DataFrame(list(state["retired"].values()), columns=RETIRED_COLUMNS),
+                     os.path.join(state_dir, RETIRED_FILE))
+
+    meta = {k: state[k] for k in ("version", "feature_version", "relative_accuracy", "feature_cols", "updated_at")}
+    meta["retired_segments"] = sorted(state["retired_segments"], key=segment_order)
+    n_rows = {}
+    for row in state["coverage"].values():
+        n_rows[row["segment"]] = n_rows.get(row["segment"], 0) + int(row["n_rows"])
+    meta["segments"] = {seg: n_rows.get(seg, 0) for seg in sorted(state["segments"], key=segment_order)}
+    tmp_path = os.path.join(state_dir, STATE_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(state_dir, STATE_FILE))
+
+
+def load_norm_state(state_dir=NORM_STATE_DIR):
+    """저장된 상태 로딩 (없으면 None)"""
+    state_path = os.path.join(state_dir, STATE_FILE)
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, encoding="utf-8") as f:
+        meta = json.load(f)
+
+    state = new_norm_state(meta["feature_cols"], meta["relative_accuracy"], meta["feature_version"])
+    state.update(version=meta["version"], updated_at=meta["updated_at"],
+                 retired_segments=set(meta.get("retired_segments", [])))
+
+    summary = pd.read_parquet(os.path.join(state_dir, SUMMARY_FILE))
+    buckets = pd.read_parquet(os.path.join(state_dir, BUCKETS_FILE))
+    grouped = {key: rows for key, rows in buckets.groupby(["segment", "feature", "sign"], sort=False)}
+    for row in summary.to_dict("records"):
+        sketch = new_sketch(state["relative_accuracy"])
+        sketch.update(count=int(row["count"]), zero=int(row["zero"]), min=float(row["min"]), max=float(row["max"]))
+        for sign in ("pos", "neg"):
+            rows = grouped.get((row["segment"], row["feature"], sign))
+            if rows is not None:
+                sketch[f"{sign}_keys"] = rows["key"].to_numpy(dtype="int32")
+                sketch[f"{sign}_counts"] = rows["count"].to_numpy(dtype="int64")
+        state["segments"].setdefault(row["segment"], {})[row["feature"]] = sketch
+
+    coverage = pd.read_parquet(os.path.join(state_dir, COVERAGE_FILE))
+    state["coverage"] = {row["match_id"]: row for row in coverage.to_dict("records")}
+    retired_path = os.path.join(state_dir, RETIRED_FILE)
+    if os.path.exists(retired_path):
+        state["retired"] = {row["match_id"]: row for row in pd.read_parquet(retired_path).to_dict("records")}
+    return state
+
+
+# ============================================================
+# 진입점
+# ============================================================
+def refresh_norm_stats(
+    store_dir: str = FEATURE_STORE_DIR,
+    state_dir: str = NORM_STATE_DIR,
+    stats_path: str = NORM_STATS_FILE,
+    keep_latest=NORM_STATE_KEEP_SEGMENTS,
+    segments=None,
+    rebuild: bool = False,
+):
+    """
+    피처 저장소의 새 경기만 읽어서 정규화 상태 갱신 → norm_stats.csv 다시 쓰기.
+    (작업량 = 새 경기 수, 통계 출력은 스케치 병합이라 전체 데이터 크기와 무관)
+    """
+    state = None if rebuild else load_norm_state(state_dir)
+    if state is not None and state["feature_version"] != FEATURE_VERSION:
+        raise ValueError(f"[norm_state] 피처 버전이 다름 (상태 v{state['feature_version']} / "
+                         f"현재 v{FEATURE_VERSION}). rebuild=True 로 다시 만들어야 함")
+
+    todo = sorted(load_store_manifest(store_dir))
+    if state is not None:
+        todo = pending_matches(state, todo)
+    print(f"[norm_state] 새 경기 {len(todo)}개" + (f" (상태 v{state['version']})" if state else " (새 상태)"))
+
+    if todo:
+        df = load_feature_store(store_dir, match_ids=todo)
+        if state is None:
+            state = new_norm_state(get_feature_cols(df))
+        if segments is None:
+            segments = match_segments(todo, store_dir=store_dir)
+        added = update_norm_state(state, df, segments)
+        print(f"[norm_state] {added}경기 반영 ({len(df):,} rows)")
+    elif state is None:
+        raise ValueError(f"[norm_state] 피처 저장소에 경기가 없음: {store_dir}")
+
+    removed = roll_out_segments(state, keep_latest=keep_latest)
+    if removed:
+        print(f"[norm_state] 창 밖 패치 제거: {removed}")
+
+    save_norm_state(state, state_dir)
+    stats = norm_state_stats(state)
+    save_norm_stats(stats, stats_path)
+    print(f"[norm_state] 상태 v{state['version']} 저장 ({len(state['coverage'])}경기, "
+          f"패치 {len(state['segments'])}개, 창 밖 {len(state['retired'])}경기) → {stats_path}")
+    return state, stats
@@ -1,8 +1,24 @@
+import hashlib
 import os
 import pandas as pd
 import numpy as np
 
-from .config import DATA_DIR
+from .config import (
+    DATA_DIR,
+    MINUTE_FEATURE_FILE,
+    NORM_BATCH_ROWS,
+    NORM_MIN_STRATUM_ROWS,
+    NORM_QUANTILES,
+    NORM_RELATIVE_ACCURACY,
+    NORM_STRATA_MAX_MINUTE,
+    NORM_STRATIFIED,
+    NORMALIZED_MINUTE_FILE,
+)
+from .feature_store import STORE_MANIFEST_NAME, load_store_manifest
+from .load_data import parallel_map
+from .phase_definition import DEFAULT_PHASES
+from .quantile_sketch import merge_sketch_maps, quantile_table, sketch_frame
+from .table_io import iter_frame_batches, load_frame, save_frame, save_frame_batches
 
 
 # 정규화 대상에서 항상 제외할 메타 컬럼들
@@ -16,20 +32,30 @@ META_COLS = [
     "gameDuration", "minute", "phase"
 ]
 
-# 기본 파일 경로
-MINUTE_FEATURES_FILE = os.path.join(DATA_DIR, "minute_features.csv")
-NORMALIZED_MINUTE_FILE = os.path.join(DATA_DIR, "minute_features_normalized.csv")
+# 기본 파일 경로 (Arrow IPC, 예전 CSV 만 있으면 load_frame 이 CSV 를 읽음)
+MINUTE_FEATURES_FILE = MINUTE_FEATURE_FILE
 NORM_STATS_FILE = os.path.join(DATA_DIR, "norm_stats.csv")
+NORM_STRATA_STATS_FILE = os.path.join(DATA_DIR, "norm_stats_strata.csv")
+
+# 층화 통계 키 (SUPPORT 가 아닌 라인의 support_role, 상위 층의 minute 은 ANY_*)
+STRATA_KEYS = ["lane", "phase", "support_role", "minute"]
+STRATA_TEXT_KEYS = ["lane", "phase", "support_role"]
+ANY_STRATUM = "*"
+ANY_MINUTE = -1
+
+# cached_stratified_medians 캐시 (입력 내용 지문 → 층 테이블, 프로세스 안에서만 유지)
+STRATA_CACHE_SIZE = 4
+_strata_cache = {}
 
 
 def load_minute_features(path: str = MINUTE_FEATURES_FILE) -> pd.DataFrame:
     """
-    분 단위 피처 데이터 로드.
+    분 단위 피처 데이터 로드 (memory-map, dtype 은 feature_schema 기준).
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"[normalization] minute_features 파일이 없음: {path}")
-    df = pd.read_csv(path)
-    return df
+    try:
+        return load_frame(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"[normalization] minute_features 파일이 없음: {path}") from None
 
 
 def get_feature_cols(df: pd.DataFrame):
@@ -55,43 +81,199 @@ def compute_medians(df: pd.DataFrame, feature_cols):
     return med
 
 
-def apply_normalization(df: pd.DataFrame, medians: pd.Series, feature_cols, prefix: str = "norm_"):
+def normalized_block(df: pd.DataFrame, divisors, feature_cols, prefix: str = "norm_") -> pd.DataFrame:
     """
-    각 피처를 median으로 나눠서 정규화.
-    norm_x = x / median(x)
+    피처 블록을 float32 행렬 하나로 꺼내 divisors 로 한 번에 나눈 norm_* DataFrame (df 와 같은 index).
+    divisors: 피처별 벡터 (len(feature_cols)) 또는 row 별 행렬 (len(df) x len(feature_cols))
+    NaN / inf 는 같은 버퍼에서 0 으로 바꾼다 (복사 없음).
     """
-    df = df.copy()
-    for col in feature_cols:
-        norm_col = prefix + col
-        df[norm_col] = df[col] / medians[col]
+    feature_cols = list(feature_cols)
+    block = df[feature_cols].to_numpy(dtype="float32", na_value=np.nan)
+    if not (block.flags.writeable and block.flags.c_contiguous):
+        block = np.array(block, order="C")   # df 버퍼를 그대로 보는 view 면 복사해서 in-place 연산
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        np.divide(block, np.asarray(divisors, dtype="float32"), out=block)
+    np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+    return pd.DataFrame(block, columns=[prefix + c for c in feature_cols], index=df.index, copy=False)
 
-        # NaN, inf 방지
-        df[norm_col] = df[norm_col].replace([np.inf, -np.inf], np.nan)
-        df[norm_col] = df[norm_col].fillna(0.0)
 
-    return df
+def attach_block(df: pd.DataFrame, block: pd.DataFrame) -> pd.DataFrame:
+    """norm_* 블록을 한 번에 붙임 (같은 이름의 기존 컬럼은 교체, 컬럼을 하나씩 insert 하지 않음)"""
+    return pd.concat([df.drop(columns=block.columns, errors="ignore"), block], axis=1)
+
+
+def apply_normalization(df: pd.DataFrame, medians: pd.Series, feature_cols, prefix: str = "norm_",
+                        block_only: bool = False):
+    """
+    각 피처를 median으로 나눠서 정규화.
+    norm_x = x / median(x)  (결과는 float32, NaN / inf → 0)
+    피처 블록 전체를 한 번의 broadcast 나눗셈으로 처리하고, block_only=True 면 norm_* 블록만 반환.
+    """
+    block = normalized_block(df, pd.Series(medians)[list(feature_cols)].to_numpy(), feature_cols, prefix)
+    return block if block_only else attach_block(df, block)
 
 
-def save_norm_stats(medians: pd.Series, path: str = NORM_STATS_FILE):
+def save_norm_stats(medians, path: str = NORM_STATS_FILE):
     """
     median 값들을 CSV로 저장해서 나중에 재사용 가능하게 함.
+    medians 가 DataFrame 이면 (median, p10, p25 ... 컬럼) 그대로 저장.
     """
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    med_df = medians.to_frame(name="median")
+    med_df = medians.to_frame(name="median") if isinstance(medians, pd.Series) else medians.copy()
     med_df.index.name = "feature"
     med_df.to_csv(path, encoding="utf-8-sig")
 
 
+# ============================================================
+# 층화 통계: (lane, phase, support_role, minute) 별 median
+# ============================================================
+def strata_keys(df: pd.DataFrame, definition=DEFAULT_PHASES, max_minute: int = NORM_STRATA_MAX_MINUTE) -> pd.DataFrame:
+    """
+    row 별 층 키 DataFrame (STRATA_KEYS, df 와 같은 index).
+    support_role 은 SUPPORT 라인에서만 구분하고 (모델 학습과 동일), minute 은 max_minute 에서 자른다.
+    """
+    lane = df["lane"].astype(str).to_numpy()
+    if "support_role" in df.columns:
+        role = np.where(lane == "SUPPORT", df["support_role"].astype(str).to_numpy(), ANY_STRATUM)
+    else:
+        role = np.full(len(df), ANY_STRATUM, dtype=object)
+    return pd.DataFrame({
+        "lane": lane,
+        "phase": np.asarray(definition.labels(df)).astype(str),
+        "support_role": role,
+        "minute": np.minimum(df["minute"].to_numpy(dtype="int64"), max_minute),
+    }, index=df.index)
+
+
+def compute_stratified_medians(
+    df: pd.DataFrame,
+    feature_cols,
+    definition=DEFAULT_PHASES,
+    max_minute: int = NORM_STRATA_MAX_MINUTE,
+    min_rows: int = NORM_MIN_STRATUM_ROWS,
+) -> pd.DataFrame:
+    """
+    층별 median 테이블 (row = 층, columns = STRATA_KEYS + n_rows + feature_cols).
+    - (lane, phase, support_role, minute) 층      : row 수 >= min_rows 일 때 그 층의 median
+    - (lane, phase, support_role, minute=-1) 층   : minute 층이 작거나 조회 시 없는 minute 일 때 사용
+    - (*, *, *, -1) 층                             : 전체 median (처음 보는 라인 / 역할)
+    median = 0 / NaN 은 상위 층 → 1e-6 순서로 대체. 조회는 lookup_stratified_medians 참고.
+    """
+    keys = strata_keys(df, definition, max_minute)
+    values = df[feature_cols].astype("float64").set_axis(keys.index)
+
+    fine = values.groupby([keys[k] for k in STRATA_KEYS], observed=True).median()
+    fine_rows = keys.groupby(STRATA_KEYS, observed=True).size().reindex(fine.index)
+    coarse = values.groupby([keys[k] for k in STRATA_TEXT_KEYS], observed=True).median()
+    coarse_rows = keys.groupby(STRATA_TEXT_KEYS, observed=True).size().reindex(coarse.index)
+    overall = values.median()
+
+    # median 0 은 나눗셈에 못 쓰므로 NaN 과 같이 취급 → 아래에서 상위 층 → 전체 → 1e-6 순서로 대체
+    fine, coarse, overall = (stat.replace(0, np.nan) for stat in (fine, coarse, overall))
+
+    # 상위 층 값으로 작은 층 / NaN 채우기
+    parent = coarse.reindex(fine.index.droplevel("minute")).set_axis(fine.index)
+    fine = fine.where(np.broadcast_to((fine_rows >= min_rows).to_numpy()[:, None], fine.shape), parent).fillna(parent)
+    coarse = coarse.fillna(overall)
+    fine = fine.fillna(overall)
+
+    fine = fine.assign(n_rows=fine_rows.to_numpy()).reset_index()
+    coarse = coarse.assign(n_rows=coarse_rows.to_numpy(), minute=ANY_MINUTE).reset_index()
+    top = pd.DataFrame([{"lane": ANY_STRATUM, "phase": ANY_STRATUM, "support_role": ANY_STRATUM,
+                         "minute": ANY_MINUTE, "n_rows": len(df), **overall.to_dict()}])
+
+    table = pd.concat([fine, coarse, top], ignore_index=True)[STRATA_KEYS + ["n_rows"] + list(feature_cols)]
+    table[list(feature_cols)] = table[list(feature_cols)].fillna(1e-6).replace(0, 1e-6)
+    return table.astype({"minute": "int64", "n_rows": "int64"})
+
+
+def lookup_stratified_medians(df: pd.DataFrame, strata_stats: pd.DataFrame, feature_cols,
+                              definition=DEFAULT_PHASES) -> np.ndarray:
+    """
+    df 각 row 의 층 median (n_rows x len(feature_cols) float64 배열).
+    정렬된 키 인덱스 조회만 하므로 전체 데이터 없이 새 경기 몇 개에도 바로 쓸 수 있다.
+    (minute 층 → minute=-1 층 → 전체) 순서로 있는 층을 찾는다.
+    """
+    table_keys = strata_stats[STRATA_KEYS].astype({"minute": "int64"})
+    index = pd.MultiIndex.from_frame(table_keys.astype({k: str for k in STRATA_TEXT_KEYS}))
+    max_minute = int(table_keys["minute"].max())
+
+    keys = strata_keys(df, definition, max_minute)
+    pos = index.get_indexer(pd.MultiIndex.from_frame(keys))
+    missing = pos < 0
+    if missing.any():
+        pos[missing] = index.get_indexer(pd.MultiIndex.from_frame(keys[missing].assign(minute=ANY_MINUTE)))
+        missing = pos < 0
+    if missing.any():
+        pos[missing] = index.get_loc((ANY_STRATUM, ANY_STRATUM, ANY_STRATUM, ANY_MINUTE))
+
+    return strata_stats[list(feature_cols)].to_numpy(dtype="float64")[pos]
+
+
+def apply_stratified_normalization(df: pd.DataFrame, strata_stats: pd.DataFrame, feature_cols=None,
+                                   prefix: str = "norm_", definition=DEFAULT_PHASES, block_only: bool = False):
+    """
+    각 피처를 row 의 층 median 으로 나눠서 정규화 (apply_normalization 의 층화 버전, 결과 float32).
+    feature_cols 기본값 = 통계 테이블과 df 에 모두 있는 피처
+    """
+    if feature_cols is None:
+        feature_cols = [c for c in strata_stats.columns if c not in STRATA_KEYS + ["n_rows"] and c in df.columns]
+    medians = lookup_stratified_medians(df, strata_stats, feature_cols, definition)
+    block = normalized_block(df, medians, feature_cols, prefix)
+    return block if block_only else attach_block(df, block)
+
+
+def save_stratified_stats(strata_stats: pd.DataFrame, path: str = NORM_STRATA_STATS_FILE):
+    """층화 통계 CSV 저장 (norm_stats.csv 와 같은 폴더 / 인코딩)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    strata_stats.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def load_stratified_stats(path: str = NORM_STRATA_STATS_FILE) -> pd.DataFrame:
+    """저장된 층화 통계 로딩 (키는 문자열 / minute 은 정수)"""
+    dtypes = {k: str for k in STRATA_TEXT_KEYS}
+    return pd.read_csv(path, dtype=dtypes, keep_default_na=False, encoding="utf-8-sig").astype(
+        {"minute": "int64", "n_rows": "int64"})
+
+
+def strata_fingerprint(df: pd.DataFrame, feature_cols, definition=DEFAULT_PHASES) -> str:
+    """층 키 + feature_cols 값의 내용 해시 (row 수가 같아도 값이 바뀌면 달라진다)"""
+    h = hashlib.sha256("\0".join(feature_cols).encode("utf-8"))
+    for block in (strata_keys(df, definition), df[list(feature_cols)]):
+        h.update(pd.util.hash_pandas_object(block, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def cached_stratified_medians(df: pd.DataFrame, feature_cols, definition=DEFAULT_PHASES) -> pd.DataFrame:
+    """
+    compute_stratified_medians 결과를 입력 내용 지문으로 캐시 (파일은 쓰지 않음).
+    같은 데이터로 여러 경기를 그릴 때 전체 층 테이블을 한 번만 계산한다.
+    """
+    feature_cols = list(feature_cols)
+    key = strata_fingerprint(df, feature_cols, definition)
+    table = _strata_cache.get(key)
+    if table is None:
+        table = compute_stratified_medians(df, feature_cols, definition)
+        if len(_strata_cache) >= STRATA_CACHE_SIZE:
+            _strata_cache.pop(next(iter(_strata_cache)))
+        _strata_cache[key] = table
+    return table
+
+
 def normalize_minute_features(
     input_path: str = MINUTE_FEATURES_FILE,
     output_path: str = NORMALIZED_MINUTE_FILE,
     stats_path: str = NORM_STATS_FILE,
+    strata_stats_path: str = NORM_STRATA_STATS_FILE,
+    stratified: bool = NORM_STRATIFIED,
 ):
     """
     메인 진입점:
-    - minute_features.csv 로드
-    - 수치형 피처들 median 계산
-    - 정규화된 피처(norm_*) 생성
+    - minute_features 로드
+    - 수치형 피처들 median 계산 (전체 + lane / phase / support_role / minute 층별)
+    - 정규화된 피처(norm_*) 생성 (stratified=True 면 층별 median 기준)
     - 결과 및 median 통계 저장
     """
     print(f"[normalization] Load minute features from: {input_path}")
@@ -103,19 +285,135 @@ def normalize_minute_features(
         raise ValueError("[normalization] 수치형 피처가 없음. feature_extract 단계 확인 필요")
 
     medians = compute_medians(df, feature_cols)
-    print("[normalization] median 계산 완료")
+    strata_stats = compute_stratified_medians(df, feature_cols)
+    print(f"[normalization] median 계산 완료 (층 {len(strata_stats)}개)")
 
-    df_norm = apply_normalization(df, medians, feature_cols, prefix="norm_")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df_norm.to_csv(output_path, index=False, encoding="utf-8-sig")
+    if stratified:
+        df_norm = apply_stratified_normalization(df, strata_stats, feature_cols, prefix="norm_")
+    else:
+        df_norm = apply_normalization(df, medians, feature_cols, prefix="norm_")
+    save_frame(df_norm, output_path)
     print(f"[normalization] normalized 파일 저장: {output_path}")
 
     save_norm_stats(medians, stats_path)
-    print(f"[normalization] median 통계 저장: {stats_path}")
+    save_stratified_stats(strata_stats, strata_stats_path)
+    print(f"[normalization] median 통계 저장: {stats_path}, {strata_stats_path}")
 
     return df_norm, medians
 
 
+# ============================================================
+# 스트리밍 모드: 메모리보다 큰 테이블의 근사 분위수 (quantile_sketch)
+# ============================================================
+def quantile_column_name(q: float) -> str:
+    """0.5 → median, 0.1 → p10, 0.05 → p05"""
+    return "median" if q == 0.5 else f"p{round(q * 100):02d}"
+
+
+def list_shards(source: str = MINUTE_FEATURES_FILE):
+    """
+    정규화 입력 → [(파일 경로, match_ids 또는 None)] 샤드 목록
+    - 피처 저장소 디렉터리(_manifest 있음) : part 별로 살아있는 경기만
+    - 디렉터리 (스트리밍 추출 Dataset)     : part-*.parquet 각각
+    - 파일                                 : 파일 하나
+    """
+    if os.path.isdir(source):
+        if os.path.exists(os.path.join(source, STORE_MANIFEST_NAME)):
+            ids_by_part = {}
+            for match_id, entry in load_store_manifest(source).items():
+                ids_by_part.setdefault(entry["part"], []).append(match_id)
+            return [(os.path.join(source, part), ids) for part, ids in sorted(ids_by_part.items())]
+        return [(os.path.join(source, name), None) for name in sorted(os.listdir(source))
+                if name.startswith("part-") and name.endswith(".parquet")]
+    return [(source, None)]
+
+
+def iter_shard_batches(shards, columns=None, batch_rows: int = NORM_BATCH_ROWS):
+    """샤드 목록을 순서대로 batch_rows 단위 DataFrame 으로"""
+    for path, match_ids in shards:
+        yield from iter_frame_batches(path, columns=columns, batch_rows=batch_rows, match_ids=match_ids)
+
+
+def _sketch_shard(task):
+    """(샤드, 피처 컬럼, 상대오차, 배치 크기) → {컬럼: 스케치}  (parallel_map 워커용)"""
+    shard, feature_cols, relative_accuracy, batch_rows = task
+    sketches = {}
+    for batch in iter_shard_batches([shard], columns=feature_cols, batch_rows=batch_rows):
+        sketches = merge_sketch_maps(sketches, sketch_frame(batch, feature_cols, relative_accuracy))
+    return sketches
+
+
+def compute_quantile_stats(
+    source: str = MINUTE_FEATURES_FILE,
+    feature_cols=None,
+    quantiles=NORM_QUANTILES,
+    relative_accuracy: float = NORM_RELATIVE_ACCURACY,
+    workers: int = 1,
+    batch_rows: int = NORM_BATCH_ROWS,
+) -> pd.DataFrame:
+    """
+    테이블 전체를 올리지 않고 피처별 median / percentile 근사.
+    샤드마다 (workers>1 이면 병렬로) 배치 단위 스케치를 만들고 합친다 → 메모리 = 배치 1개 + 스케치.
+    값의 상대오차 <= relative_accuracy. median = 0 은 compute_medians 와 같이 1e-6 으로 대체.
+    반환: DataFrame(index=feature, columns=[median, p10, ..., count])
+    """
+    shards = list_shards(source)
+    if not shards:
+        raise FileNotFoundError(f"[normalization] 입력 샤드가 없음: {source}")
+    if feature_cols is None:
+        feature_cols = get_feature_cols(next(iter_shard_batches(shards[:1], batch_rows=1)))
+
+    tasks = [(shard, feature_cols, relative_accuracy, batch_rows) for shard in shards]
+    sketches = {}
+    for shard_sketches in parallel_map(_sketch_shard, tasks, workers=workers, chunksize=1, desc="Sketching"):
+        sketches = merge_sketch_maps(sketches, shard_sketches)
+    return sketch_stats(sketches, feature_cols, quantiles)
+
+
+def sketch_stats(sketches, feature_cols, quantiles=NORM_QUANTILES) -> pd.DataFrame:
+    """{피처: 스케치} → norm_stats 테이블 (median, pXX, count). median = 0 은 1e-6 으로 대체"""
+    quantiles = sorted(set(quantiles) | {0.5})
+    stats = quantile_table(sketches, quantiles).reindex(feature_cols)
+    stats.columns = [quantile_column_name(q) for q in quantiles] + ["count"]
+    stats["median"] = stats["median"].replace(0, 1e-6)
+    return stats
+
+
+def normalize_minute_features_streaming(
+    source: str = MINUTE_FEATURES_FILE,
+    output_path: str = NORMALIZED_MINUTE_FILE,
+    stats_path: str = NORM_STATS_FILE,
+    quantiles=NORM_QUANTILES,
+    relative_accuracy: float = NORM_RELATIVE_ACCURACY,
+    workers: int = 1,
+    batch_rows: int = NORM_BATCH_ROWS,
+):
+    """
+    normalize_minute_features 의 out-of-core 버전:
+    - 1차 패스: 스케치로 median / percentile 계산 → norm_stats.csv (median + pXX + count)
+    - 2차 패스: 배치마다 norm_* 생성 → output_path 에 이어서 저장 (output_path=None 이면 통계만)
+    """
+    print(f"[normalization] streaming 모드: {source} (상대오차 {relative_accuracy})")
+    stats = compute_quantile_stats(source, quantiles=quantiles, relative_accuracy=relative_accuracy,
+                                   workers=workers, batch_rows=batch_rows)
+    if stats.empty:
+        raise ValueError("[normalization] 수치형 피처가 없음. feature_extract 단계 확인 필요")
+    print(f"[normalization] 분위수 계산 완료: {len(stats)}개 피처, {int(stats['count'].max()):,} rows")
+
+    save_norm_stats(stats, stats_path)
+    print(f"[normalization] 분위수 통계 저장: {stats_path}")
+
+    if output_path:
+        feature_cols = stats.index.tolist()
+        medians = stats["median"]
+        batches = (apply_normalization(batch, medians, feature_cols, prefix="norm_")
+                   for batch in iter_shard_batches(list_shards(source), batch_rows=batch_rows))
+        n_rows = save_frame_batches(batches, output_path)
+        print(f"[normalization] normalized 파일 저장: {output_path} ({n_rows:,} rows)")
+
+    return stats
+
+
 if __name__ == "__main__":
     # 단독 실행용
     normalize_minute_features()
@@ -0,0 +1,85 @@
+"""
+phase_definition.py
+Phase(early / late / end ...) 구간 정의 — 학습(build_phase_datasets), 스코어링(scoring), 시각화가 같이 쓴다.
+
+PhaseDefinition(boundaries=(15,), names=("early", "late"), end_window=0)
+- 시간 구간: boundaries 로 minute 축을 나눔   minute < 15 → early, 15 <= minute → late
+- 종료 구간: minute >= duration_min - end_window 이면 시간 구간과 관계없이 end (end 가 우선)
+  → 짧은 경기(리메이크 등)의 마지막 분도 end 로 들어가고, 한 row 는 항상 phase 1개
+
+경계를 바꾸려면 config 의 PHASE_BOUNDARIES / PHASE_NAMES / END_PHASE_WINDOW 를 수정하거나
+PhaseDefinition 을 직접 만들어 build_phase_index / add_phase_column 에 넘긴다.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.config import END_PHASE_WINDOW, PHASE_BOUNDARIES, PHASE_NAMES
+except ImportError:
+    PHASE_BOUNDARIES = [15]
+    PHASE_NAMES = ["early", "late"]
+    END_PHASE_WINDOW = 0
+
+
+@dataclass(frozen=True)
+class PhaseDefinition:
+    boundaries: tuple = (15,)
+    names: tuple = ("early", "late")
+    end_window: int = 0
+    end_name: str = "end"
+
+    def __post_init__(self):
+        object.__setattr__(self, "boundaries", tuple(int(b) for b in self.boundaries))
+        object.__setattr__(self, "names", tuple(self.names))
+        if list(self.boundaries) != sorted(set(self.boundaries)):
+            raise ValueError(f"boundaries 는 중복 없는 오름차순이어야 함: {self.boundaries}")
+        if len(self.names) != len(self.boundaries) + 1:
+            raise ValueError(f"names 개수 = boundaries + 1 이어야 함: {self.names} / {self.boundaries}")
+        if self.end_name in self.names:
+            raise ValueError(f"end_name 이 시간 구간 이름과 겹침: {self.end_name}")
+
+    @property
+    def phase_names(self):
+        """시간 구간 + end 순서"""
+        return list(self.names) + [self.end_name]
+
+    @property
+    def label(self):
+        """sweep 결과 등에 쓰는 짧은 이름  예: early<15|late|end(w=0)"""
+        parts = [f"{name}<{b}" for name, b in zip(self.names, self.boundaries)] + [self.names[-1]]
+        return "|".join(parts) + f"|{self.end_name}(w={self.end_window})"
+
+    def codes(self, minute, duration_min):
+        """row 별 phase 번호 (phase_names 인덱스)"""
+        minute = np.asarray(minute)
+        codes = np.searchsorted(np.asarray(self.boundaries), minute, side="right").astype("int8")
+        codes[minute >= np.asarray(duration_min) - self.end_window] = len(self.names)
+        return codes
+
+    def labels(self, df):
+        """df(minute, duration_min) → phase Categorical"""
+        codes = self.codes(df["minute"].to_numpy(), df["duration_min"].to_numpy())
+        return pd.Categorical.from_codes(codes, categories=self.phase_names)
+
+    def masks(self, df):
+        """{phase 이름: bool 배열}"""
+        codes = self.codes(df["minute"].to_numpy(), df["duration_min"].to_numpy())
+        return {name: codes == i for i, name in enumerate(self.phase_names)}
+
+    def spans(self, duration_min):
+        """시각화용 (phase, 시작 분, 끝 분) — 경기 길이 duration_min 기준"""
+        edges = [0] + list(self.boundaries)
+        end_start = duration_min - self.end_window
+        spans = []
+        for name, start, stop in zip(self.names, edges, edges[1:] + [end_start]):
+            stop = min(stop, end_start)
+            if start < stop:
+                spans.append((name, start, stop))
+        spans.append((self.end_name, end_start, duration_min + 1))
+        return spans
+
+
+DEFAULT_PHASES = PhaseDefinition(tuple(PHASE_BOUNDARIES), tuple(PHASE_NAMES), END_PHASE_WINDOW)
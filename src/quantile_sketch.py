@@ -0,0 +1,154 @@
+"""
+quantile_sketch.py
+병합 가능한 근사 분위수 스케치 (메모리에 다 올릴 수 없는 테이블의 median / percentile 용)
+
+구조: 로그 간격 버킷 히스토그램 (DDSketch 방식)
+- 양수 x 는 버킷 key = ceil(log_gamma(x)) 에 카운트, gamma = (1 + a) / (1 - a)
+- 음수는 |x| 로 같은 방식의 별도 버킷, |x| < MIN_INDEXABLE 은 zero 카운트
+- 버킷 대표값 2 * gamma^key / (gamma + 1) 은 버킷 안 모든 값과 상대오차 a 이내
+  → 분위수 결과도 실제 분위수 값과 상대오차 relative_accuracy 이내 (순위 오차 없음)
+
+버킷 수는 값의 범위에만 의존 (예: a=0.01, 1e-9 ~ 1e9 → 부호당 최대 약 2,100개)하고 row 수와 무관.
+스케치끼리는 같은 key 의 카운트를 더하기만 하면 되므로 청크 / 샤드 / 프로세스 단위로 따로 만들고 합쳐도
+한 번에 만든 것과 결과가 같다. (dict + numpy 배열이라 pickle 로 워커 간 전달 가능)
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+MIN_INDEXABLE = 1e-9
+
+
+def new_sketch(relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    """빈 스케치"""
+    if not 0 < relative_accuracy < 1:
+        raise ValueError(f"relative_accuracy 는 (0, 1) 범위여야 함: {relative_accuracy}")
+    empty_keys = np.empty(0, dtype="int32")
+    empty_counts = np.empty(0, dtype="int64")
+    return {
+        "relative_accuracy": float(relative_accuracy),
+        "count": 0, "zero": 0, "min": np.inf, "max": -np.inf,
+        "pos_keys": empty_keys, "pos_counts": empty_counts,
+        "neg_keys": empty_keys, "neg_counts": empty_counts,
+    }
+
+
+def _log_gamma(relative_accuracy):
+    return np.log1p(relative_accuracy) - np.log1p(-relative_accuracy)
+
+
+def _bucket(abs_values, log_gamma):
+    """|x| 배열 → (정렬된 key, 카운트)"""
+    if not len(abs_values):
+        return np.empty(0, dtype="int32"), np.empty(0, dtype="int64")
+    keys = np.ceil(np.log(abs_values) / log_gamma).astype("int32")
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys, counts.astype("int64")
+
+
+def _merge_buckets(keys_a, counts_a, keys_b, counts_b):
+    if not len(keys_a):
+        return keys_b, counts_b
+    if not len(keys_b):
+        return keys_a, counts_a
+    keys, inverse = np.unique(np.concatenate([keys_a, keys_b]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([counts_a, counts_b]), minlength=len(keys))
+    return keys.astype("int32"), counts.astype("int64")
+
+
+def sketch_values(values, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    """값 배열 하나로 스케치 생성 (NaN / inf 는 무시)"""
+    values = np.asarray(values, dtype="float64").ravel()
+    values = values[np.isfinite(values)]
+    sketch = new_sketch(relative_accuracy)
+    if not len(values):
+        return sketch
+
+    log_gamma = _log_gamma(relative_accuracy)
+    magnitude = np.abs(values)
+    is_zero = magnitude < MIN_INDEXABLE
+    sketch["pos_keys"], sketch["pos_counts"] = _bucket(values[(values > 0) & ~is_zero], log_gamma)
+    sketch["neg_keys"], sketch["neg_counts"] = _bucket(-values[(values < 0) & ~is_zero], log_gamma)
+    sketch.update(count=int(len(values)), zero=int(is_zero.sum()),
+                  min=float(values.min()), max=float(values.max()))
+    return sketch
+
+
+def merge_sketches(*sketches):
+    """같은 relative_accuracy 스케치들을 합친 새 스케치"""
+    if not sketches:
+        raise ValueError("합칠 스케치가 없음")
+    accuracy = sketches[0]["relative_accuracy"]
+    merged = new_sketch(accuracy)
+    for sketch in sketches:
+        if sketch["relative_accuracy"] != accuracy:
+            raise ValueError(f"relative_accuracy 가 다른 스케치는 합칠 수 없음: {accuracy} / {sketch['relative_accuracy']}")
+        merged["pos_keys"], merged["pos_counts"] = _merge_buckets(
+            merged["pos_keys"], merged["pos_counts"], sketch["pos_keys"], sketch["pos_counts"])
+        merged["neg_keys"], merged["neg_counts"] = _merge_buckets(
+            merged["neg_keys"], merged["neg_counts"], sketch["neg_keys"], sketch["neg_counts"])
+        merged["count"] += sketch["count"]
+        merged["zero"] += sketch["zero"]
+        merged["min"] = min(merged["min"], sketch["min"])
+        merged["max"] = max(merged["max"], sketch["max"])
+    return merged
+
+
+def update_sketch(sketch, values):
+    """스케치에 값 배열 추가 (새 스케치 반환)"""
+    return merge_sketches(sketch, sketch_values(values, sketch["relative_accuracy"]))
+
+
+def sketch_quantiles(sketch, quantiles):
+    """
+    분위수 q (0~1) 배열 → 근사값 배열 (순위 floor(q * (n - 1)) 의 값, 보간 없음. 빈 스케치는 NaN).
+    값은 [min, max] 로 자르고, q=0 / q=1 (첫 / 마지막 순위) 은 정확한 최소 / 최대를 돌려준다.
+    """
+    quantiles = np.atleast_1d(np.asarray(quantiles, dtype="float64"))
+    if sketch["count"] == 0:
+        return np.full(len(quantiles), np.nan)
+
+    gamma = np.exp(_log_gamma(sketch["relative_accuracy"]))
+    # 작은 값 → 큰 값 순서: 음수(큰 |x| 부터) → 0 → 양수
+    neg_keys = sketch["neg_keys"][::-1]
+    values = np.concatenate([
+        -2 * gamma ** neg_keys.astype("float64") / (gamma + 1),
+        [0.0],
+        2 * gamma ** sketch["pos_keys"].astype("float64") / (gamma + 1),
+    ])
+    counts = np.concatenate([sketch["neg_counts"][::-1], [sketch["zero"]], sketch["pos_counts"]])
+    cumulative = np.cumsum(counts)
+
+    ranks = np.floor(quantiles * (sketch["count"] - 1))
+    pos = np.searchsorted(cumulative, ranks, side="right")
+    result = np.clip(values[np.minimum(pos, len(values) - 1)], sketch["min"], sketch["max"])
+    # 첫 / 마지막 순위는 버킷 대표값 대신 정확히 기록된 min / max
+    result[ranks <= 0] = sketch["min"]
+    result[ranks >= sketch["count"] - 1] = sketch["max"]
+    return result
+
+
+# ============================================================
+# 컬럼별 스케치 묶음 {컬럼: 스케치}
+# ============================================================
+def sketch_frame(df, columns, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    """DataFrame 청크 → {컬럼: 스케치}"""
+    return {col: sketch_values(pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan),
+                               relative_accuracy)
+            for col in columns}
+
+
+def merge_sketch_maps(*sketch_maps):
+    """{컬럼: 스케치} 들을 컬럼별로 병합 (한쪽에만 있는 컬럼도 유지)"""
+    columns = list(dict.fromkeys(col for sketch_map in sketch_maps for col in sketch_map))
+    return {col: merge_sketches(*[m[col] for m in sketch_maps if col in m]) for col in columns}
+
+
+def quantile_table(sketch_map, quantiles):
+    """{컬럼: 스케치} → DataFrame(index=컬럼, columns=quantiles, + count)"""
+    quantiles = list(quantiles)
+    table = pd.DataFrame({col: sketch_quantiles(sketch, quantiles) for col, sketch in sketch_map.items()},
+                         index=quantiles).T
+    table["count"] = [sketch["count"] for sketch in sketch_map.values()]
+    return table
@@ -0,0 +1,150 @@
+"""
+raw_sources.py
+압축/샤드 형태의 raw Riot 응답을 디스크에 풀지 않고 바로 읽기
+
+지원 형식
+- 단일 문서 : match_*.json / .json.gz / .json.zst
+- 샤드      : .tar / .tar.gz / .tgz / .tar.zst / .zip
+              (안의 멤버도 .json / .json.gz / .json.zst 가능)
+
+tar 는 스트리밍 모드("r|*")로 앞에서부터 순서대로 읽기 때문에
+아카이브 전체를 메모리나 디스크에 올리지 않는다.
+zstd 는 zstandard 패키지가 있을 때만 지원한다.
+"""
+
+import gzip
+import io
+import os
+import tarfile
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DOC_SUFFIXES = (".json", ".json.gz", ".json.zst")
+SHARD_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.zst", ".zip")
+KINDS = ("match", "timeline")
+
+
+def _strip_doc_suffix(name):
+    for suffix in DOC_SUFFIXES[::-1]:  # 긴 확장자부터
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def doc_kind(name):
+    """'match_KR_1.json.gz' → 'match', 문서가 아니면 None"""
+    base = os.path.basename(name)
+    if _strip_doc_suffix(base) is None:
+        return None
+    for kind in KINDS:
+        if base.startswith(f"{kind}_"):
+            return kind
+    return None
+
+
+def doc_stem(name):
+    """'match_KR_1.json.zst' → 'match_KR_1'"""
+    return _strip_doc_suffix(os.path.basename(name))
+
+
+def is_shard(path):
+    return path.endswith(SHARD_SUFFIXES)
+
+
+def _require_zstd(path):
+    if zstandard is None:
+        raise ImportError(f"zstandard 패키지가 없어 .zst 를 읽을 수 없습니다: {path}")
+
+
+def wrap_decompress(fileobj, name):
+    """확장자에 맞게 압축 해제 스트림으로 감싼다 (.json 은 그대로)"""
+    if name.endswith(".gz"):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if name.endswith(".zst"):
+        _require_zstd(name)
+        return zstandard.ZstdDecompressor().stream_reader(fileobj)
+    return fileobj
+
+
+def open_raw(path):
+    """단일 문서 파일을 바이너리 스트림으로 열기 (압축은 스트리밍 해제)"""
+    return wrap_decompress(open(path, "rb"), path)
+
+
+def decompress_bytes(data, name):
+    """이미 읽은 (압축된) bytes 를 확장자에 맞게 해제"""
+    if name.endswith(".gz"):
+        return gzip.decompress(data)
+    if name.endswith(".zst"):
+        _require_zstd(name)
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    return data
+
+
+def read_raw_bytes(path):
+    """
+    단일 문서 파일 읽기 → (파일 원본 bytes, 압축 해제된 문서 bytes)
+    manifest 해시는 파일 원본 bytes 기준이다.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, decompress_bytes(data, path)
+
+
+def iter_shard_members(fileobj, path, kinds=KINDS, seen_kinds=None):
+    """
+    샤드 안의 문서를 순서대로 (kind, 멤버 이름, 압축 해제된 bytes) 로 yield.
+    kinds 에 없는 종류의 멤버는 내용을 읽지 않고 건너뛴다.
+    seen_kinds(set) 를 넘기면 건너뛴 것까지 포함해 샤드에 있던 문서 종류를 기록한다.
+    fileobj 는 path 를 바이너리로 연 객체 (해시 계산용 래퍼 가능).
+    """
+    if seen_kinds is None:
+        seen_kinds = set()
+
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                kind = doc_kind(info.filename)
+                if info.is_dir() or kind is None:
+                    continue
+                seen_kinds.add(kind)
+                if kind not in kinds:
+                    continue
+                with zf.open(info) as member:
+                    yield kind, info.filename, wrap_decompress(member, info.filename).read()
+        return
+
+    if path.endswith(".tar.zst"):
+        _require_zstd(path)
+        fileobj = zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for info in tf:
+            kind = doc_kind(info.name)
+            if not info.isfile() or kind is None:
+                continue
+            seen_kinds.add(kind)
+            if kind not in kinds:
+                continue
+            member = tf.extractfile(info)
+            yield kind, info.name, wrap_decompress(member, info.name).read()
+
+
+def find_raw_docs(directory, kind):
+    """directory 안의 {kind}_*.json(.gz/.zst) 단일 문서 목록"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if doc_kind(name) == kind
+    )
+
+
+def find_shards(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if is_shard(name))
@@ -0,0 +1,248 @@
+"""
+spatial_features.py
+participantFrames / 킬 이벤트의 position(x, y) → 위치 기반 피처 (벡터화)
+
+기존 roam_ka_accum 은 "라인 라벨이 MIDDLE/UTILITY 인 사람의 킬 관여" 라서 실제로 어디서 싸웠는지는 모른다.
+여기서는 맵을 GRID_CELL 크기 격자로 나눈 구역 인덱스(ZONE_GRID)를 미리 만들어 두고,
+좌표 → 격자 → 구역 을 배열 인덱싱 한 번으로 구한다.
+
+피처 (row = participant_frames 한 줄, extract_minute_features_vectorized 와 같은 순서)
+- zone                     : 현재 위치 구역 (BLUE_BASE / RED_BASE / TOP / MID / BOT / RIVER / JUNGLE)
+- dist_moved               : 직전 프레임 대비 이동 거리 (첫 프레임 0)
+- dist_moved_accum         : 이동 거리 누적
+- enemy_half_minutes_accum : 상대 진영 절반에 있던 프레임 수 누적 (압박)
+- off_lane_minutes_accum   : 자기 라인 구역 / 본진이 아닌 곳에 있던 프레임 수 누적 (로밍)
+- ka_enemy_half_accum      : 상대 진영에서 발생한 킬 관여 누적
+- ka_off_lane_accum        : 자기 라인 구역 밖에서 발생한 킬 관여 누적 (위치 기반 roam)
+- deaths_enemy_half_accum  : 상대 진영에서 죽은 횟수 누적 (무리한 진입)
+
+킬 관여 / 데스는 feature_vectorized 와 같이 (match, pid, frame_idx) 개수 → cumsum → merge_asof 로 붙인다.
+위치가 없는 프레임 / 이벤트는 zone=UNKNOWN 으로 두고 어떤 카운터에도 넣지 않는다.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_tables import EVENTS, PARTICIPANT_FRAMES, PARTICIPANTS
+from src.feature_schema import SPATIAL_FEATURE_DTYPES, apply_feature_schema
+from src.feature_vectorized import ACCUM_PIDS, _asof_join, _cumulative
+from src.load_data import read_table
+
+# 소환사의 협곡 좌표 범위 (약 0 ~ 14,900)
+MAP_SIZE = 15000
+GRID_CELL = 500
+GRID_N = MAP_SIZE // GRID_CELL
+
+LANE_WIDTH = 1800    # 맵 가장자리 / 대각선에서 이 거리 안이면 라인
+RIVER_WIDTH = 1300   # 반대 대각선(x + y = MAP_SIZE) 에서 이 거리 안이면 강
+BASE_SIZE = 4600     # 모서리에서 x, y 모두 이 안쪽 + x + y < BASE_REACH 이면 본진
+BASE_REACH = 6200
+
+ZONES = ["BLUE_BASE", "RED_BASE", "TOP", "MID", "BOT", "RIVER", "JUNGLE"]
+UNKNOWN_ZONE = "UNKNOWN"
+ZONE_CODE = {z: i for i, z in enumerate(ZONES)}
+
+# teamPosition → 자기 라인으로 보는 구역
+HOME_ZONES = {
+    "TOP": {"TOP"},
+    "MIDDLE": {"MID"},
+    "BOTTOM": {"BOT"},
+    "UTILITY": {"BOT"},
+    "JUNGLE": {"JUNGLE", "RIVER"},
+}
+BASE_ZONES = {"BLUE_BASE", "RED_BASE"}
+
+SPATIAL_FEATURE_COLUMNS = list(SPATIAL_FEATURE_DTYPES)
+SPATIAL_KEY_COLUMNS = ["match_id", "minute", "pid"]
+KILL_LOCATION_STATS = ["ka_enemy_half_accum", "ka_off_lane_accum", "deaths_enemy_half_accum"]
+SPATIAL_FRAME_COLUMNS = ["match_id", "frame_idx", "minute", "pid", "position_x", "position_y"]
+SPATIAL_EVENT_COLUMNS = ["match_id", "frame_idx", "type", "killer_id", "victim_id", "assists",
+                         "position_x", "position_y"]
+
+
+def build_zone_grid(grid_cell=GRID_CELL, map_size=MAP_SIZE):
+    """
+    격자 칸 중심 좌표 기준 구역 코드 (GRID_N x GRID_N, [y, x] 인덱스).
+    우선순위: 본진 > 라인(TOP/BOT/MID) > 강 > 정글
+    """
+    centers = (np.arange(map_size // grid_cell) + 0.5) * grid_cell
+    x, y = np.meshgrid(centers, centers)
+
+    grid = np.full(x.shape, ZONE_CODE["JUNGLE"], dtype=np.int8)
+    river = np.abs(x + y - map_size) / np.sqrt(2) < RIVER_WIDTH
+    mid = np.abs(x - y) / np.sqrt(2) < LANE_WIDTH / 2
+    top = ((x < LANE_WIDTH) | (y > map_size - LANE_WIDTH)) & (y > x)
+    bot = ((y < LANE_WIDTH) | (x > map_size - LANE_WIDTH)) & (x > y)
+    blue_base = (x < BASE_SIZE) & (y < BASE_SIZE) & (x + y < BASE_REACH)
+    red_base = (x > map_size - BASE_SIZE) & (y > map_size - BASE_SIZE) & (x + y > 2 * map_size - BASE_REACH)
+
+    # 뒤에 칠하는 쪽이 우선
+    for mask, zone in [(river, "RIVER"), (mid, "MID"), (top, "TOP"), (bot, "BOT"),
+                       (blue_base, "BLUE_BASE"), (red_base, "RED_BASE")]:
+        grid[mask] = ZONE_CODE[zone]
+    return grid
+
+
+ZONE_GRID = build_zone_grid()
+
+
+def zone_codes(position_x, position_y):
+    """좌표 배열 → 구역 코드 배열 (좌표가 없으면 -1)"""
+    x = pd.to_numeric(pd.Series(position_x), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    y = pd.to_numeric(pd.Series(position_y), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    ix = np.clip(np.nan_to_num(x) // GRID_CELL, 0, GRID_N - 1).astype("int64")
+    iy = np.clip(np.nan_to_num(y) // GRID_CELL, 0, GRID_N - 1).astype("int64")
+    return np.where(valid, ZONE_GRID[iy, ix], -1)
+
+
+def in_enemy_half(position_x, position_y, team_id):
+    """team 100(블루, 좌하단) 은 x + y > MAP_SIZE, team 200 은 반대쪽이 상대 진영 (좌표 없으면 False)"""
+    diagonal = (np.asarray(position_x, dtype="float64") + np.asarray(position_y, dtype="float64")) - MAP_SIZE
+    team_id = np.asarray(team_id)
+    return np.where(team_id == 100, diagonal > 0, np.where(team_id == 200, diagonal < 0, False))
+
+
+def _home_mask(codes, team_position):
+    """구역 코드가 teamPosition 의 자기 라인 구역이면 True"""
+    home = np.zeros(len(codes), dtype=bool)
+    team_position = np.asarray(team_position)
+    for lane, zones in HOME_ZONES.items():
+        home |= (team_position == lane) & np.isin(codes, [ZONE_CODE[z] for z in zones])
+    return home
+
+
+def _off_lane(codes, team_position):
+    """자기 라인도 본진도 아닌 곳 (HOME_ZONES 에 없는 포지션 / 좌표 없음은 False)"""
+    known = np.isin(np.asarray(team_position), list(HOME_ZONES)) & (codes >= 0)
+    base = np.isin(codes, [ZONE_CODE[z] for z in BASE_ZONES])
+    return known & ~base & ~_home_mask(codes, team_position)
+
+
+def _kill_credits(events, static):
+    """
+    CHAMPION_KILL → (match, pid, frame_idx) 별 위치 카운터
+    킬러 + 어시스트 = 킬 관여, 피해자 = 데스 (ACCUM_PIDS 만, feature_vectorized 와 같은 규칙)
+    """
+    kills = events.loc[events["type"] == "CHAMPION_KILL",
+                       ["match_id", "frame_idx", "killer_id", "victim_id", "assists", "position_x", "position_y"]]
+    kills = kills.assign(_codes=zone_codes(kills["position_x"], kills["position_y"]))
+    pos_cols = ["match_id", "frame_idx", "position_x", "position_y", "_codes"]
+
+    ka = pd.concat([
+        kills[pos_cols + ["killer_id"]].rename(columns={"killer_id": "pid"}),
+        kills[pos_cols + ["assists"]].explode("assists").rename(columns={"assists": "pid"}),
+    ], ignore_index=True)
+    deaths = kills[pos_cols + ["victim_id"]].rename(columns={"victim_id": "pid"})
+
+    def attach(credits):
+        credits = credits[credits["pid"].isin(ACCUM_PIDS)]
+        credits = credits.assign(pid=credits["pid"].astype("int64"), frame_idx=credits["frame_idx"].astype("int64"))
+        return credits.merge(static[["match_id", "pid", "team_id", "team_position"]], on=["match_id", "pid"])
+
+    ka, deaths = attach(ka), attach(deaths)
+    valid_ka = ka["_codes"].to_numpy() >= 0
+    valid_death = deaths["_codes"].to_numpy() >= 0
+    parts = [
+        ka.loc[valid_ka & in_enemy_half(ka["position_x"], ka["position_y"], ka["team_id"]),
+               ["match_id", "pid", "frame_idx"]].assign(stat="ka_enemy_half_accum"),
+        ka.loc[_off_lane(ka["_codes"].to_numpy(), ka["team_position"]),
+               ["match_id", "pid", "frame_idx"]].assign(stat="ka_off_lane_accum"),
+        deaths.loc[valid_death & in_enemy_half(deaths["position_x"], deaths["position_y"], deaths["team_id"]),
+                   ["match_id", "pid", "frame_idx"]].assign(stat="deaths_enemy_half_accum"),
+    ]
+    return pd.concat(parts, ignore_index=True)
+
+
+def extract_spatial_features(participants, frames, events, match_order=None):
+    """
+    participants / participant_frames(position_x, position_y 포함) / events → 위치 기반 피처.
+    row 순서 (경기 순서 → frame_idx → pid) 는 extract_minute_features_vectorized 와 같다.
+    """
+    if match_order is None:
+        match_order = sorted(participants["match_id"].unique())
+    order = pd.Series(np.arange(len(match_order)), index=pd.Index(match_order))
+
+    static = participants[["match_id", "pid", "team_id", "team_position"]].copy()
+    static[["pid", "team_id"]] = static[["pid", "team_id"]].astype("int64")
+    static = static[static["match_id"].isin(order.index)]
+
+    frames = frames.assign(pid=frames["pid"].astype("int64"))
+    rows = frames.merge(static, on=["match_id", "pid"], how="inner", sort=False)
+    rows["frame_idx"] = rows["frame_idx"].astype("int64")
+    rows["_order"] = order.reindex(rows["match_id"]).to_numpy()
+    rows = rows.sort_values(["_order", "frame_idx", "pid"], kind="stable").reset_index(drop=True)
+    rows["_row"] = np.arange(len(rows))
+    group = rows.groupby(["match_id", "pid"], sort=False).ngroup()
+
+    x = pd.to_numeric(rows["position_x"], errors="coerce").astype("float64")
+    y = pd.to_numeric(rows["position_y"], errors="coerce").astype("float64")
+    codes = zone_codes(x, y)
+    team_position = rows["team_position"].to_numpy()
+
+    out = pd.DataFrame({
+        "match_id": rows["match_id"].to_numpy(),
+        "minute": rows["minute"].to_numpy(),
+        "pid": rows["pid"].to_numpy(),
+    })
+    labels = np.array(ZONES + [UNKNOWN_ZONE], dtype=object)
+    out["zone"] = pd.Categorical(labels[codes], categories=ZONES + [UNKNOWN_ZONE])
+
+    step = np.hypot(x.groupby(group).diff(), y.groupby(group).diff()).fillna(0.0)
+    out["dist_moved"] = step.to_numpy()
+    out["dist_moved_accum"] = step.groupby(group).cumsum().to_numpy()
+
+    enemy_half = pd.Series((codes >= 0) & in_enemy_half(x, y, rows["team_id"]))
+    off_lane = pd.Series(_off_lane(codes, team_position))
+    out["enemy_half_minutes_accum"] = enemy_half.astype("int64").groupby(group).cumsum().to_numpy()
+    out["off_lane_minutes_accum"] = off_lane.astype("int64").groupby(group).cumsum().to_numpy()
+
+    # ---- 킬 위치 카운터 ----
+    events = events[events["match_id"].isin(order.index)]
+    credits = _kill_credits(events, static)
+    if len(credits):
+        counts = (credits.groupby(["match_id", "pid", "frame_idx", "stat"]).size()
+                  .unstack("stat", fill_value=0)
+                  .reindex(columns=KILL_LOCATION_STATS, fill_value=0)
+                  .reset_index())
+        cum = _cumulative(counts, ["match_id", "pid"])
+        values = _asof_join(rows, cum, ["match_id", "pid"], KILL_LOCATION_STATS)
+    else:
+        values = np.zeros((len(rows), len(KILL_LOCATION_STATS)), dtype="int64")
+    for i, stat in enumerate(KILL_LOCATION_STATS):
+        out[stat] = values[:, i]
+
+    return apply_feature_schema(out[SPATIAL_KEY_COLUMNS + SPATIAL_FEATURE_COLUMNS])
+
+
+def load_spatial_tables(match_ids=None):
+    """parquet/tables 에서 위치 피처에 필요한 컬럼만 로딩"""
+    return (
+        read_table(PARTICIPANTS, match_ids=match_ids, columns=["match_id", "pid", "team_id", "team_position"]),
+        read_table(PARTICIPANT_FRAMES, match_ids=match_ids, columns=SPATIAL_FRAME_COLUMNS),
+        read_table(EVENTS, match_ids=match_ids, columns=SPATIAL_EVENT_COLUMNS),
+    )
+
+
+def extract_spatial_features_columnar(match_ids=None):
+    """convert_json_to_dataset 으로 만든 테이블 → 위치 기반 피처"""
+    participants, frames, events = load_spatial_tables(match_ids)
+    return extract_spatial_features(participants, frames, events, match_order=match_ids)
+
+
+def attach_spatial_features(minute_df, spatial_df):
+    """
+    분 단위 피처 테이블에 위치 피처를 붙인다 (match_id, minute, pid 기준 left join).
+    같은 minute 프레임이 여러 개인 경우도 있어서 키 안에서의 등장 순서까지 맞춰 붙인다.
+    """
+    def keyed(df):
+        df = df.assign(match_id=df["match_id"].astype(str))
+        return df.assign(_seq=df.groupby(SPATIAL_KEY_COLUMNS, sort=False).cumcount())
+
+    keys = SPATIAL_KEY_COLUMNS + ["_seq"]
+    left = keyed(minute_df.drop(columns=[c for c in SPATIAL_FEATURE_COLUMNS if c in minute_df.columns]))
+    right = keyed(spatial_df)[keys + SPATIAL_FEATURE_COLUMNS]
+    right = right.astype({"minute": left["minute"].dtype, "pid": left["pid"].dtype})
+    merged = left.merge(right, on=keys, how="left", sort=False).drop(columns="_seq")
+    merged["match_id"] = merged["match_id"].astype(minute_df["match_id"].dtype)
+    return merged
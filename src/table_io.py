@@ -0,0 +1,181 @@
+"""
+table_io.py
+중간 산출물(minute_features, phase_*, opscore_results, normalized ...) 저장 / 로딩
+
+- .feather / .arrow : Arrow IPC (비압축) → memory-map 으로 열어서 숫자 컬럼은 복사 없이 사용
+- .parquet          : 압축 columnar, 컬럼 / match_id 필터를 읽는 단계에서 적용
+- .csv              : 이전 파이프라인 호환용 (읽기 fallback)
+
+load_frame(path) 는 같은 이름의 .feather / .parquet / 주어진 경로 중 가장 최근에 수정된 파일을 읽기 때문에
+예전 CSV 경로를 넘겨도 새 Arrow 파일이 있으면 그쪽을, 그 뒤에 다시 쓴 CSV 가 있으면 CSV 를 읽는다.
+메모리보다 큰 테이블은 iter_frame_batches / save_frame_batches 로 배치 단위로 읽고 쓴다.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from src.feature_schema import apply_feature_schema, to_storage_frame
+
+ARROW_EXTENSIONS = (".feather", ".arrow")
+PREFERRED_EXTENSIONS = (".feather", ".parquet")
+
+
+def frame_path(path):
+    """
+    실제로 읽을 파일 경로: 같은 이름의 Arrow / Parquet / 주어진 경로 중 가장 최근에 수정된 파일
+    (mtime 이 같으면 Arrow → Parquet → 주어진 경로 순서), 하나도 없으면 None
+    """
+    stem, _ = os.path.splitext(path)
+    candidates = [c for c in dict.fromkeys([stem + ext for ext in PREFERRED_EXTENSIONS] + [path])
+                  if os.path.exists(c)]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (os.stat(c).st_mtime_ns, -candidates.index(c)))
+
+
+def save_frame(df, path):
+    """확장자 기준으로 저장 (임시 파일에 쓴 뒤 교체). Arrow 는 mmap 을 위해 비압축"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    tmp_path = path + ".tmp"
+
+    if ext in ARROW_EXTENSIONS:
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                              compression="uncompressed")
+    elif ext == ".parquet":
+        df.to_parquet(tmp_path, index=False)
+    elif ext == ".csv":
+        df.to_csv(tmp_path, index=False)
+    else:
+        raise ValueError(f"지원하지 않는 형식: {path}")
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def save_frame_batches(frames, path):
+    """
+    DataFrame 배치들을 파일 하나로 이어서 저장 (전체를 메모리에 모으지 않음, 임시 파일 → 교체).
+    category 는 문자열로 저장 (배치마다 사전이 달라도 스키마가 같도록, 읽을 때 load_frame 이 복원)
+    반환값: 저장한 row 수
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ARROW_EXTENSIONS + (".parquet",):
+        raise ValueError(f"배치 저장을 지원하지 않는 형식: {path}")
+    tmp_path = path + ".tmp"
+
+    writer, schema, total = None, None, 0
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(to_storage_frame(df), schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema.remove_metadata()
+                table = table.replace_schema_metadata(None)
+                writer = pa.ipc.new_file(tmp_path, schema) if ext in ARROW_EXTENSIONS else \
+                    pq.ParquetWriter(tmp_path, schema)
+            writer.write_table(table)
+            total += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"저장할 배치가 없음: {path}")
+    os.replace(tmp_path, path)
+    return total
+
+
+def _filter_matches(table, match_ids):
+    """
+    Arrow Table 에서 match_id 가 match_ids 인 row 만.
+    dictionary(category) 컬럼은 문자열로 풀지 않고 사전에서 찾은 코드로 indices 만 비교한다.
+    """
+    wanted = pa.array([str(m) for m in match_ids], type=pa.string())
+    column = table["match_id"]
+    if not pa.types.is_dictionary(column.type):
+        return table.filter(pc.is_in(column, value_set=wanted.cast(column.type)))
+
+    masks = []
+    for chunk in column.chunks:
+        hit = pc.is_in(chunk.dictionary, value_set=wanted.cast(chunk.dictionary.type))
+        codes = np.flatnonzero(hit.to_numpy(zero_copy_only=False))
+        masks.append(pc.is_in(chunk.indices, value_set=pa.array(codes, type=chunk.indices.type)))
+    return table.filter(pa.chunked_array(masks, type=pa.bool_()))
+
+
+def iter_frame_batches(path, columns=None, batch_rows=100_000, match_ids=None):
+    """
+    load_frame 과 같은 파일을 batch_rows 단위 DataFrame 으로 나눠 읽기 (파일 전체를 올리지 않음).
+    Arrow 는 memory-map 한 record batch 를 잘라서, Parquet 는 row group 을 따라 순서대로 읽는다.
+    """
+    real_path = frame_path(path)
+    if real_path is None:
+        raise FileNotFoundError(f"파일 없음: {path}")
+    ext = os.path.splitext(real_path)[1].lower()
+    read_columns = columns
+    if columns is not None and match_ids is not None and "match_id" not in columns:
+        read_columns = list(columns) + ["match_id"]
+    wanted = {str(m) for m in match_ids} if match_ids is not None else None
+
+    def _finish(df):
+        if wanted is not None:
+            df = df[df["match_id"].astype(str).isin(wanted)].reset_index(drop=True)
+        if read_columns is not columns:
+            df = df[columns]
+        return apply_feature_schema(df)
+
+    if ext in ARROW_EXTENSIONS:
+        with pa.memory_map(real_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if read_columns is not None:
+                    batch = batch.select(read_columns)
+                for start in range(0, batch.num_rows, batch_rows):
+                    yield _finish(batch.slice(start, batch_rows).to_pandas())
+    elif ext == ".parquet":
+        for batch in pq.ParquetFile(real_path).iter_batches(batch_size=batch_rows, columns=read_columns):
+            yield _finish(batch.to_pandas())
+    else:
+        for df in pd.read_csv(real_path, usecols=read_columns, chunksize=batch_rows):
+            yield _finish(df)
+
+
+def load_frame(path, columns=None, match_ids=None, memory_map=True):
+    """
+    중간 산출물 로딩 → DataFrame (분 단위 피처 컬럼은 feature_schema dtype).
+    columns   : 읽을 컬럼만 (projection)
+    match_ids : 해당 경기 row 만 (대시보드에서 경기 하나 볼 때)
+    """
+    real_path = frame_path(path)
+    if real_path is None:
+        raise FileNotFoundError(f"파일 없음: {path}")
+    ext = os.path.splitext(real_path)[1].lower()
+    read_columns = columns
+    if columns is not None and match_ids is not None and "match_id" not in columns:
+        read_columns = list(columns) + ["match_id"]
+
+    if ext in ARROW_EXTENSIONS:
+        # read_table 은 memory_map=True 일 때 버퍼를 복사하지 않고 파일 매핑을 그대로 쓴다
+        table = feather.read_table(real_path, columns=read_columns, memory_map=memory_map)
+        if match_ids is not None:
+            table = _filter_matches(table, match_ids)
+        df = table.to_pandas(split_blocks=True)
+    elif ext == ".parquet":
+        filters = [("match_id", "in", [str(m) for m in match_ids])] if match_ids is not None else None
+        df = pd.read_parquet(real_path, columns=read_columns, filters=filters, memory_map=memory_map)
+    else:
+        df = pd.read_csv(real_path, usecols=read_columns)
+        if match_ids is not None:
+            df = df[df["match_id"].astype(str).isin({str(m) for m in match_ids})].reset_index(drop=True)
+
+    if read_columns is not columns:
+        df = df[columns]
+    return apply_feature_schema(df)
@@ -0,0 +1,128 @@
+"""
+timeline_stream.py
+timeline_*.json 스트리밍 파서
+
+json.load 로 문서 전체(수 MB, Python 객체로는 수십 MB)를 올리지 않고
+ijson 으로 frame 하나씩 읽어서 participant_frames / events 테이블 row 로 바로 변환한다.
+메모리에는 "현재 frame 1개 + 변환이 끝난 Arrow 배치" 만 남는다.
+
+ijson 이 설치돼 있지 않으면 json.load 기반(columnar_tables.timeline_tables)으로 대체한다.
+"""
+
+import json
+
+import pyarrow as pa
+
+from src.columnar_tables import (
+    EVENTS,
+    PARTICIPANT_FRAMES,
+    TABLE_SCHEMAS,
+    event_row,
+    participant_frame_row,
+    timeline_tables,
+    to_table,
+)
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+FRAME_PREFIX = "info.frames.item"
+MATCH_ID_PREFIX = "metadata.matchId"
+
+# 이 개수만큼 row 가 쌓이면 Arrow RecordBatch 로 변환 (dict row 를 오래 들고 있지 않음)
+ROW_FLUSH_SIZE = 4096
+
+
+def has_streaming_parser():
+    return ijson is not None
+
+
+class _TableSink:
+    """row dict 를 받아 일정 개수마다 Arrow 배치로 변환해 두는 버퍼"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = []
+        self.tables = []
+
+    def append(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= ROW_FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.tables.append(to_table(self.rows, self.name))
+            self.rows = []
+
+    def finish(self, match_id):
+        self.flush()
+        if not self.tables:
+            return TABLE_SCHEMAS[self.name].empty_table()
+
+        table = pa.concat_tables(self.tables)
+        # match_id 는 문서 어디에 나오든 마지막에 한 번에 채운다
+        idx = table.schema.get_field_index("match_id")
+        return table.set_column(idx, "match_id", pa.array([match_id] * table.num_rows, pa.string()))
+
+
+def _emit_frame(frame, frame_idx, frames_sink, events_sink):
+    ts = frame.get("timestamp", 0)
+    for pframe in (frame.get("participantFrames") or {}).values():
+        if pframe.get("participantId") is not None:
+            frames_sink.append(participant_frame_row(None, frame_idx, ts, pframe))
+    for event_idx, ev in enumerate(frame.get("events") or []):
+        events_sink.append(event_row(None, frame_idx, event_idx, ts, ev))
+
+
+def stream_timeline_tables(fileobj, match_id=None):
+    """
+    timeline JSON 바이너리 스트림 → {"participant_frames": Table, "events": Table, "match_id": str}
+
+    fileobj 는 open(path, "rb") / gzip / tar 멤버 등 read() 가능한 객체면 된다 (seek 불필요).
+    match_id 를 넘기지 않으면 문서의 metadata.matchId 를 사용한다.
+    """
+    if ijson is None:
+        doc = json.load(fileobj)
+        tables = timeline_tables(doc)
+        tables["match_id"] = doc["metadata"]["matchId"]
+        return tables
+
+    frames_sink = _TableSink(PARTICIPANT_FRAMES)
+    events_sink = _TableSink(EVENTS)
+    found_id = None
+    frame_idx = 0
+    builder = None
+
+    for prefix, event, value in ijson.parse(fileobj, use_float=True):
+        if prefix == MATCH_ID_PREFIX and event == "string":
+            found_id = value
+            continue
+
+        if prefix == FRAME_PREFIX and event == "start_map":
+            builder = ijson.ObjectBuilder()
+
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == FRAME_PREFIX and event == "end_map":
+                _emit_frame(builder.value, frame_idx, frames_sink, events_sink)
+                frame_idx += 1
+                builder = None
+
+    match_id = match_id or found_id
+    if match_id is None:
+        raise ValueError("metadata.matchId 없음")
+
+    return {
+        PARTICIPANT_FRAMES: frames_sink.finish(match_id),
+        EVENTS: events_sink.finish(match_id),
+        "match_id": match_id,
+    }
+
+
+def stream_timeline_file(path, match_id=None):
+    """경로 버전 (바이너리 모드로 열어서 스트리밍)"""
+    with open(path, "rb") as f:
+        return stream_timeline_tables(f, match_id=match_id)
@@ -1,4 +1,5 @@
 # src/visualize_advanced/early_late_comparison.py
+# 실행: 프로젝트 루트에서 python -m src.visualize_advanced.early_late_comparison
 
 import pandas as pd
 import numpy as np
@@ -6,6 +7,8 @@ import os
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from src.table_io import frame_path, load_frame
+
 # 🌟 데이터 경로 설정
 DATA_PATH = r"C:\Users\user\PycharmProjects\Last_LOL_Project\data\opscore_results.csv"
 VISUALIZATION_PATH = r"C:\Users\user\PycharmProjects\Last_LOL_Project\visualizations"
@@ -78,12 +81,12 @@ if __name__ == "__main__":
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         data_path = os.path.join(base_dir, "data", DATA_PATH)
 
-        if not os.path.exists(data_path):
+        if frame_path(data_path) is None:
             print(f"❌ 데이터 파일 로드 실패: {DATA_PATH} 경로에 파일이 없습니다.")
             exit()
 
-        df_test = pd.read_csv(data_path)
-        print(f"✔️ {os.path.basename(data_path)} 파일 로드 성공. (Rows: {len(df_test)})")
+        df_test = load_frame(data_path)
+        print(f"✔️ {os.path.basename(frame_path(data_path))} 파일 로드 성공. (Rows: {len(df_test)})")
 
         plot_early_late_comparison(df_test, save=True)
 
@@ -1,9 +1,13 @@
+# 실행: 프로젝트 루트에서 python -m src.visualize_advanced.feature_distribution_plot
+
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
 import numpy as np
 
+from src.table_io import load_frame
+
 sns.set(style="whitegrid")
 
 # 🌟 절대 경로 설정 (저장 경로를 명확히 함)
@@ -27,9 +31,9 @@ FEATURES = [
 def load_phase_data():
     # 데이터 로드 (절대 경로 사용)
     try:
-        df_early = pd.read_csv(os.path.join(DATA_DIR, "phase_early.csv"))
-        df_late = pd.read_csv(os.path.join(DATA_DIR, "phase_late.csv"))
-        df_end = pd.read_csv(os.path.join(DATA_DIR, "phase_end.csv"))
+        df_early = load_frame(os.path.join(DATA_DIR, "phase_early.feather"))
+        df_late = load_frame(os.path.join(DATA_DIR, "phase_late.feather"))
+        df_end = load_frame(os.path.join(DATA_DIR, "phase_end.feather"))
     except FileNotFoundError:
         print(f"❌ 데이터 파일을 찾을 수 없습니다. 경로를 확인하세요: {DATA_DIR}")
         return pd.DataFrame()
@@ -1,4 +1,5 @@
 # src/visualize_advanced/match_curve.py
+# 실행: 프로젝트 루트에서 python -m src.visualize_advanced.match_curve
 
 import matplotlib
 
@@ -10,6 +11,10 @@ import pandas as pd
 import numpy as np
 import tempfile  # 안전한 임시 저장 경로를 위해 tempfile 모듈 사용
 
+from src.normalization import cached_stratified_medians, lookup_stratified_medians
+from src.phase_definition import DEFAULT_PHASES
+from src.table_io import frame_path, load_frame
+
 # VISUALIZATION_PATH 설정 (임시 파일 저장을 위한 안전한 경로로 변경)
 VISUALIZATION_PATH = tempfile.gettempdir()  # 시스템의 임시 폴더 사용
 
@@ -17,22 +22,24 @@ VISUALIZATION_PATH = tempfile.gettempdir()  # 시스템의 임시 폴더 사용
 def calculate_ratio(df: pd.DataFrame) -> pd.DataFrame:
     """모델 예측 Baseline 대비 Ratio를 계산하여 DataFrame에 추가합니다."""
 
+    # phase 구간은 학습 / 스코어링과 같은 정의 사용 (phase_definition)
+    phase = DEFAULT_PHASES.labels(df)
     df["model_baseline_score"] = df['late_model_score']
-    df['end_phase_start'] = df['duration_min'] - 1
 
-    df.loc[df['minute'] <= 15, "model_baseline_score"] = df['early_model_score']
-    df.loc[df['minute'] >= df['end_phase_start'], "model_baseline_score"] = df['end_model_score']
+    df.loc[phase == "early", "model_baseline_score"] = df['early_model_score']
+    df.loc[phase == DEFAULT_PHASES.end_name, "model_baseline_score"] = df['end_model_score']
 
     df["ratio_to_model_baseline"] = \
         df["final_score_norm"] / (df["model_baseline_score"].replace(0, 1e-6) + 1e-6)
 
-    df = df.drop(columns=['end_phase_start'], errors='ignore')
     return df
 
 
-def plot_match_curve(df_minute: pd.DataFrame, match_id: str, save=True):
+def plot_match_curve(df_minute: pd.DataFrame, match_id: str, save=True, calibration: pd.DataFrame = None):
     """
     특정 경기(match_id)의 시간축 라인별 기여도 곡선 시각화.
+    calibration: ratio_to_model_baseline 층별 median (normalization.compute_stratified_medians).
+                 None 이면 df_minute 로 계산한다 (같은 데이터면 cached_stratified_medians 가 한 번만 계산).
     """
     # ... (함수 본문은 이전 답변의 최종 코드를 그대로 사용) ...
     # (코드 길이를 위해 생략합니다. 로직은 이전 답변과 동일합니다.)
@@ -53,13 +60,16 @@ def plot_match_curve(df_minute: pd.DataFrame, match_id: str, save=True):
     teams = {100: "Blue", 200: "Red"}
 
     duration_min = df_match['duration_min'].max() if not df_match['duration_min'].empty else 30
-    end_phase_start = duration_min - 1
+    phase_spans = {name: (start, stop) for name, start, stop in DEFAULT_PHASES.spans(duration_min)}
 
     # 🌟🌟🌟 1. Baseline 재보정 (Median Normalization) 🌟🌟🌟
-    median_ratio = df_minute["ratio_to_model_baseline"].median()
-    calibration_factor = max(1e-6, median_ratio)
+    # 같은 lane / phase / support_role / minute 의 median ratio 를 1.0 으로 (층 테이블 조회)
+    if calibration is None:
+        calibration = cached_stratified_medians(df_minute, ["ratio_to_model_baseline"])
+    factors = np.maximum(1e-6, lookup_stratified_medians(df_match, calibration, ["ratio_to_model_baseline"])[:, 0])
+    calibration_factor = float(np.median(factors))
 
-    df_match["ratio_final"] = df_match["ratio_to_model_baseline"] / calibration_factor
+    df_match["ratio_final"] = df_match["ratio_to_model_baseline"] / factors
 
     # 🌟🌟🌟 2. 0분 시작점 1.0 보정 (공정한 출발점) 🌟🌟🌟
     if 0 in df_match['minute'].values:
@@ -69,8 +79,11 @@ def plot_match_curve(df_minute: pd.DataFrame, match_id: str, save=True):
     plt.figure(figsize=(16, 10))
 
     # 🌟🌟🌟 모델 단계 영역 표시 🌟🌟🌟
-    plt.axvspan(0, 15, color='green', alpha=0.1, label='Early Phase Model (0-15 min)')
-    plt.axvspan(end_phase_start, duration_min + 1, color='purple', alpha=0.1, label='End Phase Model (End min)')
+    if "early" in phase_spans:
+        early_start, early_stop = phase_spans["early"]
+        plt.axvspan(early_start, early_stop, color='green', alpha=0.1,
+                    label=f'Early Phase Model ({early_start}-{early_stop} min)')
+    plt.axvspan(*phase_spans[DEFAULT_PHASES.end_name], color='purple', alpha=0.1, label='End Phase Model (End min)')
 
     # 🌟🌟🌟 1인분 기준선 표시 🌟🌟🌟
     plt.axhline(y=1.0, color='black', linestyle='--', linewidth=1.5, alpha=0.7,
@@ -150,13 +163,13 @@ def plot_match_curve(df_minute: pd.DataFrame, match_id: str, save=True):
 if __name__ == "__main__":
     try:
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        data_path = os.path.join(base_dir, "data", "minute_features.csv")
+        data_path = os.path.join(base_dir, "data", "minute_features.feather")
 
-        if not os.path.exists(data_path):
+        if frame_path(data_path) is None:
             print(f"❌ 데이터 파일 로드 실패: {data_path} 경로에 파일이 없습니다.")
             exit()
 
-        df_test = pd.read_csv(data_path)
+        df_test = load_frame(data_path)
 
         # 🌟🌟🌟 final_score_norm 누락 시 XP 기반으로 생성 (분석적 경고 필수) 🌟🌟🌟
         if 'final_score_norm' not in df_test.columns:
@@ -197,7 +210,8 @@ if __name__ == "__main__":
             print(f"✔️ 파일 로드 성공. 시각화 시작. (Match ID: {test_match_id})")
 
             # 🌟🌟🌟 save=True로 강제 저장 🌟🌟🌟
-            plot_match_curve(df_test, match_id=test_match_id, save=True)
+            calibration = cached_stratified_medians(df_test, ["ratio_to_model_baseline"])
+            plot_match_curve(df_test, match_id=test_match_id, save=True, calibration=calibration)
         else:
             print("❌ 'match_id' 컬럼이 없거나 비어 있어 시각화를 진행할 수 없습니다.")
 
@@ -1,10 +1,13 @@
 # src/visualize_advanced/summoner_consistency.py
+# 실행: 프로젝트 루트에서 python -m src.visualize_advanced.summoner_consistency
 
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from src.table_io import frame_path, load_frame
+
 # 🌟 VISUALIZATION_PATH를 절대 경로로 강제 지정
 VISUALIZATION_PATH = r"C:\Users\user\PycharmProjects\Last_LOL_Project\visualizations"
 
@@ -113,13 +116,13 @@ def plot_summoner_consistency(df_minute: pd.DataFrame, puuid: str, save=True):
 if __name__ == "__main__":
     try:
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        data_path = os.path.join(base_dir, "data", "minute_features.csv")
+        data_path = os.path.join(base_dir, "data", "minute_features.feather")
 
-        if not os.path.exists(data_path):
+        if frame_path(data_path) is None:
             print(f"❌ 데이터 파일 로드 실패: {data_path} 경로에 파일이 없습니다. 메인 파이프라인을 재실행하세요.")
             exit()
 
-        df_test = pd.read_csv(data_path)
+        df_test = load_frame(data_path)
 
         # 🌟🌟🌟 1. final_score_norm 임시 생성 (경고 방지) 🌟🌟🌟
         if 'final_score_norm' not in df_test.columns:
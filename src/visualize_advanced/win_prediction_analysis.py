@@ -1,4 +1,5 @@
 # src/visualize_advanced/win_prediction_analysis.py
+# 실행: 프로젝트 루트에서 python -m src.visualize_advanced.win_prediction_analysis
 
 import pandas as pd
 import numpy as np
@@ -10,6 +11,8 @@ from sklearn.metrics import accuracy_score, confusion_matrix, roc_curve, auc
 import seaborn as sns
 import matplotlib.font_manager as fm
 
+from src.table_io import frame_path, load_frame
+
 # 🌟 데이터 경로 설정
 DATA_PATH = "data/opscore_results.csv"
 VISUALIZATION_PATH = r"C:\Users\user\PycharmProjects\Last_LOL_Project\visualizations"
@@ -27,15 +30,15 @@ plt.rcParams['axes.unicode_minus'] = False
 def prepare_data_and_predict():
     print("🚀 STEP 7: 기여도 점수 기반 승패 예측 모델링 시작...")
 
-    # 🚨 파일 로드 (opscore_results.csv 사용)
+    # 🚨 파일 로드 (opscore_results.feather, 없으면 예전 CSV)
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     data_path = os.path.join(base_dir, DATA_PATH)
 
-    if not os.path.exists(data_path):
+    if frame_path(data_path) is None:
         print(f"❌ 데이터 파일 로드 실패: {DATA_PATH} 경로에 파일이 없습니다.")
         return None
 
-    df_score = pd.read_csv(data_path)
+    df_score = load_frame(data_path)
 
     # 🌟🌟🌟 오류 해결 로직: 'win' 컬럼이 없을 경우 재정의 🌟🌟🌟
     if 'win' not in df_score.columns or df_score['win'].isnull().all():
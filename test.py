@@ -2,57 +2,68 @@
 main.py – 10개만 테스트하는 버전
 """
 
-from src.load_data import (
-    convert_json_to_parquet,
-    get_parquet_paths
-)
-
-from src.feature_extract import extract_minute_features
-from src.build_phase_datasets import build_phase_datasets
-from src.model_training import train_all_models
+from src.load_data import convert_json_to_dataset, pair_dataset
+
+from src.config import DUMP_PHASE_FILES, OPSCORE_FILE
+from src.feature_extract import extract_minute_features, iter_dataset_pairs
+from src.feature_vectorized import compare_engines, extract_minute_features_vectorized, load_feature_tables
+from src.build_phase_datasets import build_phase_index, dump_phase_datasets
+from src.model_training import train_models_parallel
 from src.scoring import compute_opscore
+from src.table_io import save_frame
 from src.visualize import visualize_feature_importance, visualize_opscore_distribution
 
 
 def main():
 
-    print("📌 STEP 0) JSON → Parquet 변환")
-    # 이미 변환했으면 주석 처리해도 됨
-    convert_json_to_parquet()
+    print("📌 STEP 0) JSON → Parquet Dataset 변환 (+ participants / participant_frames / events 테이블)")
+    # 이미 변환했으면 새로 생기거나 바뀐 원본만 다시 변환됨
+    convert_json_to_dataset(emit_tables=True)
 
-    print("📌 STEP 1) Parquet 파일 목록 로딩")
-    match_paths, timeline_paths = get_parquet_paths()
-    print(f"   Matches: {len(match_paths)}, Timelines: {len(timeline_paths)}")
+    print("📌 STEP 1) matchId 매칭")
+    pairs, orphans = pair_dataset()
+    print(f"   학습에 쓰는 쌍: {len(pairs)}")
 
     # [핵심 수정] 10개만 잘라서 테스트!
-    print("⚡ 테스트 모드: 10개 파일만 처리합니다.")
-    test_match_paths = match_paths[:10]
-    test_timeline_paths = timeline_paths[:10]
+    print("⚡ 테스트 모드: 10경기만 처리합니다.")
+    test_matches, test_timelines = [], []
+    for match, timeline in iter_dataset_pairs(pairs["match_id"][:10].tolist()):
+        test_matches.append(match)
+        test_timelines.append(timeline)
 
     print("📌 STEP 2) Minute-level Feature 생성 (Streaming)")
-    # 잘린 리스트(test_...)를 넣습니다.
-    df_minute = extract_minute_features(test_match_paths, test_timeline_paths)
+    # Dataset 에서 읽은 payload 를 루프 엔진에 그대로 넣습니다.
+    df_minute = extract_minute_features(test_matches, test_timelines)
 
     # 데이터가 비어있으면 중단
     if df_minute.empty:
         print("❌ 데이터 추출 실패. 종료합니다.")
         return
 
-    print("📌 STEP 3) Early/Late/End Phase 데이터셋 분리")
-    df_early, df_late, df_end = build_phase_datasets(df_minute)
-
-    df_early.to_csv("data/phase_early.csv", index=False)
-    df_late.to_csv("data/phase_late.csv", index=False)
-    df_end.to_csv("data/phase_end.csv", index=False)
+    print("📌 STEP 2-1) 루프 / 벡터화 피처 엔진 결과 비교")
+    # STEP 2 의 루프 엔진 결과를 그대로 두고 STEP 0 이 기록한 테이블로 벡터화 엔진만 다시 계산 → 하나라도 다르면 실패
+    order = [m["metadata.matchId"] for m in test_matches]
+    participants, frames, events = load_feature_tables(order)
+    diffs = compare_engines(df_minute, extract_minute_features_vectorized(participants, frames, events,
+                                                                          match_order=order))
+    if diffs:
+        for d in diffs:
+            print(f"   - {d}")
+        raise SystemExit("❌ 피처 엔진 결과 불일치 → 테스트 실패")
+    print("✅ 두 엔진 결과 동일")
 
-    print("✔ Phase datasets 저장 완료!")
+    print("📌 STEP 3) Early/Late/End Phase 데이터셋 분리")
+    phase_index = build_phase_index(df_minute)
+    if DUMP_PHASE_FILES:
+        dump_phase_datasets(df_minute)
+        print("✔ Phase datasets 저장 완료!")
 
     print("📌 STEP 4) 모델 학습 시작")
-    train_all_models(df_early, df_late, df_end)
+    train_models_parallel(df_minute, phase_index)  # 스레드 예산 안에서 모델 여러 개 동시 학습
 
     print("📌 STEP 5) OPScore 계산")
     df_score = compute_opscore(df_minute)
-    df_score.to_csv("data/opscore_results.csv", index=False)
+    save_frame(df_score, OPSCORE_FILE)
 
     print("📌 STEP 6) 시각화 실행")
     visualize_feature_importance()